@@ -1,50 +1,232 @@
-import pandas as pd
+import numpy as np
 import os
 import sys
 
+from services.parallel_topsis import parallel_topsis_scores
+from services.topsis_engine import rank_scores, select_top_k
+from utils.numeric_csv import read_numeric_csv
+
+# pandas is imported only by the paths that need it (chunked mode, scenarios,
+# and CSVs with missing or non-numeric cells), so plain numeric CSVs are
+# scored without paying for it at startup
+
 name = "Topsis (MCDM)"
 
+# Remove "--flag value" from the argument list and return value (or None)
+def pop_option(args, flag):
+    if flag not in args:
+        return None
+    i = args.index(flag)
+    if i + 1 >= len(args):
+        print(f"ERROR : {flag} needs a value")
+        exit(1)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
+# topsis scenarios <data.csv> <scenarios.csv> <result.csv>
+def scenarios_main(args):
+    if len(args) != 5:
+        print("ERROR : NUMBER OF PARAMETERS")
+        print("USAGE : python topsis.py scenarios 102103267-data.csv scenarios.csv result1.csv")
+        exit(1)
+    for path in args[2:4]:
+        if not os.path.isfile(path):
+            print(f"ERROR : {path} Don't exist!!")
+            exit(1)
+    if ".csv" != (os.path.splitext(args[4]))[1]:
+        print("ERROR : Output file extension is wrong")
+        exit(1)
+    from services.topsis_service import score_scenarios_file
+    try:
+        score_scenarios_file(args[2], args[3], args[4])
+    except ValueError as e:
+        print(f"ERROR : {e}")
+        exit(1)
+
+
+# topsis sensitivity <data.csv> <weights> <impacts> <result.csv>
+#     [--samples N] [--spread S] [--grid] [--top-k K] [--seed N]
+def sensitivity_main(args):
+    from services.sensitivity import DEFAULT_SAMPLES, DEFAULT_SPREAD
+    from services.topsis_service import sensitivity_file
+
+    samples = positive_int_option(args, '--samples') or DEFAULT_SAMPLES
+    top_k = positive_int_option(args, '--top-k') or 1
+    seed = positive_int_option(args, '--seed')
+    spread = pop_option(args, '--spread')
+    method = 'grid' if '--grid' in args else 'monte-carlo'
+    if '--grid' in args:
+        args.remove('--grid')
+    if len(args) != 6:
+        print("ERROR : NUMBER OF PARAMETERS")
+        print("USAGE : python topsis.py sensitivity 102103267-data.csv '1,1,1,1,1' '+,-,+,-,+' result1.csv "
+              "[--samples N] [--spread S] [--grid] [--top-k K] [--seed N]")
+        exit(1)
+    if not os.path.isfile(args[2]):
+        print(f"ERROR : {args[2]} Don't exist!!")
+        exit(1)
+    if ".csv" != (os.path.splitext(args[5]))[1]:
+        print("ERROR : Output file extension is wrong")
+        exit(1)
+    try:
+        spread = DEFAULT_SPREAD if spread is None else float(spread)
+        sensitivity_file(args[2], args[3], args[4], args[5], samples=samples, spread=spread,
+                         method=method, top_k=top_k, seed=seed)
+    except ValueError as e:
+        print(f"ERROR : {e}")
+        exit(1)
+
+
+# topsis compare <data.csv> <weights> <impacts> <result.csv> [--methods topsis,vikor,wsm,wpm]
+def compare_main(args):
+    from services.topsis_service import compare_file
+
+    methods = pop_option(args, '--methods')
+    if len(args) != 6:
+        print("ERROR : NUMBER OF PARAMETERS")
+        print("USAGE : python topsis.py compare 102103267-data.csv '1,1,1,1,1' '+,-,+,-,+' result1.csv "
+              "[--methods topsis,vikor,wsm,wpm]")
+        exit(1)
+    if not os.path.isfile(args[2]):
+        print(f"ERROR : {args[2]} Don't exist!!")
+        exit(1)
+    if ".csv" != (os.path.splitext(args[5]))[1]:
+        print("ERROR : Output file extension is wrong")
+        exit(1)
+    try:
+        if methods:
+            compare_file(args[2], args[3], args[4], args[5], methods.split(','))
+        else:
+            compare_file(args[2], args[3], args[4], args[5])
+    except ValueError as e:
+        print(f"ERROR : {e}")
+        exit(1)
+
+
+# topsis batch <directory | glob | manifest> <weights> <impacts> <output_dir>
+#     [--workers W] [--top-k K] [--summary summary.csv]
+def batch_main(args):
+    import time
+    from services.batch import SUMMARY_NAME, batch_inputs, run_batch, write_summary
+
+    workers = positive_int_option(args, '--workers')
+    top_k = positive_int_option(args, '--top-k')
+    summary = pop_option(args, '--summary')
+    if len(args) != 6:
+        print("ERROR : NUMBER OF PARAMETERS")
+        print("USAGE : python topsis.py batch data_dir/ '1,1,1,1,1' '+,-,+,-,+' results/ "
+              "[--workers W] [--top-k K] [--summary summary.csv]")
+        exit(1)
+    output_dir = args[5]
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        jobs = batch_inputs(args[2], args[3], args[4], output_dir)
+    except (OSError, ValueError) as e:
+        print(f"ERROR : {e}")
+        exit(1)
+    if not jobs:
+        print(f"ERROR : No input files found for {args[2]}")
+        exit(1)
+
+    start = time.perf_counter()
+    results = run_batch(jobs, workers, top_k)
+    elapsed = time.perf_counter() - start
+    summary = write_summary(results, summary or os.path.join(output_dir, SUMMARY_NAME))
+
+    failed = [row for row in results if row['Status'] != 'ok']
+    for row in failed:
+        print(f"ERROR : {row['Input']}: {row['Error']}")
+    seconds = sorted(row['Seconds'] for row in results)
+    print(f"{len(results) - len(failed)} of {len(results)} files scored in {elapsed:.2f} s "
+          f"(per file: median {seconds[len(seconds) // 2] * 1000:.1f} ms, max {seconds[-1] * 1000:.1f} ms); "
+          f"summary in {summary}")
+    if failed:
+        exit(1)
+
+
+def positive_int_option(args, flag):
+    value = pop_option(args, flag)
+    if value is None:
+        return None
+    try:
+        value = int(value)
+        if value <= 0:
+            raise ValueError
+    except ValueError:
+        print(f"ERROR : {flag} must be a positive integer")
+        exit(1)
+    return value
+
+
 def main():
+    args = list(sys.argv)
+    if len(args) > 1 and args[1] == 'scenarios':
+        scenarios_main(args)
+        return
+    if len(args) > 1 and args[1] == 'sensitivity':
+        sensitivity_main(args)
+        return
+    if len(args) > 1 and args[1] == 'compare':
+        compare_main(args)
+        return
+    if len(args) > 1 and args[1] == 'batch':
+        batch_main(args)
+        return
+
+    chunksize = positive_int_option(args, '--chunksize')
+    top_k = positive_int_option(args, '--top-k')
+    workers = positive_int_option(args, '--workers')
+    dtype = 'float64'
+    if '--float32' in args:
+        args.remove('--float32')
+        dtype = 'float32'
+    # Only changes --chunksize, which leaves out the Rank column by default:
+    # ranking every row costs another pass over the file and 8 bytes per row
+    rank = '--rank' in args
+    if rank:
+        args.remove('--rank')
+
     # Arguments not equal to 5
     # print("Checking for Errors...\n")
-    if len(sys.argv) != 5:
+    if len(args) != 5:
         print("ERROR : NUMBER OF PARAMETERS")
-        print("USAGE : python topsis.py 102103267-data.csv '1,1,1,1,1' '+,-,+,-,+' result1.csv ")
+        print("USAGE : python topsis.py 102103267-data.csv '1,1,1,1,1' '+,-,+,-,+' result1.csv [--chunksize N [--rank]] [--top-k K] [--workers W] [--float32]")
+        print("        --rank adds the Rank column in --chunksize mode, at the cost of a third pass over the file and 8 bytes of memory per row")
         exit(1)
 
     # File Not Found error
-    elif not os.path.isfile(sys.argv[1]):
-        print(f"ERROR : {sys.argv[1]} Don't exist!!")
+    elif not os.path.isfile(args[1]):
+        print(f"ERROR : {args[1]} Don't exist!!")
         exit(1)
 
     # File extension not csv
-    elif ".csv" != (os.path.splitext(sys.argv[1]))[1]:
-        print(f"ERROR : {sys.argv[1]} is not csv!!")
+    elif ".csv" != (os.path.splitext(args[1]))[1]:
+        print(f"ERROR : {args[1]} is not csv!!")
         exit(1)
 
     else:
-        dataset, temp_dataset = pd.read_csv(
-            sys.argv[1]), pd.read_csv(sys.argv[1])
-        nCol = len(temp_dataset.columns.values)
+        # Plain numeric CSVs are parsed without pandas; in chunked mode only
+        # the header is read up front
+        table = None if chunksize else read_numeric_csv(args[1])
+        if table is None:
+            import pandas as pd
+            dataset = pd.read_csv(args[1], nrows=0 if chunksize else None)
+        nCol = len(table.header if table is not None else dataset.columns.values)
 
         # less then 3 columns in input dataset
         if nCol < 3:
             print("ERROR : Input file have less then 3 columns")
             exit(1)
 
-        # Handeling non-numeric value
-        for i in range(1, nCol):
-            pd.to_numeric(dataset.iloc[:, i], errors='coerce')
-            dataset.iloc[:, i].fillna(
-                (dataset.iloc[:, i].mean()), inplace=True)
-
         # Handling errors of weighted and impact arrays
         try:
-            weights = [int(i) for i in sys.argv[2].split(',')]
+            weights = [int(i) for i in args[2].split(',')]
         except:
             print("ERROR : In weights array please check again")
             exit(1)
-        impact = sys.argv[3].split(',')
+        impact = args[3].split(',')
         for i in impact:
             if not (i == '+' or i == '-'):
                 print("ERROR : In impact array please check again")
@@ -56,66 +238,62 @@ def main():
                 "ERROR : Number of weights, number of impacts and number of columns not same")
             exit(1)
 
-        if (".csv" != (os.path.splitext(sys.argv[4]))[1]):
+        if (".csv" != (os.path.splitext(args[4]))[1]):
             print("ERROR : Output file extension is wrong")
             exit(1)
-        if os.path.isfile(sys.argv[4]):
-            os.remove(sys.argv[4])
+        if os.path.isfile(args[4]):
+            os.remove(args[4])
         # print(" No error found\n\n Applying Topsis Algorithm...\n")
-        topsis_pipy(temp_dataset, dataset, nCol, weights, impact)
-
-
-def Normalize(temp_dataset, nCol, weights):
-    # normalizing the array
-    # print(" Normalizing the DataSet...\n")
-    for i in range(1, nCol):
-        temp = 0
-        for j in range(len(temp_dataset)):
-            temp = temp + temp_dataset.iloc[j, i]**2
-        temp = temp**0.5
-        for j in range(len(temp_dataset)):
-            temp_dataset.iat[j, i] = (
-                temp_dataset.iloc[j, i] / temp)*weights[i-1]
-    return temp_dataset
-
-
-def Calc_Values(temp_dataset, nCol, impact):
-    # print(" Calculating Positive and Negative values...\n")
-    p_sln = (temp_dataset.max().values)[1:]
-    n_sln = (temp_dataset.min().values)[1:]
-    for i in range(1, nCol):
-        if impact[i-1] == '-':
-            p_sln[i-1], n_sln[i-1] = n_sln[i-1], p_sln[i-1]
-    return p_sln, n_sln
-
-
-def topsis_pipy(temp_dataset, dataset, nCol, weights, impact):
-    # normalizing the array
-    temp_dataset = Normalize(temp_dataset, nCol, weights)
-
-    # Calculating positive and negative values
-    p_sln, n_sln = Calc_Values(temp_dataset, nCol, impact)
-
-    # calculating topsis score
-    score = []
-    for i in range(len(temp_dataset)):
-        temp_p, temp_n = 0, 0
-        for j in range(1, nCol):
-            temp_p = temp_p + (p_sln[j-1] - temp_dataset.iloc[i, j])**2
-            temp_n = temp_n + (n_sln[j-1] - temp_dataset.iloc[i, j])**2
-        temp_p, temp_n = temp_p**0.5, temp_n**0.5
-        score.append(temp_n/(temp_p + temp_n))
-    dataset['Topsis Score'] = score
+        if chunksize:
+            from services.topsis_service import topsis_csv_chunked
+            topsis_csv_chunked(args[1], args[4], weights, impact,
+                               chunksize=chunksize, rank=rank, top_k=top_k, dtype=dtype)
+            return
+
+        if table is not None:
+            topsis_numeric(table, weights, impact, args[4], top_k, workers, dtype)
+            return
+
+        # Handeling non-numeric value
+        from services.topsis_service import fill_non_numeric
+        values = fill_non_numeric(dataset).iloc[:, 1:]
+        topsis_pipy(values.to_numpy(dtype=np.float64), dataset, weights, impact, args[4], top_k, workers, dtype)
+
+
+def topsis_pipy(matrix, dataset, weights, impact, output_file, top_k=None, workers=None, dtype='float64'):
+    # calculating topsis score on the whole matrix at once, split across
+    # worker processes when workers > 1; float32 scores without full-size
+    # temporaries
+    scores = parallel_topsis_scores(matrix, weights, impact, workers or 1, backend='process', dtype=dtype)
+
+    # keeping only the best top_k rows, without ranking the rest
+    if top_k is not None:
+        idx, ranks = select_top_k(scores, top_k)
+        dataset = dataset.iloc[idx].copy()
+        dataset['Topsis Score'] = scores[idx]
+        dataset['Rank'] = ranks
+        dataset.to_csv(output_file, index=False)
+        return
+
+    dataset['Topsis Score'] = scores
 
     # calculating the rank according to topsis score
-    dataset['Rank'] = (dataset['Topsis Score'].rank(
-        method='max', ascending=False))
-    dataset = dataset.astype({"Rank": int})
+    dataset['Rank'] = rank_scores(scores)
 
     # Writing the csv
-    dataset.to_csv(sys.argv[4], index=False)
+    dataset.to_csv(output_file, index=False)
     # print(" Successfully Terminated")
 
 
+# topsis_pipy for a NumericTable from the pandas-free reader
+def topsis_numeric(table, weights, impact, output_file, top_k=None, workers=None, dtype='float64'):
+    scores = parallel_topsis_scores(table.matrix, weights, impact, workers or 1, backend='process', dtype=dtype)
+    if top_k is not None:
+        idx, ranks = select_top_k(scores, top_k)
+        table.write_csv(output_file, {'Topsis Score': scores[idx], 'Rank': ranks}, rows=idx)
+        return
+    table.write_csv(output_file, {'Topsis Score': scores, 'Rank': rank_scores(scores)})
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,167 @@
+# Benchmark: requests per second of POST /api/v1/score with a local load
+# generator. The app is served by Werkzeug's threaded server in a separate
+# process (or pass --url to load a server started elsewhere, e.g. gunicorn);
+# client threads keep one HTTP connection each and send the same request for
+# --duration seconds, for every matrix size and for JSON and Arrow bodies.
+# Each configuration's response is first checked against topsis_scores.
+#
+# Usage: python benchmarks/bench_api.py [--sizes 10x5,1000x8,100000x8]
+#            [--clients 8] [--duration 5] [--url http://127.0.0.1:5000]
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from services.score_api import ARROW_TYPE, HAS_ARROW, JSON_TYPE
+from services.topsis_engine import rank_scores, topsis_scores
+
+DEFAULT_SIZES = '10x5,1000x8,100000x8'
+
+
+def serve(port):
+    os.chdir(ROOT)
+    # The app needs a database URL to import; the endpoint never touches it
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    from werkzeug.serving import run_simple
+    import app
+
+    run_simple('127.0.0.1', port, app.app, threaded=True)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server():
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port)],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return server, f'http://127.0.0.1:{port}'
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("The server did not start")
+
+
+def make_request(kind, rows, criteria, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.uniform(1, 1000, size=(rows, criteria)).round(3)
+    weights = rng.integers(1, 5, size=criteria).tolist()
+    impacts = rng.choice(['+', '-'], size=criteria).tolist()
+    names = [f'A{i + 1}' for i in range(rows)]
+    expected = topsis_scores(matrix, weights, impacts)
+    if kind == 'json':
+        body = json.dumps({'matrix': matrix.tolist(), 'weights': weights, 'impacts': impacts,
+                           'names': names}).encode()
+        return '/api/v1/score', body, JSON_TYPE, expected
+
+    import pyarrow
+    import pyarrow.ipc
+
+    table = pyarrow.table([pyarrow.array(names)] + [pyarrow.array(matrix[:, j]) for j in range(criteria)],
+                          names=['Name'] + [f'C{j + 1}' for j in range(criteria)])
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    query = urllib.parse.urlencode({'weights': ','.join(map(str, weights)), 'impacts': ','.join(impacts)})
+    return f'/api/v1/score?{query}', sink.getvalue().to_pybytes(), ARROW_TYPE, expected
+
+
+def post(connection, path, body, content_type):
+    connection.request('POST', path, body, {'Content-Type': content_type})
+    response = connection.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise SystemExit(f"HTTP {response.status}: {data[:200]!r}")
+    return data
+
+
+def check(kind, data, expected):
+    if kind == 'json':
+        result = json.loads(data)
+        scores, ranks = np.array(result['scores']), np.array(result['ranks'])
+    else:
+        import pyarrow.ipc
+
+        table = pyarrow.ipc.open_stream(data).read_all()
+        scores, ranks = table['Topsis Score'].to_numpy(), table['Rank'].to_numpy()
+    if not (np.allclose(scores, expected) and np.array_equal(ranks, rank_scores(expected))):
+        raise SystemExit(f"{kind}: scores or ranks differ from topsis_scores")
+
+
+def load(url, path, body, content_type, clients, duration):
+    host = urllib.parse.urlsplit(url)
+    latencies = [[] for _ in range(clients)]
+    stop = time.perf_counter() + duration
+
+    def client(out):
+        connection = http.client.HTTPConnection(host.hostname, host.port)
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            post(connection, path, body, content_type)
+            out.append(time.perf_counter() - start)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(out,)) for out in latencies]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.array([x for out in latencies for x in out]) * 1000
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=DEFAULT_SIZES)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--url')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    options = parser.parse_args()
+    if options.serve:
+        return serve(options.serve)
+
+    server, url = (None, options.url) if options.url else start_server()
+    kinds = ['json', 'arrow'] if HAS_ARROW else ['json']
+    try:
+        print(f"{url}, {options.clients} clients, {options.duration:.0f} s per run")
+        print(f"  {'size':>12} {'body':>6} {'bytes':>10} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+        for size in options.sizes.split(','):
+            rows, criteria = map(int, size.split('x'))
+            for kind in kinds:
+                path, body, content_type, expected = make_request(kind, rows, criteria)
+                host = urllib.parse.urlsplit(url)
+                connection = http.client.HTTPConnection(host.hostname, host.port)
+                check(kind, post(connection, path, body, content_type), expected)
+                connection.close()
+                rate, p50, p99 = load(url, path, body, content_type, options.clients, options.duration)
+                print(f"  {size:>12} {kind:>6} {len(body):>10} {rate:>9.1f} {p50:>9.2f} {p99:>9.2f}")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Benchmark: opt-in float32 scoring (score_rows_inplace) against the float64
+# engine. Rank agreement is measured on every bundled sample dataset in
+# uploads/ under many random weight/impact settings, and on synthetic
+# matrices large enough for near-ties; peak memory (tracemalloc, beyond the
+# input matrix) and time are measured on the largest synthetic matrix.
+#
+# Usage: python benchmarks/bench_float32.py [settings] [sizes]
+#        e.g. python benchmarks/bench_float32.py 200 10000x8,1000000x10
+
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from services.topsis_engine import rank_scores, topsis_scores
+
+DEFAULT_SIZES = '10000x8,1000000x10'
+
+
+def sample_datasets():
+    import pandas as pd
+    from services.topsis_service import fill_non_numeric
+
+    paths = sorted(glob.glob(os.path.join(ROOT, 'uploads', 'topsis_*.csv')))
+    paths += sorted(glob.glob(os.path.join(ROOT, 'uploads', '*.xlsx')))
+    for path in paths:
+        data = pd.read_excel(path) if path.endswith('.xlsx') else pd.read_csv(path)
+        yield os.path.basename(path), fill_non_numeric(data).iloc[:, 1:].to_numpy(dtype=np.float64)
+
+
+def settings(criteria, count, rng):
+    yield np.ones(criteria), np.ones(criteria)
+    for _ in range(count - 1):
+        yield rng.integers(1, 6, size=criteria).astype(np.float64), rng.choice([1.0, -1.0], size=criteria)
+
+
+# Share of rows whose rank is unchanged, the largest rank shift, whether the
+# best row and the top 10 (as a set) are the same and the largest score difference
+def agreement(matrix, count, rng):
+    same, shift, top1, top10, diff = [], 0, 0, 0, 0.0
+    for weights, signs in settings(matrix.shape[1], count, rng):
+        s64 = topsis_scores(matrix, weights, signs)
+        s32 = topsis_scores(matrix, weights, signs, dtype='float32')
+        r64, r32 = rank_scores(s64), rank_scores(s32)
+        same.append(np.mean(r64 == r32))
+        shift = max(shift, int(np.abs(r64 - r32).max()))
+        top1 += int(np.argmax(s64) == np.argmax(s32))
+        k = min(10, len(matrix))
+        top10 += int(set(np.argsort(-s64)[:k]) == set(np.argsort(-s32)[:k]))
+        diff = max(diff, float(np.nanmax(np.abs(s64 - s32))))
+    return np.mean(same), shift, top1, top10, diff
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    sizes = (sys.argv[2] if len(sys.argv) > 2 else DEFAULT_SIZES).split(',')
+    rng = np.random.default_rng(0)
+
+    print(f"Rank agreement of float32 with float64, {count} weight/impact settings per dataset")
+    print(f"  {'dataset':>26} {'rows':>8} {'same rank':>10} {'max shift':>10} {'same best':>10} "
+          f"{'same top 10':>12} {'max |diff|':>11}")
+    datasets = list(sample_datasets())
+    for size in sizes:
+        rows, criteria = map(int, size.split('x'))
+        datasets.append((f'synthetic {size}', rng.uniform(1, 1000, size=(rows, criteria))))
+    for name, matrix in datasets:
+        # Large matrices get fewer settings so the run stays short
+        runs = count if len(matrix) <= 100_000 else max(1, count // 50)
+        same, shift, top1, top10, diff = agreement(matrix, runs, rng)
+        print(f"  {name:>26} {len(matrix):>8} {same * 100:>9.3f}% {shift:>10} {top1:>6}/{runs:<3} "
+              f"{top10:>8}/{runs:<3} {diff:>11.2e}")
+
+    matrix = datasets[-1][1]
+    weights, signs = next(settings(matrix.shape[1], 1, rng))
+    print(f"Peak memory beyond the {matrix.nbytes / 2**20:.0f} MiB input, {len(matrix)} x {matrix.shape[1]}")
+    for dtype in ('float64', 'float32'):
+        peak, elapsed = peak_memory(lambda: topsis_scores(matrix, weights, signs, dtype=dtype))
+        print(f"  {dtype}: {peak / 2**20:8.1f} MiB {elapsed * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
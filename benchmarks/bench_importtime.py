@@ -0,0 +1,68 @@
+# Benchmark: import time of the CLI and the web app, measured with
+# `python -X importtime` in fresh interpreters, checked against a budget.
+# Modules that must stay lazy (pandas for the CLI; pandas, plotly, smtplib and
+# the optional pyarrow, orjson and zstandard for the web app) fail the check if
+# they are imported at startup. SQLAlchemy is not on the list: Flask-SQLAlchemy
+# has to be set up before the app serves its first request.
+#
+# Usage: python benchmarks/bench_importtime.py [runs] [target=budget_ms ...]
+# e.g.   python benchmarks/bench_importtime.py 5 cli=300 app=1200
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+TARGETS = {
+    'cli': "import importlib; importlib.import_module('102103267')",
+    'app': "import app",
+}
+# Milliseconds, with headroom over a typical run; raise them only on purpose
+BUDGETS = {'cli': 300, 'app': 1200}
+LAZY = {'cli': ['pandas'], 'app': ['pandas', 'plotly', 'smtplib', 'pyarrow', 'orjson', 'zstandard']}
+
+
+# Total import time in ms and the set of top-level packages imported
+def measure(code):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    total, modules = 0, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        total += int(self_us)
+        modules.add(name.strip().split('.')[0])
+    return total / 1000, modules
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 and '=' not in sys.argv[1] else 5
+    budgets = dict(BUDGETS)
+    for arg in sys.argv[1:]:
+        if '=' in arg:
+            target, budget = arg.split('=', 1)
+            budgets[target] = float(budget)
+
+    failed = False
+    for target, code in TARGETS.items():
+        timings, modules = [], set()
+        for _ in range(runs):
+            elapsed, modules = measure(code)
+            timings.append(elapsed)
+        best = min(timings)
+        status = 'ok' if best <= budgets[target] else 'OVER BUDGET'
+        print(f"{target}: {best:.1f} ms (budget {budgets[target]:.0f} ms) {status}")
+        eager = [name for name in LAZY[target] if name in modules]
+        if eager:
+            print(f"{target}: imports {', '.join(eager)} at startup")
+        failed |= best > budgets[target] or bool(eager)
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
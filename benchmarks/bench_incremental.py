@@ -0,0 +1,79 @@
+# Benchmark: IncrementalTopsis edits vs. a full recompute after every edit,
+# checking that both give the same scores and ranks. Ranking costs the same
+# on both sides, so only the scoring is timed.
+#
+# Usage: python benchmarks/bench_incremental.py [rows] [edits]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.incremental_topsis import IncrementalTopsis
+from services.topsis_engine import rank_scores, topsis_scores
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    criteria = 5
+    weights = [1, 2, 1, 1, 3]
+    impacts = '+,-,+,-,+'
+    rng = np.random.default_rng(0)
+
+    matrix = rng.uniform(1, 100, size=(rows, criteria))
+    keys = list(range(rows))
+    engine = IncrementalTopsis(matrix, weights, impacts, keys)
+    engine.scores()
+    data = dict(zip(keys, matrix))
+    next_key = rows
+
+    incremental_time = full_time = 0.0
+    for step in range(edits):
+        op = step % 3
+        if op == 0:
+            new_rows = rng.uniform(1, 100, size=(3, criteria))
+            new_keys = list(range(next_key, next_key + 3))
+            next_key += 3
+            start = time.perf_counter()
+            engine.insert(new_rows, new_keys)
+            data.update(zip(new_keys, new_rows))
+        elif op == 1:
+            gone = [int(k) for k in rng.choice(engine.keys(), 3, replace=False)]
+            start = time.perf_counter()
+            engine.delete(gone)
+            for key in gone:
+                del data[key]
+        else:
+            changed = [int(k) for k in rng.choice(engine.keys(), 3, replace=False)]
+            new_rows = rng.uniform(1, 100, size=(3, criteria))
+            start = time.perf_counter()
+            engine.update(changed, new_rows)
+            data.update(zip(changed, new_rows))
+        scores = engine.scores()
+        incremental_time += time.perf_counter() - start
+        ranks = engine.ranks()
+
+        order = engine.keys()
+        full_matrix = np.array([data[key] for key in order])
+        start = time.perf_counter()
+        expected = topsis_scores(full_matrix, weights, impacts)
+        full_time += time.perf_counter() - start
+        expected_ranks = rank_scores(expected)
+
+        if not np.allclose(scores, expected, rtol=1e-9, atol=1e-12):
+            raise SystemExit(f"Score mismatch after edit {step}")
+        if not np.array_equal(ranks, expected_ranks):
+            raise SystemExit(f"Rank mismatch after edit {step}")
+
+    print(f"{rows} rows, {edits} edits: scores and ranks match the batch result")
+    print(f"incremental: {incremental_time / edits * 1000:.2f} ms/edit")
+    print(f"full recompute: {full_time / edits * 1000:.2f} ms/edit")
+    print(f"speedup: {full_time / incremental_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
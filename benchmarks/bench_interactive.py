@@ -0,0 +1,66 @@
+# Benchmark: rescoring after a weight slider move in the Streamlit app
+# (InteractiveTopsis: one matrix-vector product on the cached squared
+# deviations, then the top rows) against normalizing and scoring from scratch.
+# Scores and ranks are checked against topsis_scores for a few weight
+# vectors first; exits with status 1 if the median rescore is over budget.
+#
+# Usage: python benchmarks/bench_interactive.py [rows] [criteria] [budget_ms]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.interactive_topsis import InteractiveTopsis
+from services.topsis_engine import rank_scores, select_top_k, topsis_scores
+
+SHOWN = 20
+
+
+def median_ms(func, weights):
+    times = []
+    for w in weights:
+        start = time.perf_counter()
+        func(w)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    criteria = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    budget = float(sys.argv[3]) if len(sys.argv) > 3 else 50
+    rng = np.random.default_rng(0)
+    matrix = rng.uniform(1, 100, size=(rows, criteria))
+    impacts = ['+' if j % 3 else '-' for j in range(criteria)]
+    # Slider positions: 0 to 10 in steps of 0.5
+    weights = rng.integers(0, 21, size=(50, criteria)) / 2
+    weights[:, 0] += 0.5
+
+    start = time.perf_counter()
+    scorer = InteractiveTopsis(matrix, impacts)
+    prepare = (time.perf_counter() - start) * 1000
+    for w in weights[:5]:
+        expected = topsis_scores(matrix, w, impacts)
+        scores = scorer.scores(w)
+        if not (np.allclose(scores, expected) and np.array_equal(rank_scores(scores), rank_scores(expected))):
+            raise SystemExit("InteractiveTopsis does not match topsis_scores")
+
+    top = median_ms(lambda w: scorer.top_k(w, SHOWN), weights)
+    ranks = median_ms(scorer.ranks, weights)
+    scratch = median_ms(lambda w: select_top_k(topsis_scores(matrix, w, impacts), SHOWN), weights)
+    print(f"{rows} rows x {criteria} criteria (scores match topsis_scores)")
+    print(f"  prepare (once per dataset and impacts): {prepare:.1f} ms")
+    print(f"  slider move, top {SHOWN}:    {top:.1f} ms (budget {budget:.0f} ms) "
+          f"{'ok' if top <= budget else 'OVER BUDGET'}")
+    print(f"  slider move, every rank: {ranks:.1f} ms")
+    print(f"  from scratch, top {SHOWN}:   {scratch:.1f} ms")
+    if top > budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
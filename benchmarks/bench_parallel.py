@@ -0,0 +1,65 @@
+# Benchmark: row-sharded parallel scoring on 1..N workers with the thread and
+# process backends, checking every result against the single-call engine.
+# The process backend is also timed on a memory-mapped .npy, which workers
+# reopen from disk instead of receiving a shared-memory copy.
+#
+# Usage: python benchmarks/bench_parallel.py [rows] [max_workers] [repeats]
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.parallel_topsis import get_pool, parallel_topsis_scores, shutdown_pools
+from services.topsis_engine import topsis_scores
+
+
+def best_time(func, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    criteria = 8
+    weights = [1, 2, 1, 1, 3, 1, 2, 1]
+    impacts = '+,-,+,-,+,+,-,+'
+    rng = np.random.default_rng(0)
+    matrix = rng.uniform(1, 100, size=(rows, criteria))
+
+    baseline, expected = best_time(lambda: topsis_scores(matrix, weights, impacts), repeats)
+    print(f"{rows} rows x {criteria} criteria, {os.cpu_count()} CPUs")
+    print(f"single call: {baseline * 1000:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'matrix.npy')
+        np.save(path, np.asfortranarray(matrix))
+        mapped = np.load(path, mmap_mode='r')
+        cases = [('thread', matrix), ('process', matrix), ('process', mapped)]
+        for backend, data in cases:
+            label = backend + (' (memmap)' if data is mapped else '')
+            for workers in range(1, max_workers + 1):
+                # Start the pool outside the timed runs
+                get_pool(backend, workers)
+                elapsed, scores = best_time(lambda: parallel_topsis_scores(
+                    data, weights, impacts, workers, backend), repeats)
+                if not np.allclose(scores, expected, rtol=1e-9, atol=1e-12):
+                    raise SystemExit(f"Score mismatch: {label}, {workers} workers")
+                print(f"{label:18} {workers:2} workers: {elapsed * 1000:8.1f} ms "
+                      f"({baseline / elapsed:.2f}x)")
+        del mapped
+    shutdown_pools()
+
+
+if __name__ == "__main__":
+    main()
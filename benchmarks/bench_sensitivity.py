@@ -0,0 +1,50 @@
+# Benchmark: weight-sensitivity analysis on a synthetic dataset, checking the
+# batched ranks of a few samples against scoring each weight vector on its own
+# and reporting whether the run fits an interactive budget.
+#
+# Usage: python benchmarks/bench_sensitivity.py [rows] [samples] [budget_ms]
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.sensitivity import rank_stability
+from services.topsis_engine import rank_scores, topsis_scores
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    budget = float(sys.argv[3]) if len(sys.argv) > 3 else 1500
+    weights = [1, 2, 1, 1, 3, 1]
+    impacts = '+,-,+,-,+,+'
+    rng = np.random.default_rng(0)
+    matrix = rng.uniform(1, 100, size=(rows, len(weights)))
+
+    start = time.perf_counter()
+    stats = rank_stability(matrix, weights, impacts, samples=samples, top_k=10, seed=0)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    # Recompute the statistics from the first few samples one at a time
+    check = stats['weights'][:20]
+    ranks = np.array([rank_scores(topsis_scores(matrix, w, impacts)) for w in check])
+    partial = rank_stability(matrix, weights, impacts, samples=len(check), top_k=10, seed=0)
+    if not (np.array_equal(ranks.min(axis=0), partial['best_rank'])
+            and np.array_equal(ranks.max(axis=0), partial['worst_rank'])
+            and np.allclose(ranks.mean(axis=0), partial['mean_rank'])):
+        raise SystemExit("Batched ranks do not match per-sample scoring")
+
+    print(f"{rows} rows x {len(weights)} criteria, {samples} samples: {elapsed:.0f} ms "
+          f"(budget {budget:.0f} ms) {'ok' if elapsed <= budget else 'OVER BUDGET'}")
+    print(f"alternatives always in the top 10: {int((stats['p_top_k'] == 1).sum())}, "
+          f"sometimes: {int(((stats['p_top_k'] > 0) & (stats['p_top_k'] < 1)).sum())}")
+    if elapsed > budget:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
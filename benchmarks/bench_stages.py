@@ -0,0 +1,220 @@
+# Benchmark: every stage of the TOPSIS pipeline on synthetic decision matrices
+# of growing size, for the CLI path (102103267.py: csv-module parser, NumPy
+# engine, csv writer) and the service path (services/: pandas parser with
+# cell validation, rank_dataset, gzip result file, Plotly chart). Stages are
+# parse, validate, normalize, score, rank, csv and chart; the CLI is also run
+# end to end in a subprocess, startup included. Both paths must produce the
+# same scores and ranks.
+#
+# Each size is run once untimed first, so imports, first-call set-up (e.g.
+# Plotly's validators) and cold file caches do not land in the first timed
+# run; with --repeat 1 they would otherwise show up as regressions.
+#
+# Timings (best of --repeat, in ms) are written as JSON. With --baseline the
+# run is compared against a stored result and exits with status 1 if a stage
+# got slower than --tolerance (relative) and --min-ms (absolute) allow;
+# --save-baseline stores this run as the new baseline instead. Baselines are
+# only comparable on the machine that recorded them.
+#
+# Usage: python benchmarks/bench_stages.py [--sizes 1000x5,10000x10,100000x10]
+#            [--repeat 3] [--output bench_stages.json] [--baseline FILE]
+#            [--save-baseline] [--tolerance 0.25] [--min-ms 2]
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from services.topsis_engine import (ENGINE_VERSION, column_stats, ideal_points, parse_impacts,
+                                    rank_scores, score_rows)
+
+DEFAULT_SIZES = '1000x5,10000x10,100000x10'
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline_stages.json')
+STAGES = ('parse', 'validate', 'normalize', 'score', 'rank', 'csv', 'chart', 'end_to_end')
+CLI_PATH = os.path.join(ROOT, '102103267.py')
+
+
+def load_cli():
+    spec = importlib.util.spec_from_file_location('topsis_cli', CLI_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_dataset(path, rows, criteria, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.uniform(1, 1000, size=(rows, criteria)).round(3)
+    # Half the criteria are integers, as in the sample uploads
+    matrix[:, ::2] = matrix[:, ::2].round()
+    with open(path, 'w') as f:
+        f.write(','.join(['Name'] + [f'C{j + 1}' for j in range(criteria)]) + '\n')
+        for i, row in enumerate(matrix.tolist()):
+            cells = [str(int(v)) if j % 2 == 0 else repr(v) for j, v in enumerate(row)]
+            f.write(f'A{i + 1},' + ','.join(cells) + '\n')
+    return rng.integers(1, 5, size=criteria).tolist(), rng.choice(['+', '-'], size=criteria).tolist()
+
+
+def timed(stages, name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = (time.perf_counter() - start) * 1000
+    stages[name] = min(stages.get(name, elapsed), elapsed)
+    return result
+
+
+# The fast path of the CLI, stage by stage
+def cli_stages(cli, path, weights, impacts, out_dir, stages):
+    table = timed(stages, 'parse', cli.read_numeric_csv, path)
+    if table is None:
+        raise SystemExit("The CLI fell back to pandas for a plain numeric file")
+
+    def validate():
+        w = [int(i) for i in ','.join(map(str, weights)).split(',')]
+        if len(table.header) != len(w) + 1 or len(table.header) != len(impacts) + 1:
+            raise SystemExit("Weights do not match the criteria")
+        return w, parse_impacts(impacts)
+
+    timed(stages, 'validate', validate)
+    _, scale, best, worst = timed(stages, 'normalize',
+                                  lambda: ideal_points(column_stats(table.matrix), weights, impacts))
+    scores = timed(stages, 'score', score_rows, table.matrix, scale, best, worst)
+    ranks = timed(stages, 'rank', rank_scores, scores)
+    timed(stages, 'csv', table.write_csv, os.path.join(out_dir, 'cli.csv'),
+          {'Topsis Score': scores, 'Rank': ranks})
+
+    output = os.path.join(out_dir, 'cli_e2e.csv')
+    command = [sys.executable, CLI_PATH, path, ','.join(map(str, weights)), ','.join(impacts), output]
+    timed(stages, 'end_to_end',
+          lambda: subprocess.run(command, check=True, cwd=ROOT, capture_output=True))
+    return scores, ranks
+
+
+# The pipeline of the web app's jobs, stage by stage
+def service_stages(path, weights, impacts, out_dir, stages):
+    from services.charts import chart_figure
+    from services.dataset_cache import dataset_entry, read_dataset
+    from services.result_store import write_result_file
+    from services.topsis_service import rank_dataset
+    from utils.validators import validate_weights_impacts
+
+    data = timed(stages, 'parse', read_dataset, path)
+
+    def validate():
+        if not validate_weights_impacts(','.join(map(str, weights)), ','.join(impacts),
+                                        len(data.columns)):
+            raise SystemExit("Weights do not match the criteria")
+        return dataset_entry(data)
+
+    entry = timed(stages, 'validate', validate)
+    matrix = entry[3]
+    _, scale, best, worst = timed(stages, 'normalize',
+                                  lambda: ideal_points(column_stats(matrix), weights, impacts))
+    scores = timed(stages, 'score', score_rows, matrix, scale, best, worst)
+
+    data = timed(stages, 'rank', rank_dataset, data, scores)
+    ranks = data['Rank'].to_numpy()
+    timed(stages, 'csv', write_result_file, data, os.path.join(out_dir, 'service.csv.gz'))
+    timed(stages, 'chart', chart_figure, data.iloc[:, 0].tolist(), scores, data['Rank'])
+    stages['end_to_end'] = sum(stages[s] for s in STAGES[:-1])
+    return scores, ranks
+
+
+def run(sizes, repeat):
+    cli = load_cli()
+    results = {'cli': {}, 'service': {}}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for size in sizes:
+            rows, criteria = map(int, size.split('x'))
+            path = os.path.join(out_dir, f'data_{size}.csv')
+            weights, impacts = write_dataset(path, rows, criteria)
+            # Untimed warm-up run of both paths
+            cli_stages(cli, path, weights, impacts, out_dir, {})
+            service_stages(path, weights, impacts, out_dir, {})
+            cli_times, service_times = {}, {}
+            for _ in range(repeat):
+                cli_scores, cli_ranks = cli_stages(cli, path, weights, impacts, out_dir, cli_times)
+                scores, ranks = service_stages(path, weights, impacts, out_dir, service_times)
+            if not (np.allclose(cli_scores, scores) and np.array_equal(cli_ranks, ranks)):
+                raise SystemExit(f"{size}: CLI and service scores or ranks differ")
+            results['cli'][size] = {s: round(t, 3) for s, t in cli_times.items()}
+            results['service'][size] = {s: round(t, 3) for s, t in service_times.items()}
+    return results
+
+
+def environment():
+    import pandas as pd
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'engine_version': ENGINE_VERSION, 'date': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+# Stages slower than the baseline by more than tolerance and min_ms
+def regressions(results, baseline, tolerance, min_ms):
+    found = []
+    for path, sizes in results.items():
+        for size, stages in sizes.items():
+            for stage, ms in stages.items():
+                before = baseline.get(path, {}).get(size, {}).get(stage)
+                if before is not None and ms > before * (1 + tolerance) and ms - before > min_ms:
+                    found.append((path, size, stage, before, ms))
+    return found
+
+
+def print_table(results, baseline):
+    for path, sizes in results.items():
+        print(f"{path}:")
+        print(f"  {'size':>12} " + ' '.join(f'{s:>16}' for s in STAGES))
+        for size, stages in sizes.items():
+            cells = []
+            for stage in STAGES:
+                ms = stages.get(stage)
+                before = baseline.get(path, {}).get(size, {}).get(stage)
+                cell = '-' if ms is None else f'{ms:.1f}'
+                if ms is not None and before:
+                    cell += f' ({(ms / before - 1) * 100:+.0f}%)'
+                cells.append(f'{cell:>16}')
+            print(f"  {size:>12} " + ' '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='bench_stages.json')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--min-ms', type=float, default=2.0)
+    options = parser.parse_args()
+
+    results = run(options.sizes.split(','), options.repeat)
+    report = {'environment': environment(), 'unit': 'ms', 'results': results}
+
+    baseline = {}
+    if not options.save_baseline and os.path.isfile(options.baseline):
+        with open(options.baseline) as f:
+            baseline = json.load(f)['results']
+    print_table(results, baseline)
+
+    found = regressions(results, baseline, options.tolerance, options.min_ms)
+    report['regressions'] = [dict(zip(('path', 'size', 'stage', 'baseline_ms', 'ms'), r)) for r in found]
+    with open(options.baseline if options.save_baseline else options.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for path, size, stage, before, ms in found:
+        print(f"REGRESSION {path} {size} {stage}: {before:.1f} ms -> {ms:.1f} ms")
+    if found:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# Benchmark: vectorized TOPSIS engine vs. the original per-cell loop version
+#
+# Usage: python benchmarks/bench_vectorized.py [rows ...]
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.topsis_engine import rank_scores, topsis_scores
+
+
+# The original Normalize / Calc_Values / topsis_pipy from 102103267.py,
+# kept here as the baseline
+def legacy_topsis(temp_dataset, nCol, weights, impact):
+    for i in range(1, nCol):
+        temp = 0
+        for j in range(len(temp_dataset)):
+            temp = temp + temp_dataset.iloc[j, i]**2
+        temp = temp**0.5
+        for j in range(len(temp_dataset)):
+            temp_dataset.iat[j, i] = (
+                temp_dataset.iloc[j, i] / temp)*weights[i-1]
+
+    p_sln = temp_dataset.max().to_numpy()[1:].copy()
+    n_sln = temp_dataset.min().to_numpy()[1:].copy()
+    for i in range(1, nCol):
+        if impact[i-1] == '-':
+            p_sln[i-1], n_sln[i-1] = n_sln[i-1], p_sln[i-1]
+
+    score = []
+    for i in range(len(temp_dataset)):
+        temp_p, temp_n = 0, 0
+        for j in range(1, nCol):
+            temp_p = temp_p + (p_sln[j-1] - temp_dataset.iloc[i, j])**2
+            temp_n = temp_n + (n_sln[j-1] - temp_dataset.iloc[i, j])**2
+        temp_p, temp_n = temp_p**0.5, temp_n**0.5
+        score.append(temp_n/(temp_p + temp_n))
+    return np.asarray(score)
+
+
+def make_dataset(rows, criteria, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(rng.uniform(1, 100, size=(rows, criteria)),
+                        columns=[f'C{i + 1}' for i in range(criteria)])
+    data.insert(0, 'Alternative', [f'A{i + 1}' for i in range(rows)])
+    return data
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 5000]
+    criteria = 5
+    weights = [1] * criteria
+    impacts = ['+', '-'] * (criteria // 2) + ['+'] * (criteria % 2)
+
+    print(f"{'rows':>8} {'loop (s)':>10} {'vectorized (s)':>15} {'speedup':>9}")
+    for rows in sizes:
+        data = make_dataset(rows, criteria)
+        loop_scores, loop_time = timed(
+            legacy_topsis, data.copy(), criteria + 1, weights, impacts)
+        matrix = data.iloc[:, 1:].to_numpy(dtype=np.float64)
+        fast_scores, fast_time = timed(topsis_scores, matrix, weights, impacts)
+        rank_scores(fast_scores)
+
+        if not np.allclose(loop_scores, fast_scores):
+            raise SystemExit(f"Score mismatch at {rows} rows")
+        print(f"{rows:>8} {loop_time:>10.3f} {fast_time:>15.5f} {loop_time / fast_time:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from models.user import db
+from services.history_store import encode_frame
+
+# The result is a compressed columnar payload (services.history_store) in a
+# deferred column, so listing history only reads the metadata columns and the
+# payload is loaded when an entry is opened
+class History(db.Model):
+    __table_args__ = (db.Index('ix_history_user_created', 'user_id', 'created_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    dataset_info = db.Column(db.Text, nullable=True)
+    rows = db.Column(db.Integer, nullable=True)
+    columns = db.Column(db.Integer, nullable=True)
+    result_size = db.Column(db.Integer, nullable=True)
+    result = db.deferred(db.Column(db.LargeBinary, nullable=True))
+
+    def summary(self):
+        return {'id': self.id, 'created_at': self.created_at.isoformat(),
+                'dataset_info': self.dataset_info, 'rows': self.rows,
+                'columns': self.columns, 'result_size': self.result_size}
+
+
+# Store a result in the user's history. dataset_key is the upload's content
+# hash, which names its columnar copy in the dataset cache, so history can
+# reopen the inputs without storing them again.
+def store_history(user_id, data, dataset_key=None):
+    payload = encode_frame(data)
+    history = History(user_id=user_id, dataset_info=dataset_key, rows=len(data),
+                      columns=len(data.columns), result_size=len(payload), result=payload)
+    db.session.add(history)
+    db.session.commit()
+    return history
@@ -1,11 +1,23 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, Response, current_app, render_template, request, redirect, url_for, flash, session, jsonify, send_file
 import os
-import pandas as pd
-import plotly.express as px
-import plotly.io as pio
-from services.topsis_service import calculate_custom_score, load_input_data, validate_numeric_values, validate_weights_impacts
-from utils.validators import validate_email
-from services.email_service import send_email
+from werkzeug.utils import secure_filename
+from models.history import History, store_history
+from services.charts import ensure_figure, plotlyjs_path
+from services.dataset_cache import get_dataset_cache
+from services.history_store import decode_frame
+from services.job_service import (TooManyJobs, get_job_manager, job_result_id, new_job_id,
+                                 run_sensitivity_job, run_topsis_job)
+from services.ingest import save_upload, sniff_columns, start_background_parse
+from services.mcdm import METHODS, method_records, method_scores
+from services.metrics import add_server_timing, stage
+from services.parallel_topsis import scoring_precision
+from services.result_memo import get_result_memo
+from services.result_store import get_result_store, read_result_file, result_response
+from services.score_api import UnsupportedFormat, score_body
+from services.sensitivity import DEFAULT_SAMPLES, DEFAULT_SPREAD, check_analysis_size, rank_stability, stability_records
+from utils.file_helpers import allowed_file, load_input_entry
+from utils.validators import NonNumericDataError, validate_email, validate_weights_impacts
+from services.email_service import queue_result_email
 
 topsis_bp = Blueprint('topsis', __name__)
 
@@ -22,22 +34,28 @@ def submit():
         flash('Invalid file type. Please upload a CSV or XLSX file.')
         return redirect(url_for('index'))
 
-    # Save file
-    filename = secure_filename(file.filename)
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(file_path)
+    # Save file under its content hash; the upload was already streamed
+    # to disk and hashed while the request body was received
+    with stage('upload'):
+        file_path, digest, head = save_upload(file, current_app.config['UPLOAD_FOLDER'], secure_filename(file.filename))
 
-    # Load data
-    data = load_input_data(file_path)
-    if data is None:
+    # Column names come from the first rows so the form renders right away;
+    # the rest of the file is parsed into the cache in the background
+    try:
+        with stage('sniff'):
+            columns = sniff_columns(file_path, head)  # Excludes the first column (e.g., item names)
+    except NonNumericDataError as e:
+        flash(str(e))
+        return redirect(url_for('index'))
+    if columns is None:
         flash('File not found or invalid.')
         return redirect(url_for('index'))
+    start_background_parse(file_path, digest)
 
-    # Render column names for weights and impacts input
-    columns = data.columns[1:]  # Exclude the first column (e.g., item names)
-    
-    # Save filename to session
-    session['uploaded_file'] = filename
+    # Save filename to session; it is content-addressed, so the cached
+    # dataset under uploaded_digest is always the parse of this file
+    session['uploaded_file'] = os.path.basename(file_path)
+    session['uploaded_digest'] = digest
 
     return render_template('weights_impacts.html', columns=columns)
 
@@ -52,7 +70,7 @@ def process():
         flash('No file uploaded. Please upload a file first.')
         return redirect(url_for('index'))
 
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
 
     # Validate email only if provided and not empty
     if email and email.strip():
@@ -60,43 +78,261 @@ def process():
             flash('Invalid email format.')
             return redirect(url_for('index'))
 
-    # Load data
-    try:
-        data = load_input_data(file_path)
-    except FileNotFoundError:
-        flash('File not found. Please upload the dataset again.')
-        return redirect(url_for('index'))
-
     # Validate weights and impacts
     if not weights or not impacts:
         flash('Please provide weights and impacts.')
         return redirect(url_for('index'))
-    if not validate_numeric_values(data):
-        flash('Columns from 2nd to last must contain numeric values only.')
-        return redirect(url_for('index'))
-    if len(data.columns) - 1 != len(weights) or len(data.columns) - 1 != len(impacts):
-        flash('The number of weights and impacts must match the dataset criteria.')
-        return redirect(url_for('index'))
-    if not validate_weights_impacts(','.join(weights), ','.join(impacts), len(data.columns)):
-        flash('Invalid weights or impacts.')
+
+    # Optionally keep only the best top_k rows
+    top_k = request.form.get('top_k', '').strip() or None
+    if top_k is not None:
+        if not top_k.isdigit() or int(top_k) < 1:
+            flash('Top rows must be a positive whole number.')
+            return redirect(url_for('index'))
+        top_k = int(top_k)
+
+    # Load, validate, score, render and save on the job pool; the email is
+    # queued and the result memoized once it exists
+    job_id = new_job_id()
+    store = get_result_store()
+    result_path = store.path_for(job_id)
+
+    app = current_app._get_current_object()
+    user_id = session.get('user_id')
+    digest = session.get('uploaded_digest')
+
+    memo = get_result_memo()
+    memo_key = memo.key(digest, weights, impacts, method='topsis', precision=scoring_precision(),
+                        top_k=top_k)
+
+    def finish_result(job):
+        # The job wrote its result from a pool worker, so the store's TTL and
+        # size limit are enforced here
+        store.sweep()
+        if job['state'] == 'done' and memo_key:
+            memo.put(memo_key, job_result_id(job))
+        send = email and email.strip()
+        if job['state'] != 'done' or not (send or user_id):
+            return
+        data = read_result_file(job['result']['result_path'])
+        if send:
+            with stage('email'):
+                queue_result_email(data, email)
+        if user_id:
+            with stage('history'), app.app_context():
+                store_history(user_id, data, digest)
+
+    # The same dataset, weights and impacts were scored before: hand back
+    # the stored result as an already finished job of its own. A result
+    # swept since it was memoized is scored again.
+    tenant = user_id or request.remote_addr
+    cached = memo.get(memo_key, store.touch) if memo_key else None
+    cached_path = store.find(cached) if cached else None
+    if cached and cached_path is None:
+        memo.discard(memo_key, cached)
+    try:
+        if cached_path:
+            get_job_manager().complete(tenant, job_id, {'result_path': cached_path, 'result_id': cached},
+                                       on_done=finish_result)
+            result_id = cached
+        else:
+            get_job_manager().submit(tenant, run_topsis_job, file_path, weights, impacts,
+                                     result_path, digest, top_k, on_done=finish_result, job_id=job_id)
+            result_id = job_id
+    except TooManyJobs as e:
+        flash(str(e))
         return redirect(url_for('index'))
 
-    # Calculate custom score
-    custom_score = calculate_custom_score(data, ','.join(weights), ','.join(impacts))
+    session['last_result'] = result_id
+    status_url = url_for('topsis.job_status', job_id=job_id)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify(job_id=job_id, status_url=status_url), 202
+    return render_template('job_status.html', status_url=status_url,
+                           plotlyjs_url=url_for('topsis.plotlyjs'))
+
+@topsis_bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify(id=job_id, state='expired', error='Result expired. Please process the dataset again.'), 404
+    status = {'id': job['id'], 'state': job['state'], 'stage': job['stage'],
+              'progress': job['progress'], 'error': job['error']}
+    if job['state'] == 'done':
+        add_server_timing(job['result'].get('timings', ()), prefix='job-')
+        if job['result'].get('figure', True):
+            status['figure_url'] = url_for('topsis.result_figure', result_id=job_result_id(job))
+        status['csv_download_link'] = url_for('topsis.download_result', result_id=job_result_id(job))
+    return jsonify(status)
+
+# Rank stability of the uploaded dataset when the weights are perturbed by
+# up to +/- spread. All samples are scored in one batched computation on
+# the cached matrix; analyses of more than SENSITIVITY_SYNC_CELLS samples x
+# rows run on the job pool instead and answer 202 with the job, whose
+# result is the statistics table.
+@topsis_bp.route('/sensitivity', methods=['POST'])
+def sensitivity():
+    weights = request.form.getlist('weights')
+    impacts = request.form.getlist('impacts')
+    filename = session.get('uploaded_file')
+    if not filename:
+        return jsonify(error='No file uploaded. Please upload a file first.'), 400
+
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    try:
+        with stage('load'):
+            entry = load_input_entry(file_path, session.get('uploaded_digest'))
+    except FileNotFoundError:
+        return jsonify(error='File not found. Please upload the dataset again.'), 400
+    except NonNumericDataError as e:
+        return jsonify(error=str(e)), 400
+    if entry is None:
+        return jsonify(error='File not found or invalid.'), 400
+    headers, _, names, matrix = entry
+    if not validate_weights_impacts(','.join(weights), ','.join(impacts), len(headers)):
+        return jsonify(error='Invalid weights or impacts.'), 400
+
+    try:
+        seed = request.form.get('seed')
+        options = {'samples': int(request.form.get('samples', DEFAULT_SAMPLES)),
+                   'spread': float(request.form.get('spread', DEFAULT_SPREAD)),
+                   'method': request.form.get('method', 'monte-carlo'),
+                   'top_k': int(request.form.get('top_k', 1)),
+                   'seed': int(seed) if seed else None}
+        check_analysis_size(len(matrix), options['samples'])
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+
+    if len(matrix) * options['samples'] > current_app.config['SENSITIVITY_SYNC_CELLS']:
+        job_id = new_job_id()
+        store = get_result_store()
+        try:
+            get_job_manager().submit(session.get('user_id') or request.remote_addr, run_sensitivity_job,
+                                     file_path, weights, impacts, store.path_for(job_id),
+                                     session.get('uploaded_digest'), options,
+                                     on_done=lambda job: store.sweep(), job_id=job_id)
+        except TooManyJobs as e:
+            return jsonify(error=str(e)), 429
+        return jsonify(job_id=job_id, status_url=url_for('topsis.job_status', job_id=job_id)), 202
+
+    try:
+        with stage('sensitivity'):
+            stats = rank_stability(matrix, ','.join(weights), ','.join(impacts), **options)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(samples=len(stats['weights']), top_k=options['top_k'],
+                   alternatives=stability_records(names, stats))
+
+# The user's history, newest first, one page of metadata at a time
+@topsis_bp.route('/history', methods=['GET'])
+def history():
+    if 'user_id' not in session:
+        return jsonify(error='Please log in to see your history.'), 401
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', current_app.config['HISTORY_PAGE_SIZE'], type=int), 1), 100)
+    entries = (History.query.filter_by(user_id=session['user_id'])
+               .order_by(History.created_at.desc(), History.id.desc())
+               .offset((page - 1) * per_page).limit(per_page + 1).all())
+    return jsonify(page=page, per_page=per_page, has_next=len(entries) > per_page,
+                   entries=[entry.summary() for entry in entries[:per_page]])
+
+# A stored result as CSV
+@topsis_bp.route('/history/<int:history_id>', methods=['GET'])
+def history_result(history_id):
+    if 'user_id' not in session:
+        return jsonify(error='Please log in to see your history.'), 401
+    entry = History.query.filter_by(id=history_id, user_id=session['user_id']).first()
+    if entry is None or entry.result is None:
+        return jsonify(error='History entry not found.'), 404
+    with stage('history-decode'):
+        csv = decode_frame(entry.result).to_csv(index=False)
+    return Response(csv, mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=history_{history_id}.csv'})
+
+# TOPSIS, VIKOR, WSM and WPM (or the methods named in the methods
+# field) on the uploaded dataset, answered in the request with one score and
+# rank column per method. The statistics and normalized matrices the methods
+# share are computed once per dataset and kept for the next request.
+@topsis_bp.route('/compare', methods=['POST'])
+def compare():
+    weights = request.form.getlist('weights')
+    impacts = request.form.getlist('impacts')
+    methods = request.form.getlist('methods') or list(METHODS)
+    filename = session.get('uploaded_file')
+    if not filename:
+        return jsonify(error='No file uploaded. Please upload a file first.'), 400
+
+    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+    digest = session.get('uploaded_digest')
+    try:
+        with stage('load'):
+            entry = load_input_entry(file_path, digest)
+    except FileNotFoundError:
+        return jsonify(error='File not found. Please upload the dataset again.'), 400
+    except NonNumericDataError as e:
+        return jsonify(error=str(e)), 400
+    if entry is None:
+        return jsonify(error='File not found or invalid.'), 400
+    headers, _, names, matrix = entry
+    if not validate_weights_impacts(','.join(weights), ','.join(impacts), len(headers)):
+        return jsonify(error='Invalid weights or impacts.'), 400
 
-    # Add custom score to data
-    data['Custom Score'] = custom_score
-    data['Rank'] = data['Custom Score'].rank(ascending=False)
+    try:
+        with stage('compare'):
+            results = method_scores(matrix, ','.join(weights), ','.join(impacts), methods, digest)
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(methods=list(results), alternatives=method_records(names, results))
 
-    # Visualize results
-    fig = px.bar(data, x=data.columns[0], y='Custom Score', title='TOPSIS Scores by Alternative', text='Rank')
-    graph_html = pio.to_html(fig, full_html=False)
+# Stateless scoring for programmatic clients: the matrix, weights and
+# impacts come in the body as JSON or Arrow IPC (services.score_api) and
+# scores and ranks go back in the same format, without a session, upload
+# file, result file or chart
+@topsis_bp.route('/api/v1/score', methods=['POST'])
+def api_score():
+    if request.content_length is not None and request.content_length > current_app.config['SCORE_API_MAX_BYTES']:
+        return jsonify(error='Request body too large.'), 413
+    try:
+        body, mimetype = score_body(request.get_data(cache=False), request.content_type,
+                                    request.headers.get('Accept'), request.args)
+    except UnsupportedFormat as e:
+        return jsonify(error=str(e)), 415
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return Response(body, mimetype=mimetype)
+
+# The latest result of this session
+@topsis_bp.route('/download', methods=['GET'])
+def download():
+    result_id = session.get('last_result')
+    if not result_id:
+        flash('No result to download. Please process a dataset first.')
+        return redirect(url_for('index'))
+    return redirect(url_for('topsis.download_result', result_id=result_id))
+
+@topsis_bp.route('/download/<result_id>', methods=['GET'])
+def download_result(result_id):
+    path = get_result_store().touch(result_id)
+    if path is None:
+        flash('Result expired. Please process the dataset again.')
+        return redirect(url_for('index'))
+    return result_response(path)
 
-    # Save results to CSV
-    result_csv_path = os.path.join(app.config['UPLOAD_FOLDER'], 'result_with_rank.csv')
-    data.to_csv(result_csv_path, index=False)
+# Chart of a result as Plotly JSON, rendered once per result and cached
+@topsis_bp.route('/results/<result_id>/figure', methods=['GET'])
+def result_figure(result_id):
+    path = get_result_store().touch(result_id)
+    if path is None:
+        return jsonify(error='Result expired. Please process the dataset again.'), 404
+    return send_file(ensure_figure(path), mimetype='application/json', conditional=True)
 
-    # Send email only if an email is provided
-    send_email(data, email)
+# Hit and miss counters of the result memo and the dataset cache
+@topsis_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(results=get_result_memo().stats(), datasets=get_dataset_cache().stats())
 
-    return render_template('result.html', graph_html=graph_html, csv_download_link='/download')
\ No newline at end of file
+# plotly.js from the plotly package, cached by the browser instead of being
+# inlined into every chart
+@topsis_bp.route('/plotly.min.js', methods=['GET'])
+def plotlyjs():
+    return send_file(plotlyjs_path(), mimetype='application/javascript',
+                     conditional=True, max_age=7 * 24 * 3600)
@@ -0,0 +1,136 @@
+import csv
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from services.topsis_engine import parse_impacts, parse_weights, rank_scores, select_top_k, topsis_scores
+from utils.numeric_csv import read_numeric_csv
+
+SUMMARY_NAME = 'batch_summary.csv'
+SUMMARY_COLUMNS = ('Input', 'Output', 'Status', 'Rows', 'Seconds', 'Error')
+
+# Batch scoring for the CLI: many input files, one process lifetime.
+#
+# Inputs come from a directory (its *.csv files), a glob pattern or a
+# manifest: a text file with one input path per line, or a CSV with an Input
+# column and optional Weights, Impacts and Output columns that override the
+# batch's for that file. Files are scored on a process pool, several per task
+# so small files do not pay a round trip each; every file is scored with the
+# pandas-free reader when it can be, and a failure is recorded for that file
+# instead of ending the batch.
+
+
+# (input, weights, impacts, output) for every file named by source, with
+# outputs written to output_dir as <name>-result.csv unless a manifest says
+# otherwise
+def batch_inputs(source, weights, impacts, output_dir):
+    if os.path.isdir(source):
+        rows = [{'Input': path} for path in sorted(glob.glob(os.path.join(source, '*.csv')))]
+    elif os.path.isfile(source) and source.endswith('.csv'):
+        with open(source, newline='', encoding='utf-8-sig') as f:
+            rows = list(csv.DictReader(f))
+        if rows and 'Input' not in rows[0]:
+            raise ValueError(f"Manifest {source} has no Input column")
+        base = os.path.dirname(source)
+        for row in rows:
+            row['Input'] = os.path.join(base, row['Input'])
+    elif os.path.isfile(source):
+        base = os.path.dirname(source)
+        with open(source, encoding='utf-8') as f:
+            rows = [{'Input': os.path.join(base, line.strip())} for line in f
+                    if line.strip() and not line.startswith('#')]
+    else:
+        rows = [{'Input': path} for path in sorted(glob.glob(source, recursive=True))]
+
+    jobs, taken = [], set()
+    for row in rows:
+        output = row.get('Output')
+        if output:
+            output = os.path.join(output_dir, output)
+        else:
+            stem = os.path.splitext(os.path.basename(row['Input']))[0]
+            output, n = os.path.join(output_dir, f'{stem}-result.csv'), 1
+            while output in taken:
+                n += 1
+                output = os.path.join(output_dir, f'{stem}-{n}-result.csv')
+        taken.add(output)
+        jobs.append((row['Input'], row.get('Weights') or weights, row.get('Impacts') or impacts, output))
+    return jobs
+
+
+# Score one file like the single-file CLI; raises ValueError for bad input
+def score_file(input_file, weights, impacts, output_file, top_k=None):
+    weights, signs = parse_weights(weights), parse_impacts(impacts)
+    table = read_numeric_csv(input_file)
+    if table is not None:
+        columns, matrix = len(table.header), table.matrix
+    else:
+        import pandas as pd
+        from services.topsis_service import fill_non_numeric
+
+        dataset = pd.read_csv(input_file)
+        columns = len(dataset.columns)
+        matrix = fill_non_numeric(dataset).iloc[:, 1:].to_numpy(dtype=np.float64)
+    if columns < 3:
+        raise ValueError("Input file have less then 3 columns")
+    if columns != len(weights) + 1 or columns != len(signs) + 1:
+        raise ValueError("Number of weights, number of impacts and number of columns not same")
+
+    scores = topsis_scores(matrix, weights, signs)
+    rows = None
+    if top_k is not None:
+        rows, ranks = select_top_k(scores, top_k)
+        scores = scores[rows]
+    else:
+        ranks = rank_scores(scores)
+    if table is not None:
+        table.write_csv(output_file, {'Topsis Score': scores, 'Rank': ranks}, rows=rows)
+    else:
+        if rows is not None:
+            dataset = dataset.iloc[rows].copy()
+        dataset['Topsis Score'] = scores
+        dataset['Rank'] = ranks
+        dataset.to_csv(output_file, index=False)
+    return len(matrix)
+
+
+# Summary row for one job; never raises
+def run_job(job, top_k=None):
+    input_file, weights, impacts, output_file = job
+    start = time.perf_counter()
+    try:
+        rows, status, error = score_file(input_file, weights, impacts, output_file, top_k), 'ok', ''
+    except FileNotFoundError:
+        rows, status, error = None, 'error', f"{input_file} Don't exist!!"
+    except Exception as e:
+        rows, status, error = None, 'error', str(e) or type(e).__name__
+    return {'Input': input_file, 'Output': output_file if status == 'ok' else '', 'Status': status,
+            'Rows': rows, 'Seconds': round(time.perf_counter() - start, 6), 'Error': error}
+
+
+def _run_chunk(jobs, top_k):
+    return [run_job(job, top_k) for job in jobs]
+
+
+# Run every job on workers processes (in this process for one worker), in
+# chunks of several files per task; returns one summary row per job in order
+def run_batch(jobs, workers=None, top_k=None):
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(jobs) <= 1:
+        return _run_chunk(jobs, top_k)
+    size = max(1, min(64, len(jobs) // (workers * 4)))
+    chunks = [jobs[i:i + size] for i in range(0, len(jobs), size)]
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(_run_chunk, chunks, [top_k] * len(chunks))
+        return [row for chunk in results for row in chunk]
+
+
+def write_summary(results, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, SUMMARY_COLUMNS, lineterminator=os.linesep)
+        writer.writeheader()
+        writer.writerows(results)
+    return path
@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+
+from services.topsis_engine import select_top_k
+
+DEFAULT_TOP_N = 50
+HISTOGRAM_BINS = 40
+
+# Result charts built from a bounded summary of the scores instead of one bar
+# per alternative: bars for the top_n best alternatives plus a histogram of
+# every score, binned here so the figure stays a few kB however many rows the
+# result has. Figures are returned as Plotly JSON for Plotly.newPlot in the
+# browser, which loads plotly.js once from plotlyjs_path().
+
+
+def chart_figure(names, scores, ranks, top_n=DEFAULT_TOP_N, bins=HISTOGRAM_BINS):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    scores = np.asarray(scores, dtype=np.float64)
+    idx, _ = select_top_k(np.nan_to_num(scores, nan=-np.inf), top_n)
+    top_names = [str(names[i]) for i in idx]
+    top_ranks = np.asarray(ranks)[idx]
+
+    finite = scores[np.isfinite(scores)]
+    counts, edges = np.histogram(finite, bins=bins, range=(0.0, 1.0))
+    centers = (edges[:-1] + edges[1:]) / 2
+
+    shown = f'Top {len(idx)} of {len(scores)}' if len(idx) < len(scores) else 'All alternatives'
+    fig = make_subplots(rows=2, cols=1, vertical_spacing=0.2,
+                        subplot_titles=(f'TOPSIS Scores by Alternative ({shown})',
+                                        'Score Distribution'))
+    fig.add_trace(go.Bar(x=top_names, y=scores[idx], text=[f'{r:g}' for r in top_ranks],
+                         name='Custom Score'), row=1, col=1)
+    fig.add_trace(go.Bar(x=centers, y=counts, width=edges[1] - edges[0],
+                         name='Alternatives'), row=2, col=1)
+    fig.update_xaxes(title_text='Custom Score', range=[0, 1], row=2, col=1)
+    fig.update_yaxes(title_text='Custom Score', row=1, col=1)
+    fig.update_yaxes(title_text='Alternatives', row=2, col=1)
+    fig.update_layout(showlegend=False, height=800)
+    return fig.to_json()
+
+
+# plotly.js as shipped with the plotly package, served as a static file
+def plotlyjs_path():
+    import plotly
+    return os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js')
+
+
+def write_figure(figure, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(figure)
+    os.replace(tmp_path, path)
+    return path
+
+
+# Path of the cached chart of the result at result_path, rendering it from
+# the result file first if it is missing (e.g. removed by the sweeper)
+def ensure_figure(result_path):
+    from services.result_store import figure_path, read_result_file
+
+    path = figure_path(result_path)
+    if not os.path.isfile(path):
+        data = read_result_file(result_path)
+        write_figure(chart_figure(data.iloc[:, 0].tolist(), data['Custom Score'], data['Rank']), path)
+    return path
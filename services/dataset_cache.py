@@ -0,0 +1,261 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.validators import coerce_numeric_values
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 2 * 1024 * 1024 * 1024
+PARSE_CHUNKSIZE = 100_000
+
+# Parsed-dataset cache keyed by the SHA-256 of the uploaded file.
+#
+# Entries are (headers, dtypes, names, matrix): the column headers, the
+# original criteria dtypes, the first column (alternative names) and the
+# criteria as a read-only float64 matrix. Only
+# datasets whose criteria are all numeric are cached. The in-memory tier is an
+# LRU bounded by bytes. The optional on-disk tier is the columnar form of each
+# upload: <hash>.npy holds the criteria column-major (each column contiguous)
+# and <hash>.json the headers, dtypes and names. Entries read from or written
+# to it hold a read-only np.memmap of the .npy instead of a copy, so the
+# scoring code works on zero-copy views and no process parses the upload twice.
+# The disk tier is bounded by disk_max_bytes: after each write the least
+# recently used datasets (oldest .npy mtime; disk hits touch it) are removed.
+class DatasetCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, cache_dir=None, disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.disk_bytes = 0
+        self.disk_evictions = 0
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = self._read_disk(key)
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._store(key, entry)
+        return entry
+
+    # Store an entry and return it; with a disk tier the returned entry maps
+    # the written .npy, so the parsed copy can be dropped
+    def put(self, key, entry):
+        written = self._write_disk(key, entry)
+        if written is not None:
+            entry = written
+            self.sweep_disk(keep=key)
+        self._store(key, entry)
+        return entry
+
+    def stats(self):
+        with self.lock:
+            return {'hits': self.hits, 'disk_hits': self.disk_hits,
+                    'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self.entries), 'bytes': self.current_bytes,
+                    'max_bytes': self.max_bytes, 'disk_bytes': self.disk_bytes,
+                    'disk_max_bytes': self.disk_max_bytes, 'disk_evictions': self.disk_evictions}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def _store(self, key, entry):
+        size = entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.current_bytes -= entry_size(self.entries.pop(key))
+            self.entries[key] = entry
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.current_bytes -= entry_size(evicted)
+                self.evictions += 1
+
+    def _paths(self, key):
+        return (os.path.join(self.cache_dir, f'{key}.npy'),
+                os.path.join(self.cache_dir, f'{key}.json'))
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        matrix_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            matrix = np.load(matrix_path, mmap_mode='r')
+            os.utime(matrix_path)
+        except (OSError, ValueError):
+            return None
+        return meta['headers'], meta['dtypes'], meta['names'], matrix
+
+    # Remove the least recently used datasets until the disk tier fits in
+    # disk_max_bytes, never the one named by keep. Entries already mapped
+    # stay readable, as the mapping keeps a removed file alive.
+    def sweep_disk(self, keep=None):
+        files = []
+        for item in os.scandir(self.cache_dir):
+            if not item.name.endswith('.npy'):
+                continue
+            key = item.name[:-len('.npy')]
+            try:
+                stat = item.stat()
+            except OSError:
+                continue
+            meta_path = self._paths(key)[1]
+            size = stat.st_size + (os.path.getsize(meta_path) if os.path.isfile(meta_path) else 0)
+            files.append((stat.st_mtime, size, key))
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, key in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            if key == keep:
+                continue
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            evicted += 1
+        with self.lock:
+            self.disk_bytes = total
+            self.disk_evictions += evicted
+
+    def _write_disk(self, key, entry):
+        if not self.cache_dir:
+            return None
+        headers, dtypes, names, matrix = entry
+        matrix_path, meta_path = self._paths(key)
+        # Write to temporary names first so readers never see half a file; the
+        # names are per writer because a background parse and a job may
+        # convert the same upload at once
+        suffix = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(matrix_path + suffix, 'wb') as f:
+            np.save(f, np.asfortranarray(matrix))
+        with open(meta_path + suffix, 'w') as f:
+            json.dump({'headers': headers, 'dtypes': dtypes, 'names': names}, f, default=str)
+        os.replace(matrix_path + suffix, matrix_path)
+        os.replace(meta_path + suffix, meta_path)
+        return headers, dtypes, names, np.load(matrix_path, mmap_mode='r')
+
+
+# Approximate memory held by a cache entry. A memory-mapped matrix counts at
+# its file size: it is read into the page cache when it is scored.
+def entry_size(entry):
+    headers, _, names, matrix = entry
+    return matrix.nbytes + sum(len(str(n)) + 8 for n in names) + sum(len(str(h)) for h in headers)
+
+
+def file_digest(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Parse an upload and validate it as it is read. CSVs are parsed in chunks and
+# each chunk is checked and coerced as soon as it arrives, so a bad file fails
+# at the first offending chunk instead of after a full parse plus a full scan.
+def read_dataset(path, chunksize=PARSE_CHUNKSIZE):
+    import pandas as pd
+
+    if path.endswith('.csv'):
+        chunks, rows = [], 0
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            chunks.append(coerce_numeric_values(chunk, row_offset=rows))
+            rows += len(chunk)
+        if not chunks:
+            return pd.read_csv(path)
+        return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    elif path.endswith('.xlsx'):
+        return coerce_numeric_values(pd.read_excel(path))
+    return None
+
+
+# Build a cache entry from a parsed frame, or None if a criterion is not numeric
+def dataset_entry(data):
+    import pandas as pd
+
+    criteria = data.iloc[:, 1:]
+    if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in criteria.dtypes):
+        return None
+    matrix = criteria.to_numpy(dtype=np.float64)
+    matrix.setflags(write=False)
+    dtypes = [str(dtype) for dtype in criteria.dtypes]
+    return [str(c) for c in data.columns], dtypes, data.iloc[:, 0].tolist(), matrix
+
+
+def entry_frame(entry):
+    import pandas as pd
+
+    headers, dtypes, names, matrix = entry
+    data = pd.DataFrame(matrix, columns=headers[1:], copy=False)
+    # Integer criteria go back to their parsed dtype so results print the same
+    restore = {h: d for h, d in zip(headers[1:], dtypes) if d != 'float64'}
+    if restore:
+        data = data.astype(restore)
+    data.insert(0, headers[0], names)
+    return data
+
+
+default_cache = DatasetCache()
+
+
+# Replace the process-wide cache, e.g. from the Flask config at startup
+def configure_dataset_cache(max_bytes=DEFAULT_MAX_BYTES, cache_dir=None, disk_max_bytes=DEFAULT_DISK_MAX_BYTES):
+    global default_cache
+    default_cache = DatasetCache(max_bytes, cache_dir, disk_max_bytes)
+    return default_cache
+
+
+def get_dataset_cache():
+    return default_cache
+
+
+# Cache entry for an uploaded CSV/XLSX, parsing the file only if no process
+# has converted it yet. Raises NonNumericDataError, naming the offending
+# cells, if a criterion holds something other than numbers. Pass key when the
+# content hash is already known, e.g. from the upload.
+def load_dataset_entry(path, cache=None, key=None):
+    cache = cache or default_cache
+    key = key or file_digest(path)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry
+    data = read_dataset(path)
+    if data is None:
+        return None
+    entry = dataset_entry(data)
+    return cache.put(key, entry) if entry is not None else None
+
+
+# Load an uploaded CSV/XLSX through the cache as a DataFrame
+def load_cached_dataset(path, cache=None, key=None):
+    entry = load_dataset_entry(path, cache, key)
+    return entry_frame(entry) if entry is not None else None
@@ -1,27 +1,269 @@
 from flask import flash
-import smtplib
 import os
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+import queue
+import threading
+import time
+
+from services.metrics import stage
+from services.topsis_engine import rank_scores
+
+# smtplib and the email package are imported when the first message is sent,
+# so starting the app does not pay for them
+
+# How a failed sendmail is handled: 'failed' for a permanent refusal (5xx
+# replies, every recipient refused), which will not succeed on retry and
+# leaves the connection usable; 'retry' for a temporary (4xx) refusal, retried
+# on the same connection; 'reconnect' when the connection itself failed
+def send_error_kind(error):
+    import smtplib
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return 'failed' if codes and all(code >= 500 for code in codes) else 'retry'
+    if isinstance(error, smtplib.SMTPResponseException):
+        if error.smtp_code >= 500:
+            return 'failed'
+        # 421: the server is closing the connection
+        return 'reconnect' if error.smtp_code == 421 else 'retry'
+    return 'reconnect'
+
+# SMTP settings come from the environment so a local debugging server
+# (e.g. `python -m aiosmtpd -n -l localhost:8025` with SMTP_USE_SSL=0) can
+# stand in for Gmail
+def smtp_settings():
+    return {
+        'host': os.getenv('SMTP_HOST', 'smtp.gmail.com'),
+        'port': int(os.getenv('SMTP_PORT', 465)),
+        'use_ssl': os.getenv('SMTP_USE_SSL', '1') not in ('0', 'false', 'False'),
+        'username': os.getenv('SENDER_EMAIL'),
+        'password': os.getenv('EMAIL_PASSWORD'),
+        'timeout': float(os.getenv('SMTP_TIMEOUT', 30)),
+    }
+
+# A small pool of authenticated SMTP connections that are reused between
+# messages instead of logging in again for each one
+class SMTPPool:
+    def __init__(self, host, port, use_ssl=True, username=None, password=None,
+                 timeout=30, size=2, max_idle=60):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.size = size
+        self.max_idle = max_idle
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def connect(self):
+        import smtplib
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = smtp_class(self.host, self.port, timeout=self.timeout)
+        if self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def acquire(self):
+        with self.lock:
+            while self.idle:
+                server, released = self.idle.pop()
+                if time.monotonic() - released < self.max_idle:
+                    return server
+                self._close(server)
+        return self.connect()
+
+    def release(self, server):
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append((server, time.monotonic()))
+                return
+        self._close(server)
+
+    def discard(self, server):
+        self._close(server)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for server, _ in idle:
+            self._close(server)
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+# Background delivery: request handlers enqueue messages and return at once.
+# Worker threads take a burst of up to max_batch queued messages and send them
+# over one pooled connection. A message that fails is dealt with on its own:
+# a permanent refusal is counted as failed, anything else is retried with
+# exponential backoff, and the rest of the burst carries on (on a new
+# connection if the old one broke). Retries wait on a timer rather than in the
+# worker, so they do not hold up other messages.
+class EmailQueue:
+    def __init__(self, pool, workers=None, max_batch=20, max_retries=3, backoff=1.0):
+        self.pool = pool
+        self.workers = workers or pool.size
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.messages = queue.Queue()
+        self.threads = []
+        self.timers = set()
+        self.sent = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'email-worker-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def enqueue(self, sender, recipients, message):
+        self.start()
+        self.messages.put((sender, recipients, message, 0))
+
+    # Block until every queued message, retries included, has been sent or
+    # given up on
+    def flush(self):
+        self.messages.join()
+
+    # Pending retries are dropped and counted as failed
+    def stop(self):
+        with self.lock:
+            threads, self.threads = self.threads, []
+            timers, self.timers = self.timers, set()
+        for timer in timers:
+            timer.cancel()
+            with self.lock:
+                self.failed += 1
+            self.messages.task_done()
+        for _ in threads:
+            self.messages.put(None)
+        for thread in threads:
+            thread.join()
+        self.pool.close()
+
+    def _next_batch(self):
+        item = self.messages.get()
+        if item is None:
+            return None
+        batch = [item]
+        while len(batch) < self.max_batch:
+            try:
+                item = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back for after this batch
+                self.messages.task_done()
+                self.messages.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                self.messages.task_done()
+                return
+            server = None
+            for item in batch:
+                sender, recipients, message, attempt = item
+                if server is None:
+                    try:
+                        server = self.pool.acquire()
+                    except Exception as e:
+                        print("Error connecting to SMTP server:", str(e))
+                        self._retry(item)
+                        continue
+                try:
+                    with stage('smtp'):
+                        server.sendmail(sender, recipients, message)
+                except Exception as e:
+                    print("Error sending email:", str(e))
+                    kind = send_error_kind(e)
+                    if kind == 'failed':
+                        self._give_up()
+                        continue
+                    if kind == 'reconnect':
+                        self.pool.discard(server)
+                        server = None
+                    self._retry(item)
+                    continue
+                with self.lock:
+                    self.sent += 1
+                self.messages.task_done()
+            if server is not None:
+                self.pool.release(server)
+
+    def _give_up(self):
+        with self.lock:
+            self.failed += 1
+        self.messages.task_done()
+
+    # Requeue item after backoff * 2**attempt seconds. The item stays
+    # unfinished in the queue meanwhile, so flush() waits for it.
+    def _retry(self, item):
+        sender, recipients, message, attempt = item
+        if attempt + 1 > self.max_retries:
+            self._give_up()
+            return
+
+        def requeue():
+            with self.lock:
+                if timer not in self.timers:
+                    return
+                self.timers.discard(timer)
+            self.messages.put((sender, recipients, message, attempt + 1))
+            self.messages.task_done()
+
+        timer = threading.Timer(self.backoff * 2 ** attempt, requeue)
+        timer.daemon = True
+        with self.lock:
+            self.timers.add(timer)
+        timer.start()
+
+default_queue = None
+default_queue_lock = threading.Lock()
+
+def get_email_queue():
+    global default_queue
+    with default_queue_lock:
+        if default_queue is None:
+            settings = smtp_settings()
+            pool = SMTPPool(size=int(os.getenv('SMTP_POOL_SIZE', 2)), **settings)
+            default_queue = EmailQueue(pool)
+        return default_queue
 
 def send_otp_email(email, otp):
-    try:
-        server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
-        server.login(os.getenv("SENDER_EMAIL"), os.getenv("EMAIL_PASSWORD"))
-        message = f"Subject: Your OTP Code\n\nYour OTP is: {otp}"
-        server.sendmail(os.getenv("SENDER_EMAIL"), email, message)
-        server.quit()
-    except Exception as e:
-        print("Error sending OTP:", str(e))
+    sender_email = os.getenv("SENDER_EMAIL")
+    message = f"Subject: Your OTP Code\n\nYour OTP is: {otp}"
+    get_email_queue().enqueue(sender_email, [email], message)
 
 def send_email(data, recipient_email):
     if not recipient_email:
         return
+    queue_result_email(data, recipient_email)
+    flash('Your result will be sent to your email address shortly.')
+
+# Build the result email and queue it; safe to call outside a request
+def queue_result_email(data, recipient_email):
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
 
     sender_email = os.getenv("SENDER_EMAIL")
-    password = os.getenv("EMAIL_PASSWORD")
     subject = os.getenv("EMAIL_SUBJECT")
 
     msg = MIMEMultipart()
@@ -32,8 +274,11 @@ def send_email(data, recipient_email):
     body = "Dear User,\n\nAttached is the TOPSIS result CSV file you requested.\n\nBest regards,\nPulkit Arora"
     msg.attach(MIMEText(body, 'plain'))
 
+    # Result files already hold the job's ranks, which for a top-k result
+    # count the rows that were left out
     data_with_rank = data.copy()
-    data_with_rank['Rank'] = data['Custom Score'].rank(ascending=False)
+    if 'Rank' not in data_with_rank:
+        data_with_rank['Rank'] = rank_scores(data['Custom Score'].to_numpy())
     result_csv = data_with_rank.to_csv(index=False)
     attachment = MIMEBase('application', 'octet-stream')
     attachment.set_payload(result_csv.encode('utf-8'))
@@ -41,11 +286,4 @@ def send_email(data, recipient_email):
     attachment.add_header('Content-Disposition', 'attachment', filename='result_with_rank.csv')
     msg.attach(attachment)
 
-    try:
-        server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
-        server.login(sender_email, password)
-        server.sendmail(sender_email, recipient_email, msg.as_string())
-        server.quit()
-        flash('Result has been sent to your email address.')
-    except Exception as e:
-        flash(f'Failed to send email: {str(e)}')
\ No newline at end of file
+    get_email_queue().enqueue(sender_email, [recipient_email], msg.as_string())
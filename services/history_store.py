@@ -0,0 +1,198 @@
+import gzip
+import json
+import struct
+from importlib.util import find_spec
+
+import numpy as np
+
+# zstd needs the zstandard package, imported on first use; without it
+# payloads are gzip-compressed
+HAS_ZSTD = find_spec('zstandard') is not None
+
+MAGIC = b'TPH1'
+DEFAULT_ENCODING = 'zstd' if HAS_ZSTD else 'gzip'
+# Higher levels cost several times the CPU for a few percent on this data
+GZIP_LEVEL = 3
+
+# Binary payloads for history results.
+#
+# A result frame is stored column by column: MAGIC, the length of a JSON
+# header, the header (row count, compression and per column its name, dtype
+# and compressed length) and then each column compressed on its own. Numeric
+# columns are their raw little-endian array bytes, byte-shuffled (all first
+# bytes, then all second bytes, ...) so the compressor sees the slowly varying
+# high bytes together; other columns are a JSON list. A reader can decode
+# only the columns it needs.
+
+
+def compress(raw, encoding):
+    if encoding == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    return gzip.compress(raw, compresslevel=GZIP_LEVEL)
+
+
+def decompress(blob, encoding):
+    if encoding == 'zstd':
+        if not HAS_ZSTD:
+            raise ValueError('This history entry is zstd-compressed; install zstandard to read it')
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(blob)
+    return gzip.decompress(blob)
+
+
+def shuffle(raw, itemsize):
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+
+
+def unshuffle(raw, itemsize):
+    return np.frombuffer(raw, dtype=np.uint8).reshape(itemsize, -1).T.tobytes()
+
+
+def encode_frame(data, encoding=DEFAULT_ENCODING):
+    columns, blobs = [], []
+    for position, name in enumerate(data.columns):
+        series = data.iloc[:, position]
+        if series.dtype.kind in 'biuf':
+            dtype = series.dtype.newbyteorder('<')
+            values = np.ascontiguousarray(series.to_numpy(), dtype=dtype)
+            raw = shuffle(values.view(np.uint8), dtype.itemsize)
+            dtype = dtype.str
+        else:
+            values = series.astype(object).where(series.notna(), None).tolist()
+            raw = json.dumps(values, default=str).encode('utf-8')
+            dtype = 'json'
+        blob = compress(raw, encoding)
+        columns.append({'name': str(name), 'dtype': dtype, 'length': len(blob)})
+        blobs.append(blob)
+    header = json.dumps({'rows': len(data), 'encoding': encoding, 'columns': columns}).encode('utf-8')
+    return b''.join([MAGIC, struct.pack('<I', len(header)), header] + blobs)
+
+
+def read_header(payload):
+    if payload[:4] != MAGIC:
+        raise ValueError('Not a history payload')
+    (length,) = struct.unpack_from('<I', payload, 4)
+    return json.loads(payload[8:8 + length]), 8 + length
+
+
+# Decode a payload into a DataFrame, optionally only the named columns
+def decode_frame(payload, columns=None):
+    import pandas as pd
+
+    header, offset = read_header(payload)
+    data = {}
+    for column in header['columns']:
+        start, offset = offset, offset + column['length']
+        if columns is not None and column['name'] not in columns:
+            continue
+        raw = decompress(payload[start:offset], header['encoding'])
+        if column['dtype'] == 'json':
+            data[column['name']] = json.loads(raw)
+        else:
+            dtype = np.dtype(column['dtype'])
+            data[column['name']] = np.frombuffer(unshuffle(raw, dtype.itemsize), dtype=dtype)
+    return pd.DataFrame(data)
+
+
+# Bring a history table from before these payloads up to date: add the
+# metadata columns (created_at with a CURRENT_TIMESTAMP default) and the
+# (user_id, created_at) index, make result binary and re-encode the CSV text
+# results stored until then. Does nothing on an up-to-date table, so it runs
+# whenever the app starts. Returns the number of results converted.
+def upgrade_history_table(engine, table='history'):
+    import sqlalchemy as sa
+
+    inspector = sa.inspect(engine)
+    if not inspector.has_table(table):
+        return 0
+    existing = {column['name']: column for column in inspector.get_columns(table)}
+    indexes = {index['name'] for index in inspector.get_indexes(table)}
+    created = existing.get('created_at')
+    converted = 0
+    with engine.begin() as connection:
+        # SQLite can neither add a column with a CURRENT_TIMESTAMP default nor
+        # add a default later, so there the table is rebuilt
+        rebuild = engine.dialect.name == 'sqlite' and (created is None or created.get('default') is None)
+        if rebuild:
+            rebuild_sqlite_table(connection, table, existing)
+        else:
+            if created is None:
+                connection.execute(sa.text(
+                    f'ALTER TABLE {table} ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP'))
+            elif created.get('default') is None:
+                connection.execute(sa.text(
+                    f'ALTER TABLE {table} ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP'))
+            for name in ('rows', 'columns', 'result_size'):
+                if name not in existing:
+                    connection.execute(sa.text(f'ALTER TABLE {table} ADD COLUMN "{name}" INTEGER'))
+            connection.execute(sa.text(f'UPDATE {table} SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL'))
+            if engine.dialect.name == 'postgresql' and not isinstance(existing['result']['type'], sa.LargeBinary):
+                connection.execute(sa.text(
+                    f"ALTER TABLE {table} ALTER COLUMN result TYPE BYTEA USING convert_to(result, 'UTF8')"))
+        if rebuild or 'ix_history_user_created' not in indexes:
+            connection.execute(sa.text(f'CREATE INDEX ix_history_user_created ON {table} (user_id, created_at)'))
+
+        # Payloads written by encode_frame always come with result_size
+        legacy = connection.execute(sa.text(
+            f'SELECT id, result FROM {table} WHERE result IS NOT NULL AND result_size IS NULL')).fetchall()
+        for row_id, result in legacy:
+            if not isinstance(result, str):
+                result = bytes(result)
+            if isinstance(result, bytes) and result[:4] == MAGIC:
+                header, _ = read_header(result)
+                payload, data_rows, data_columns = result, header['rows'], len(header['columns'])
+            else:
+                # pandas only for CSV results, so an up-to-date table does not load it
+                import io
+
+                import pandas as pd
+
+                text = result.decode('utf-8') if isinstance(result, bytes) else result
+                data = pd.read_csv(io.StringIO(text))
+                payload, data_rows, data_columns = encode_frame(data), len(data), len(data.columns)
+            connection.execute(
+                sa.text(f'UPDATE {table} SET result = :result, "rows" = :rows, "columns" = :columns, '
+                        'result_size = :size WHERE id = :id'),
+                {'result': payload, 'rows': data_rows, 'columns': data_columns,
+                 'size': len(payload), 'id': row_id})
+            converted += 1
+    return converted
+
+
+
+# Recreate a SQLite history table with the current schema, keeping its rows;
+# rows without a creation time get the time of the upgrade
+def rebuild_sqlite_table(connection, table, existing):
+    import sqlalchemy as sa
+
+    schema = [('id', 'INTEGER NOT NULL PRIMARY KEY'), ('user_id', 'INTEGER NOT NULL REFERENCES user (id)'),
+              ('created_at', 'DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL'), ('dataset_info', 'TEXT'),
+              ('rows', 'INTEGER'), ('columns', 'INTEGER'), ('result_size', 'INTEGER'), ('result', 'BLOB')]
+    names, values = [], []
+    for name, _ in schema:
+        if name == 'created_at':
+            names.append(name)
+            values.append('COALESCE(created_at, CURRENT_TIMESTAMP)' if name in existing else 'CURRENT_TIMESTAMP')
+        elif name in existing:
+            names.append(name)
+            values.append(f'"{name}"')
+    columns = ', '.join(f'"{name}" {definition}' for name, definition in schema)
+    copied = ', '.join(f'"{name}"' for name in names)
+    connection.execute(sa.text(f'CREATE TABLE {table}_upgrade ({columns})'))
+    connection.execute(sa.text(f'INSERT INTO {table}_upgrade ({copied}) SELECT {", ".join(values)} FROM {table}'))
+    connection.execute(sa.text(f'DROP TABLE {table}'))
+    connection.execute(sa.text(f'ALTER TABLE {table}_upgrade RENAME TO {table}'))
+
+
+# python -m services.history_store [database_url]; DATABASE_URL by default
+if __name__ == '__main__':
+    import os
+    import sys
+
+    import sqlalchemy
+
+    url = sys.argv[1] if len(sys.argv) > 1 else os.getenv('DATABASE_URL')
+    if not url:
+        raise SystemExit("USAGE : python -m services.history_store <database_url>")
+    print(f"Converted {upgrade_history_table(sqlalchemy.create_engine(url))} history results")
@@ -0,0 +1,187 @@
+import numpy as np
+
+from services.topsis_engine import ideal_points, parse_impacts, parse_weights, rank_scores
+
+
+# TOPSIS over a dataset that changes a few rows at a time.
+#
+# Keeps the decision matrix in a growable buffer together with the column
+# sums of squares, minima and maxima, and updates those statistics on each
+# insert, delete or update instead of recomputing them over every row. The
+# element-wise squares are kept alongside the matrix so a rescore is three
+# matrix-vector products with no full-size temporaries. Scores are recomputed
+# lazily, and only when the norms or ideal points have moved; an edit that
+# leaves them unchanged rescores just the touched rows.
+#
+# Rows are addressed by key (e.g. the alternative name). Deleting a row moves
+# the last row into its slot, so keys() reflects the current row order.
+class IncrementalTopsis:
+    def __init__(self, matrix, weights, impacts, keys=None):
+        matrix = np.array(matrix, dtype=np.float64, ndmin=2)
+        self.weights = parse_weights(weights)
+        self.impacts = parse_impacts(impacts)
+        if matrix.shape[1] != len(self.weights):
+            raise ValueError("Number of weights, impacts and criteria must match")
+        if keys is None:
+            keys = range(len(matrix))
+        self._keys = list(keys)
+        if len(self._keys) != len(matrix):
+            raise ValueError("Number of keys must match number of rows")
+        self._index = {key: i for i, key in enumerate(self._keys)}
+        if len(self._index) != len(self._keys):
+            raise ValueError("Keys must be unique")
+
+        self._rows = len(matrix)
+        self._data = np.empty((max(self._rows, 16), matrix.shape[1]))
+        self._squares = np.empty_like(self._data)
+        self._data[:self._rows] = matrix
+        np.square(matrix, out=self._squares[:self._rows])
+        self.refresh()
+
+    @property
+    def matrix(self):
+        return self._data[:self._rows]
+
+    def keys(self):
+        return list(self._keys)
+
+    # Recompute the column statistics exactly, discarding accumulated rounding
+    def refresh(self):
+        matrix = self.matrix
+        self._sumsq = self._squares[:self._rows].sum(axis=0)
+        self._min = matrix.min(axis=0) if self._rows else np.full(matrix.shape[1], np.inf)
+        self._max = matrix.max(axis=0) if self._rows else np.full(matrix.shape[1], -np.inf)
+        self._ideal = None
+        self._scores = None
+
+    # Edits are validated in full before anything changes, so a rejected
+    # insert, delete or update leaves the state as it was
+    def _check_rows(self, rows, keys):
+        if rows.ndim != 2 or rows.shape[1] != self._data.shape[1]:
+            raise ValueError("Rows must have one value per criterion")
+        if len(keys) != len(rows):
+            raise ValueError("Number of keys must match number of rows")
+
+    def _slots(self, keys):
+        if len(set(keys)) != len(keys):
+            raise KeyError("Keys must be unique")
+        missing = [key for key in keys if key not in self._index]
+        if missing:
+            raise KeyError(missing[0])
+        return [self._index[key] for key in keys]
+
+    def insert(self, rows, keys):
+        rows = np.array(rows, dtype=np.float64, ndmin=2)
+        keys = list(keys)
+        self._check_rows(rows, keys)
+        if len(set(keys)) != len(keys) or any(key in self._index for key in keys):
+            raise KeyError("Keys must be unique")
+        end = self._rows + len(rows)
+        if end > len(self._data):
+            size = (max(end, 2 * len(self._data)), self._data.shape[1])
+            data, squares = np.empty(size), np.empty(size)
+            data[:self._rows] = self.matrix
+            squares[:self._rows] = self._squares[:self._rows]
+            self._data, self._squares = data, squares
+        self._data[self._rows:end] = rows
+        np.square(rows, out=self._squares[self._rows:end])
+        for offset, key in enumerate(keys):
+            self._index[key] = self._rows + offset
+        self._keys.extend(keys)
+        self._rows = end
+
+        self._sumsq += self._squares[end - len(rows):end].sum(axis=0)
+        self._min = np.minimum(self._min, rows.min(axis=0))
+        self._max = np.maximum(self._max, rows.max(axis=0))
+        self._changed(np.arange(end - len(rows), end))
+
+    def delete(self, keys):
+        keys = list(keys)
+        self._slots(keys)
+        removed = []
+        for key in keys:
+            i = self._index.pop(key)
+            row = self._data[i].copy()
+            last = self._rows - 1
+            if i != last:
+                self._data[i] = self._data[last]
+                self._squares[i] = self._squares[last]
+                moved = self._keys[last]
+                self._keys[i] = moved
+                self._index[moved] = i
+            self._keys.pop()
+            self._rows = last
+            removed.append(row)
+        if not removed:
+            return
+        removed = np.array(removed)
+        self._sumsq = np.maximum(self._sumsq - np.einsum('ij,ij->j', removed, removed), 0.0)
+        self._rescan_extremes(removed)
+        # Rows were moved between slots, so cached per-row scores are stale
+        self._ideal = None
+        self._scores = None
+
+    def update(self, keys, rows):
+        rows = np.array(rows, dtype=np.float64, ndmin=2)
+        keys = list(keys)
+        self._check_rows(rows, keys)
+        slots = np.array(self._slots(keys), dtype=np.intp)
+        old = self._data[slots].copy()
+        self._data[slots] = rows
+        self._squares[slots] = np.square(rows)
+        self._sumsq = np.maximum(
+            self._sumsq - np.einsum('ij,ij->j', old, old) + np.einsum('ij,ij->j', rows, rows), 0.0)
+        self._min = np.minimum(self._min, rows.min(axis=0))
+        self._max = np.maximum(self._max, rows.max(axis=0))
+        self._rescan_extremes(old)
+        self._changed(slots)
+
+    def scores(self):
+        if self._scores is None:
+            self._ideal = self._ideal_points()
+            self._scores = self._score_slots(slice(0, self._rows))
+        return self._scores.copy()
+
+    def ranks(self):
+        return rank_scores(self.scores())
+
+    # d^2 = sum_j (s_j x_ij - p_j)^2 = x^2 @ s^2 - 2 x @ (s p) + p . p
+    def _score_slots(self, slots):
+        _, scale, best, worst = self._ideal
+        matrix, squares = self._data[slots], self._squares[slots]
+        base = squares @ np.square(scale)
+        d_best = np.sqrt(np.maximum(base - 2 * (matrix @ (scale * best)) + best @ best, 0.0))
+        d_worst = np.sqrt(np.maximum(base - 2 * (matrix @ (scale * worst)) + worst @ worst, 0.0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return d_worst / (d_best + d_worst)
+
+    def _ideal_points(self):
+        return ideal_points((self._sumsq, self._min, self._max), self.weights, self.impacts)
+
+    # Columns whose min or max was held by a removed value are scanned again
+    def _rescan_extremes(self, removed):
+        matrix = self.matrix
+        stale = (removed <= self._min).any(axis=0) | (removed >= self._max).any(axis=0)
+        for j in np.flatnonzero(stale):
+            if self._rows:
+                self._min[j] = matrix[:, j].min()
+                self._max[j] = matrix[:, j].max()
+            else:
+                self._min[j], self._max[j] = np.inf, -np.inf
+
+    # Rescore only the given slots if the norms and ideal points did not move,
+    # otherwise drop the cached scores so the next read recomputes them
+    def _changed(self, slots):
+        if self._scores is None or self._ideal is None:
+            self._scores = None
+            return
+        ideal = self._ideal_points()
+        if all(np.array_equal(a, b) for a, b in zip(ideal, self._ideal)):
+            scores = np.empty(self._rows)
+            scores[:len(self._scores)] = self._scores[:self._rows]
+            self._ideal = ideal
+            scores[slots] = self._score_slots(slots)
+            self._scores = scores
+        else:
+            self._ideal = None
+            self._scores = None
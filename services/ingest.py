@@ -0,0 +1,126 @@
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Request, current_app
+
+from services.dataset_cache import file_digest, load_cached_dataset
+from utils.validators import coerce_numeric_values
+
+HEAD_BYTES = 256 * 1024
+SNIFF_ROWS = 1000
+
+# File object handed to Werkzeug's multipart parser: the uploaded part is
+# written straight into a temporary file in the upload folder as it arrives,
+# hashed on the way and its first bytes kept for sniffing. commit() moves it
+# into place under its hash, so the upload is never copied or read back just
+# to hash it.
+class UploadSpool:
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile('wb+', dir=directory, suffix='.part', delete=False)
+        self.digest = hashlib.sha256()
+        self.head = bytearray()
+        self.committed = False
+
+    def write(self, data):
+        self.digest.update(data)
+        if len(self.head) < HEAD_BYTES:
+            self.head += data[:HEAD_BYTES - len(self.head)]
+        return self.file.write(data)
+
+    def commit(self, directory, extension):
+        self.file.flush()
+        self.file.close()
+        digest = self.digest.hexdigest()
+        path = os.path.join(directory, digest + extension)
+        os.replace(self.file.name, path)
+        self.committed = True
+        return path, digest, bytes(self.head)
+
+    def close(self):
+        self.file.close()
+        if not self.committed:
+            try:
+                os.remove(self.file.name)
+            except OSError:
+                pass
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+# Request class that spools file uploads through UploadSpool
+class StreamingUploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool(current_app.config['UPLOAD_FOLDER'])
+
+# Save an uploaded FileStorage in folder, named by its SHA-256 with the
+# extension of filename, and return (path, digest, head). Uploads are never
+# saved under the name the client sent: two users uploading the same filename
+# would overwrite each other's file, and the file at a path would no longer
+# match the digest the dataset cache keys it by. Uploads that did not come
+# through UploadSpool are saved to a temporary file and hashed from disk.
+def save_upload(file, folder, filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if isinstance(file.stream, UploadSpool):
+        return file.stream.commit(folder, extension)
+    os.makedirs(folder, exist_ok=True)
+    spool = tempfile.NamedTemporaryFile(dir=folder, suffix='.part', delete=False)
+    spool.close()
+    try:
+        file.save(spool.name)
+        digest = file_digest(spool.name)
+        path = os.path.join(folder, digest + extension)
+        os.replace(spool.name, path)
+    except BaseException:
+        if os.path.exists(spool.name):
+            os.remove(spool.name)
+        raise
+    return path, digest, None
+
+# Column names of an upload from its first rows, validated so a bad first
+# chunk is reported right away. CSVs are sniffed from the bytes captured while
+# spooling; XLSX files read only the first rows of the sheet.
+def sniff_columns(path, head=None):
+    import pandas as pd
+
+    if path.endswith('.csv'):
+        if head is None:
+            with open(path, 'rb') as f:
+                head = f.read(HEAD_BYTES)
+        if len(head) >= HEAD_BYTES and b'\n' in head:
+            # Drop the last line, which may have been cut in half
+            head = head[:head.rindex(b'\n') + 1]
+        sample = pd.read_csv(io.BytesIO(head), nrows=SNIFF_ROWS)
+    elif path.endswith('.xlsx'):
+        sample = pd.read_excel(path, nrows=SNIFF_ROWS)
+    else:
+        return None
+    return coerce_numeric_values(sample).columns[1:]
+
+ingest_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ingest')
+ingest_pending = {}
+ingest_lock = threading.Lock()
+
+# Parse the rest of an upload into the dataset cache in the background while
+# the user fills in the weights form
+def start_background_parse(path, key=None):
+    with ingest_lock:
+        pending = ingest_pending.get((path, key))
+        if pending is not None and not pending.done():
+            return pending
+        future = ingest_executor.submit(_parse_into_cache, path, key)
+        ingest_pending[(path, key)] = future
+    return future
+
+def _parse_into_cache(path, key):
+    try:
+        load_cached_dataset(path, key=key)
+    except Exception as e:
+        print(f"Background parse of {path} failed:", str(e))
+    finally:
+        with ingest_lock:
+            ingest_pending.pop((path, key), None)
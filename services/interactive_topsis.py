@@ -0,0 +1,53 @@
+import numpy as np
+
+from services.topsis_engine import normalize_columns, parse_impacts, parse_weights, rank_scores, select_top_k
+
+
+# TOPSIS for a fixed matrix and impacts whose weights change interactively
+# (e.g. sliders).
+#
+# With non-negative weights the ideal points of the weighted normalized matrix
+# are the weights times the best and worst normalized values, so
+#   d_best_i^2 = sum_j w_j^2 (x_ij - b_j)^2
+# and the squared deviations (x_ij - b_j)^2 and (x_ij - w_j)^2 do not depend on
+# the weights. They are computed once, as one read-only 2 x N x M array, and
+# every rescore is a single matrix-vector product with the squared weights:
+# no normalization, no full-size temporaries. Scores equal topsis_scores.
+class InteractiveTopsis:
+    def __init__(self, matrix, impacts):
+        normalized = normalize_columns(matrix)
+        if normalized.ndim != 2:
+            raise ValueError("Decision matrix must be two-dimensional")
+        self.signs = parse_impacts(impacts)
+        if len(self.signs) != normalized.shape[1]:
+            raise ValueError("Number of impacts and criteria must match")
+        col_min, col_max = normalized.min(axis=0), normalized.max(axis=0)
+        best = np.where(self.signs > 0, col_max, col_min)
+        worst = np.where(self.signs > 0, col_min, col_max)
+        self.deviations = np.empty((2,) + normalized.shape)
+        np.square(normalized - best, out=self.deviations[0])
+        np.square(normalized - worst, out=self.deviations[1])
+        self.deviations.setflags(write=False)
+
+    @property
+    def shape(self):
+        return self.deviations.shape[1:]
+
+    def scores(self, weights):
+        weights = parse_weights(weights)
+        if len(weights) != self.shape[1]:
+            raise ValueError("Number of weights and criteria must match")
+        if (weights < 0).any():
+            raise ValueError("Weights must not be negative")
+        d_best, d_worst = np.sqrt(self.deviations @ np.square(weights))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return d_worst / (d_best + d_worst)
+
+    def ranks(self, weights):
+        return rank_scores(self.scores(weights))
+
+    # (rows, scores, ranks) of the k best rows, best first
+    def top_k(self, weights, k):
+        scores = self.scores(weights)
+        rows, ranks = select_top_k(scores, k)
+        return rows, scores[rows], ranks
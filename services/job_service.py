@@ -0,0 +1,269 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from services.result_store import figure_path, write_result_file
+from services.dataset_cache import entry_frame
+from services.metrics import (JOB_RSS_GROWTH, PEAK_RSS, Timings, current_rss_bytes, observe_stages, peak_rss_bytes,
+                              rss_growth)
+from utils.file_helpers import load_input_entry
+from utils.validators import NonNumericDataError, validate_weights_impacts
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_RESULT_TTL = 3600
+DEFAULT_PER_TENANT = 2
+
+# Raised inside a job for problems with the user's input; the message is
+# shown to the user as is
+class JobError(Exception):
+    pass
+
+# Raised by JobManager.submit when a tenant already has its share of jobs
+class TooManyJobs(Exception):
+    pass
+
+# Progress queue of the current worker process, set by the pool initializer
+progress_queue = None
+
+def init_worker(queue):
+    global progress_queue
+    progress_queue = queue
+
+def report(job_id, stage, progress):
+    if progress_queue is not None:
+        progress_queue.put((job_id, stage, progress))
+
+# The cached dataset entry of an upload, with load problems raised as JobError
+def load_job_entry(file_path, dataset_key=None):
+    try:
+        entry = load_input_entry(file_path, dataset_key)
+    except FileNotFoundError:
+        raise JobError('File not found. Please upload the dataset again.')
+    except NonNumericDataError as e:
+        raise JobError(str(e))
+    if entry is None:
+        raise JobError('File not found or invalid.')
+    return entry
+
+# The /process pipeline: load, validate, score, render the chart and write the
+# result CSV. Runs in a pool worker, so it must stay importable at top level.
+# The chart is cached next to the result as Plotly JSON rather than returned.
+# The stage timings, the worker's peak RSS and how much its RSS grew over the
+# job go back with the result. With
+# top_k only the best top_k rows are written, ranked as in select_top_k.
+def run_topsis_job(job_id, file_path, weights, impacts, result_path, dataset_key=None, top_k=None):
+    from services.charts import chart_figure, write_figure
+    from services.parallel_topsis import score_matrix
+    from services.topsis_service import rank_dataset
+
+    timings = Timings()
+    rss = current_rss_bytes()
+    report(job_id, 'loading', 0.1)
+    with timings.stage('load'):
+        entry = load_job_entry(file_path, dataset_key)
+    headers, _, _, matrix = entry
+
+    # Non-numeric criteria were rejected while the upload was parsed
+    report(job_id, 'validating', 0.3)
+    with timings.stage('validate'):
+        if len(headers) - 1 != len(weights) or len(headers) - 1 != len(impacts):
+            raise JobError('The number of weights and impacts must match the dataset criteria.')
+        if not validate_weights_impacts(','.join(weights), ','.join(impacts), len(headers)):
+            raise JobError('Invalid weights or impacts.')
+
+    # Scored straight from the cached matrix, a memmap of the columnar file
+    # when the dataset cache has a disk tier, on SCORING_WORKERS shards
+    report(job_id, 'scoring', 0.5)
+    with timings.stage('score'):
+        scores = score_matrix(matrix, ','.join(weights), ','.join(impacts))
+        data = rank_dataset(entry_frame(entry), scores, top_k)
+
+    report(job_id, 'rendering', 0.7)
+    with timings.stage('chart'):
+        figure = chart_figure(data.iloc[:, 0].tolist(), data['Custom Score'].to_numpy(), data['Rank'])
+
+    report(job_id, 'saving', 0.9)
+    with timings.stage('csv'):
+        write_result_file(data, result_path)
+        write_figure(figure, figure_path(result_path))
+    return {'result_path': result_path, 'timings': timings.stages, 'peak_rss': peak_rss_bytes(),
+            'rss_growth': rss_growth(rss)}
+
+# The /sensitivity pipeline for analyses too large to answer in the request:
+# run rank_stability with options and write one row of rank statistics per
+# alternative as the result. No chart is rendered for it. Timings and memory
+# are reported as for run_topsis_job.
+def run_sensitivity_job(job_id, file_path, weights, impacts, result_path, dataset_key=None, options=None):
+    import pandas as pd
+    from services.sensitivity import rank_stability, stability_records
+
+    timings = Timings()
+    rss = current_rss_bytes()
+    report(job_id, 'loading', 0.1)
+    with timings.stage('load'):
+        entry = load_job_entry(file_path, dataset_key)
+    _, _, names, matrix = entry
+
+    report(job_id, 'sampling', 0.3)
+    try:
+        with timings.stage('sensitivity'):
+            stats = rank_stability(matrix, ','.join(weights), ','.join(impacts), **(options or {}))
+    except ValueError as e:
+        raise JobError(str(e))
+
+    report(job_id, 'saving', 0.9)
+    with timings.stage('csv'):
+        write_result_file(pd.DataFrame(stability_records(names, stats)), result_path)
+    return {'result_path': result_path, 'figure': False, 'timings': timings.stages,
+            'peak_rss': peak_rss_bytes(), 'rss_growth': rss_growth(rss)}
+
+# Runs TOPSIS jobs on a process pool so large uploads do not tie up a Flask
+# worker. Each tenant may have at most per_tenant jobs queued or running, so
+# one user cannot fill the pool. Finished jobs are kept for result_ttl seconds.
+class JobManager:
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, result_ttl=DEFAULT_RESULT_TTL,
+                 per_tenant=DEFAULT_PER_TENANT):
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.per_tenant = per_tenant
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.executor = None
+        self.progress = None
+
+    def _ensure_pool(self):
+        if self.executor is None:
+            self.progress = multiprocessing.Queue()
+            self.executor = ProcessPoolExecutor(
+                self.max_workers, initializer=init_worker, initargs=(self.progress,))
+            threading.Thread(target=self._watch_progress, daemon=True).start()
+
+    def _watch_progress(self):
+        while True:
+            item = self.progress.get()
+            if item is None:
+                return
+            job_id, stage, progress = item
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is not None and job['state'] in ('queued', 'running'):
+                    job.update(state='running', stage=stage, progress=progress)
+
+    # Submit func(job_id, *args) for tenant; on_done(job) is called in this
+    # process once the job has finished or failed. Pass job_id to choose the
+    # id up front, e.g. to name the job's result file.
+    def submit(self, tenant, func, *args, on_done=None, job_id=None):
+        self.sweep()
+        with self.lock:
+            active = sum(1 for job in self.jobs.values()
+                         if job['tenant'] == tenant and job['state'] in ('queued', 'running'))
+            if active >= self.per_tenant:
+                raise TooManyJobs('You already have jobs running. Please wait for them to finish.')
+            self._ensure_pool()
+            job_id = job_id or new_job_id()
+            job = {'id': job_id, 'tenant': tenant, 'kind': func.__name__, 'state': 'queued',
+                   'stage': 'queued', 'progress': 0.0, 'result': None, 'error': None,
+                   'created': time.time(), 'finished': None}
+            self.jobs[job_id] = job
+        future = self.executor.submit(func, job_id, *args)
+        future.add_done_callback(lambda f: self._finish(job_id, f, on_done))
+        return job_id
+
+    # Record a job whose result already exists, e.g. a memoized one, as done
+    # without running anything. result['result_id'] names the stored result
+    # it hands back. on_done(job) runs on a background thread, as it would
+    # for a submitted job, so the caller does not wait for it.
+    def complete(self, tenant, job_id, result, on_done=None):
+        self.sweep()
+        now = time.time()
+        with self.lock:
+            job = {'id': job_id, 'tenant': tenant, 'state': 'done', 'stage': 'done',
+                   'progress': 1.0, 'result': result, 'error': None,
+                   'created': now, 'finished': now}
+            self.jobs[job_id] = job
+        if on_done is not None:
+            threading.Thread(target=self._callback, args=(dict(job), on_done), daemon=True).start()
+        return job_id
+
+    def _finish(self, job_id, future, on_done):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            error = future.exception()
+            if error is None:
+                job.update(state='done', stage='done', progress=1.0, result=future.result())
+                self._observe(job)
+            else:
+                message = str(error) if isinstance(error, JobError) else 'Processing failed.'
+                job.update(state='failed', stage='failed', error=message)
+                if not isinstance(error, JobError):
+                    print(f"Job {job_id} failed:", repr(error))
+            job['finished'] = time.time()
+        if on_done is not None:
+            self._callback(job, on_done)
+
+    def _callback(self, job, on_done):
+        try:
+            on_done(job)
+        except Exception as e:
+            print(f"Job {job['id']} callback failed:", str(e))
+
+    # Jobs may report their stage timings, peak RSS and RSS growth with their
+    # result; the growth is recorded under the job's function name
+    def _observe(self, job):
+        result = job['result']
+        if not isinstance(result, dict):
+            return
+        observe_stages(result.get('timings', ()))
+        if result.get('peak_rss'):
+            PEAK_RSS.set_max(result['peak_rss'], 'job')
+        if result.get('rss_growth') is not None:
+            JOB_RSS_GROWTH.observe(result['rss_growth'], job['kind'])
+
+    def get(self, job_id):
+        self.sweep()
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    # Drop finished jobs whose results have outlived the TTL
+    def sweep(self):
+        cutoff = time.time() - self.result_ttl
+        with self.lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job['finished'] is not None and job['finished'] < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+        return expired
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.progress.put(None)
+            self.executor = None
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+# Id of the stored result of a finished job: its own, or the earlier result a
+# completed job hands back
+def job_result_id(job):
+    return job['result'].get('result_id', job['id'])
+
+default_manager = None
+
+def configure_jobs(max_workers=DEFAULT_MAX_WORKERS, result_ttl=DEFAULT_RESULT_TTL,
+                   per_tenant=DEFAULT_PER_TENANT):
+    global default_manager
+    default_manager = JobManager(max_workers, result_ttl, per_tenant)
+    return default_manager
+
+def get_job_manager():
+    global default_manager
+    if default_manager is None:
+        default_manager = JobManager(int(os.getenv('JOBS_MAX_WORKERS', DEFAULT_MAX_WORKERS)))
+    return default_manager
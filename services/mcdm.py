@@ -0,0 +1,199 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from services.topsis_engine import (column_stats, ideal_points, parse_impacts, parse_weights, rank_scores,
+                                    score_rows)
+
+# Prepared datasets kept per content hash; each holds up to a few normalized
+# copies of its matrix, so only a handful are cached
+DEFAULT_PREPARED_ENTRIES = 4
+
+# Several MCDM methods on one decision matrix.
+#
+# A dataset is prepared once: the column minima, maxima and sums of squares
+# come from one column_stats pass, and the normalized matrices the methods
+# need (linear normalization for WSM/WPM, the distance to the best value for
+# VIKOR; TOPSIS folds its vector normalization into per-column factors) are
+# derived from them on first use and kept with the dataset. Methods then only
+# apply the weights to a shared normalized matrix, so scoring four methods
+# costs one parse and one stats pass plus a few vector operations each.
+#
+# Methods are registered with register_method; each takes (prepared, weights,
+# signs) with weights summing to 1 and signs +1/-1 and returns one value per
+# row. Methods whose values are better when lower (VIKOR's Q) say so, and
+# their ranks are counted from the lowest value.
+
+
+class Method:
+    def __init__(self, name, label, func, lower_is_better=False):
+        self.name = name
+        self.label = label
+        self.func = func
+        self.lower_is_better = lower_is_better
+
+    def rank(self, values):
+        return rank_scores(-values if self.lower_is_better else values)
+
+
+METHODS = {}
+
+
+def register_method(name, label, lower_is_better=False):
+    def register(func):
+        METHODS[name] = Method(name, label, func, lower_is_better)
+        return func
+    return register
+
+
+def get_method(name):
+    method = METHODS.get(name)
+    if method is None:
+        raise ValueError(f"Unknown method {name!r}, expected one of {', '.join(METHODS)}")
+    return method
+
+
+# A decision matrix with the per-column statistics and normalized matrices
+# shared by every method. Normalized matrices depend only on the data (and the
+# impacts for linear normalization), not on the weights.
+class PreparedMatrix:
+    def __init__(self, matrix):
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        if self.matrix.ndim != 2:
+            raise ValueError("Decision matrix must be two-dimensional")
+        self.stats = column_stats(self.matrix)
+        _, self.col_min, self.col_max = self.stats
+        self.normalized = {}
+        self.lock = threading.Lock()
+
+    def _cached(self, key, build):
+        with self.lock:
+            value = self.normalized.get(key)
+        if value is None:
+            value = build()
+            value.setflags(write=False)
+            with self.lock:
+                value = self.normalized.setdefault(key, value)
+        return value
+
+    # Benefit columns as x / max, cost columns as min / x, so 1 is the best
+    # value of each column (WSM, WPM). A zero cost is treated as the best.
+    def linear(self, signs):
+        def build():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                benefit = self.matrix / np.where(self.col_max == 0, 1.0, self.col_max)
+                cost = np.where(self.matrix == 0, 1.0, self.col_min / self.matrix)
+            return np.where(signs > 0, benefit, cost)
+        return self._cached(('linear', tuple(signs)), build)
+
+    # (best - x) / (best - worst) per column: 0 at the best value, 1 at the
+    # worst (VIKOR). Constant columns are 0 everywhere.
+    def regret(self, signs):
+        def build():
+            spread = self.col_max - self.col_min
+            distance = np.where(signs > 0, self.col_max - self.matrix, self.matrix - self.col_min)
+            return distance / np.where(spread == 0, 1.0, spread)
+        return self._cached(('regret', tuple(signs)), build)
+
+
+# TOPSIS as in services.topsis_engine: the vector normalization is folded
+# into one scale factor per column, computed from the shared column stats
+@register_method('topsis', 'TOPSIS Score')
+def topsis(prepared, weights, signs):
+    _, scale, best, worst = ideal_points(prepared.stats, weights, signs)
+    return score_rows(prepared.matrix, scale, best, worst)
+
+
+# Weighted sum model
+@register_method('wsm', 'WSM Score')
+def wsm(prepared, weights, signs):
+    return prepared.linear(signs) @ weights
+
+
+# Weighted product model, as exp(sum w log r) so it stays one matrix product;
+# a zero normalized value makes the score 0 and criteria with no weight are
+# left out. Ratios of negative values have no meaningful power, so data with
+# negative values is rejected rather than scored as NaN.
+@register_method('wpm', 'WPM Score')
+def wpm(prepared, weights, signs):
+    if (prepared.col_min < 0).any():
+        raise ValueError("WPM needs criteria values of 0 or more; choose other methods for data with negative values")
+    with np.errstate(divide='ignore'):
+        logs = np.log(prepared.linear(signs))
+    return np.exp(np.where(weights > 0, logs, 0.0) @ weights)
+
+
+# VIKOR compromise ranking with v = 0.5: S is the weighted sum of regrets, R
+# the largest weighted regret and Q blends how far each is from the best
+# alternative's
+@register_method('vikor', 'VIKOR Q', lower_is_better=True)
+def vikor(prepared, weights, signs, v=0.5):
+    regret = prepared.regret(signs)
+    s = regret @ weights
+    r = (regret * weights).max(axis=1)
+
+    def spread(values):
+        low, high = values.min(), values.max()
+        return (values - low) / (high - low) if high > low else np.zeros_like(values)
+
+    return v * spread(s) + (1 - v) * spread(r)
+
+
+prepared_cache = OrderedDict()
+prepared_lock = threading.Lock()
+prepared_entries = DEFAULT_PREPARED_ENTRIES
+
+
+def configure_prepared_cache(entries=DEFAULT_PREPARED_ENTRIES):
+    global prepared_entries
+    with prepared_lock:
+        prepared_entries = entries
+        prepared_cache.clear()
+
+
+# PreparedMatrix for matrix, reused across requests when key (the dataset's
+# content hash) is given
+def prepare(matrix, key=None):
+    if key is None:
+        return PreparedMatrix(matrix)
+    with prepared_lock:
+        prepared = prepared_cache.get(key)
+        if prepared is not None:
+            prepared_cache.move_to_end(key)
+            return prepared
+    prepared = PreparedMatrix(matrix)
+    with prepared_lock:
+        prepared_cache[key] = prepared
+        while len(prepared_cache) > prepared_entries:
+            prepared_cache.popitem(last=False)
+    return prepared
+
+
+# Values and ranks of every requested method: {name: (values, ranks)}
+def method_scores(matrix, weights, impacts, methods=('topsis',), key=None):
+    methods = [get_method(name) for name in methods]
+    prepared = prepare(matrix, key)
+    weights = parse_weights(weights)
+    signs = parse_impacts(impacts)
+    if not (len(weights) == len(signs) == prepared.matrix.shape[1]):
+        raise ValueError("Number of weights, impacts and criteria must match")
+    total = weights.sum()
+    if total <= 0:
+        raise ValueError("Weights must add up to more than 0")
+    weights = weights / total
+    results = {}
+    for method in methods:
+        values = method.func(prepared, weights, signs)
+        results[method.name] = (values, method.rank(values))
+    return results
+
+
+# method_scores output as one JSON-ready dict per alternative, with a
+# '<method>' value and a '<method>_rank' column per method
+def method_records(names, results):
+    columns = []
+    for name, (values, ranks) in results.items():
+        columns += [(name, values.tolist()), (f'{name}_rank', ranks.tolist())]
+    keys = ['name'] + [key for key, _ in columns]
+    return [dict(zip(keys, row)) for row in zip(names, *[values for _, values in columns])]
@@ -0,0 +1,249 @@
+import bisect
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Seconds; the Prometheus client's defaults plus a few long buckets for big uploads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes; 1 MiB to 4 GiB in steps of four
+RSS_BUCKETS = tuple(float(4 ** n * 1024 * 1024) for n in range(7))
+
+# Lightweight instrumentation without a metrics client library.
+#
+# Code wraps its stages in stage(name) (or a Timings object where there is no
+# request, e.g. in job workers, which send their timings back with the job
+# result). Each stage is one perf_counter pair and a locked bisect into a
+# histogram. init_metrics(app) adds the per-request part: the stages of the
+# request, and the request's total, go out as a Server-Timing header, request
+# durations and the process's peak RSS are recorded, and /metrics serves
+# everything in the Prometheus text format. Metrics are per process.
+#
+# The peak RSS is a lifetime high-water mark, so it cannot say which request
+# or job used the memory. The resident set size is also sampled from
+# /proc/self/statm before and after each request, and by job workers around
+# each job since pool workers are reused, and the growth goes into histograms
+# labelled by endpoint and by job. Concurrent requests in one process share
+# the samples, so a request's growth may include its neighbours'.
+
+
+class Histogram:
+    def __init__(self, name, help, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, label_value):
+        with self.lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            series = {k: (list(v[0]), v[1]) for k, v in sorted(self.series.items())}
+        for label_value, (counts, total) in series.items():
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label},le="{le}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label}}} {total!r}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help, label):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def set_max(self, value, label_value):
+        with self.lock:
+            self.values[label_value] = max(self.values.get(label_value, 0), value)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge']
+        with self.lock:
+            values = sorted(self.values.items())
+        lines += [f'{self.name}{{{self.label}="{_escape(k)}"}} {v}' for k, v in values]
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+STAGE_SECONDS = Histogram('topsis_stage_duration_seconds', 'Time spent in each pipeline stage.', 'stage')
+REQUEST_SECONDS = Histogram('topsis_request_duration_seconds', 'Time to answer a request.', 'endpoint')
+PEAK_RSS = Gauge('topsis_peak_rss_bytes', 'Peak resident set size seen so far.', 'process')
+REQUEST_RSS_GROWTH = Histogram('topsis_request_rss_growth_bytes',
+                               'Growth of the resident set size over a request.', 'endpoint', RSS_BUCKETS)
+JOB_RSS_GROWTH = Histogram('topsis_job_rss_growth_bytes',
+                           'Growth of the job worker resident set size over a job.', 'job', RSS_BUCKETS)
+
+# Functions returning (name, type, help, value) tuples rendered with the rest,
+# e.g. cache counters
+collectors = []
+
+
+def register_collector(func):
+    collectors.append(func)
+    return func
+
+
+# Stage durations of one request or job, in the order they ran
+class Timings:
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append((name, time.perf_counter() - start))
+
+    def server_timing(self):
+        return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.stages)
+
+
+current = threading.local()
+
+
+# Time a stage of the current request; outside a request only the histogram
+# is updated
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, name)
+        timings = getattr(current, 'timings', None)
+        if timings is not None:
+            timings.stages.append((name, seconds))
+
+
+# Record (name, seconds) stages timed elsewhere, e.g. in a job worker
+def observe_stages(stages):
+    for name, seconds in stages:
+        STAGE_SECONDS.observe(seconds, name)
+
+
+# Report stages timed elsewhere in the current request's Server-Timing header
+def add_server_timing(stages, prefix=''):
+    timings = getattr(current, 'timings', None)
+    if timings is not None:
+        timings.stages.extend((prefix + name, seconds) for name, seconds in stages)
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Resident set size now, from /proc/self/statm; None where that is not
+# available
+def current_rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# Growth of the resident set size since before, a current_rss_bytes()
+# sample; None when it cannot be measured
+def rss_growth(before):
+    after = current_rss_bytes()
+    if before is None or after is None:
+        return None
+    return max(after - before, 0)
+
+
+# Counters of the result memo and the dataset cache
+def cache_metrics():
+    from services.dataset_cache import get_dataset_cache
+    from services.result_memo import get_result_memo
+
+    memo, datasets = get_result_memo().stats(), get_dataset_cache().stats()
+    return [
+        ('topsis_result_memo_hits_total', 'counter', 'Requests answered from a memoized result.', memo['hits']),
+        ('topsis_result_memo_misses_total', 'counter', 'Requests that had to be computed.', memo['misses']),
+        ('topsis_result_memo_entries', 'gauge', 'Memoized results.', memo['entries']),
+        ('topsis_dataset_cache_hits_total', 'counter', 'Dataset cache hits in memory.', datasets['hits']),
+        ('topsis_dataset_cache_disk_hits_total', 'counter', 'Dataset cache hits on disk.', datasets['disk_hits']),
+        ('topsis_dataset_cache_misses_total', 'counter', 'Uploads that had to be parsed.', datasets['misses']),
+        ('topsis_dataset_cache_bytes', 'gauge', 'Bytes held by the dataset cache.', datasets['bytes']),
+        ('topsis_dataset_cache_disk_bytes', 'gauge', 'Bytes of the dataset cache on disk.', datasets['disk_bytes']),
+    ]
+
+
+def render():
+    lines = (STAGE_SECONDS.render() + REQUEST_SECONDS.render() + PEAK_RSS.render()
+             + REQUEST_RSS_GROWTH.render() + JOB_RSS_GROWTH.render())
+    for collector in collectors:
+        for name, kind, help, value in collector():
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app, enabled=True):
+    from flask import Response, request
+
+    if not enabled:
+        return
+    if cache_metrics not in collectors:
+        register_collector(cache_metrics)
+
+    @app.before_request
+    def start_timings():
+        current.timings = Timings()
+        current.start = time.perf_counter()
+        current.rss = current_rss_bytes()
+
+    @app.after_request
+    def finish_timings(response):
+        timings = getattr(current, 'timings', None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - current.start
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_SECONDS.observe(total, endpoint)
+        growth = rss_growth(current.rss)
+        if growth is not None:
+            REQUEST_RSS_GROWTH.observe(growth, endpoint)
+        peak = peak_rss_bytes()
+        if peak is not None:
+            PEAK_RSS.set_max(peak, 'web')
+        timings.stages.append(('total', total))
+        response.headers['Server-Timing'] = timings.server_timing()
+        current.timings = None
+        return response
+
+    def metrics():
+        return Response(render(), mimetype='text/plain; version=0.0.4')
+
+    app.add_url_rule('/metrics', 'metrics', metrics)
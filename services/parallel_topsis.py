@@ -0,0 +1,204 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import reduce
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from services.topsis_engine import (column_stats, ideal_points, merge_stats, parse_dtype, score_rows,
+                                    score_rows_inplace, topsis_scores)
+
+# Below this many rows one vectorized call beats handing out shards
+DEFAULT_MIN_ROWS = 50_000
+BACKENDS = ('thread', 'process')
+
+# Row-sharded TOPSIS on several cores.
+#
+# Column norms and ideal points need every row, but they come from per-column
+# sums of squares, minima and maxima, which are computed per shard and merged.
+# After that each row's distances are independent, so the shards are scored
+# in parallel into one output vector.
+#
+# The thread backend shares the arrays directly; NumPy releases the GIL inside
+# the reductions and element-wise kernels that do the work. The process
+# backend never pickles the matrix: a memory-mapped matrix (see
+# services.dataset_cache) is reopened from its file by each worker, anything
+# else is copied once into a SharedMemory block, and the scores are written
+# into shared memory as well.
+#
+# With dtype float32 each shard is scored by score_rows_inplace into a float32
+# output, with one block buffer per shard instead of full-size temporaries.
+
+
+def shard_bounds(rows, shards):
+    edges = np.linspace(0, rows, shards + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+# Describe where a worker process can find an array without pickling it:
+# ('file', ...) for a memmap, ('shm', ...) for a SharedMemory block
+def _array_spec(array, shm=None):
+    if shm is not None:
+        return ('shm', shm.name, array.shape, array.dtype.str)
+    order = 'F' if array.flags.f_contiguous and not array.flags.c_contiguous else 'C'
+    return ('file', array.filename, array.offset, array.shape, array.dtype.str, order)
+
+
+def _attach(spec):
+    if spec[0] == 'file':
+        _, filename, offset, shape, dtype, order = spec
+        return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape, order=order), None
+    _, name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=shm.buf), shm
+
+
+def _stats_shard(spec, start, stop):
+    matrix, shm = _attach(spec)
+    try:
+        return column_stats(matrix[start:stop])
+    finally:
+        del matrix
+        if shm is not None:
+            shm.close()
+
+
+def _score_shard(spec, out_spec, start, stop, scale, best, worst):
+    matrix, shm = _attach(spec)
+    out, out_shm = _attach(out_spec)
+    try:
+        _score_into(matrix[start:stop], scale, best, worst, out[start:stop])
+    finally:
+        del matrix, out
+        for block in (shm, out_shm):
+            if block is not None:
+                block.close()
+
+
+def _score_into(matrix, scale, best, worst, out):
+    if out.dtype == np.float32:
+        score_rows_inplace(matrix, scale, best, worst, out=out)
+    else:
+        out[:] = score_rows(matrix, scale, best, worst)
+
+
+def _shared_copy(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    shared[...] = array
+    return shared, shm
+
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+# Pools are kept per backend and size so repeated calls do not pay for
+# starting workers again
+def get_pool(backend, workers):
+    with pools_lock:
+        pool = pools.get((backend, workers))
+        if pool is None:
+            if backend == 'process':
+                pool = ProcessPoolExecutor(workers)
+            else:
+                pool = ThreadPoolExecutor(workers, thread_name_prefix='topsis')
+            pools[(backend, workers)] = pool
+        return pool
+
+
+def shutdown_pools():
+    with pools_lock:
+        for pool in pools.values():
+            pool.shutdown(wait=True)
+        pools.clear()
+
+
+# TOPSIS scores of matrix computed on workers shards. Falls back to a single
+# topsis_scores call for one worker or fewer than min_rows rows.
+def parallel_topsis_scores(matrix, weights, impacts, workers=None, backend='thread',
+                           min_rows=DEFAULT_MIN_ROWS, dtype=np.float64):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    dtype = parse_dtype(dtype)
+    # float32 scoring reads a float32 matrix as it is
+    keep = (np.float64, np.float32) if dtype == np.float32 else (np.float64,)
+    if not isinstance(matrix, np.memmap) or matrix.dtype not in keep:
+        matrix = np.asarray(matrix)
+        if matrix.dtype not in keep:
+            matrix = matrix.astype(np.float64)
+    if matrix.ndim != 2:
+        raise ValueError("Decision matrix must be two-dimensional")
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(matrix) < min_rows:
+        return topsis_scores(matrix, weights, impacts, dtype)
+
+    shards = shard_bounds(len(matrix), workers)
+    pool = get_pool(backend, workers)
+    if backend == 'thread':
+        stats = reduce(merge_stats, pool.map(lambda s: column_stats(matrix[s[0]:s[1]]), shards))
+        _, scale, best, worst = ideal_points(stats, weights, impacts)
+        scores = np.empty(len(matrix), dtype=dtype)
+
+        def score(shard):
+            start, stop = shard
+            _score_into(matrix[start:stop], scale, best, worst, scores[start:stop])
+
+        list(pool.map(score, shards))
+        return scores
+
+    # Views into the shared blocks must be dropped before the blocks are closed
+    views, blocks = [], []
+    try:
+        if isinstance(matrix, np.memmap) and matrix.filename:
+            spec = _array_spec(matrix)
+        else:
+            shared, shm = _shared_copy(matrix)
+            views.append(shared)
+            blocks.append(shm)
+            spec = _array_spec(shared, shm)
+            del shared
+        out, out_shm = _shared_copy(np.empty(len(matrix), dtype=dtype))
+        views.append(out)
+        blocks.append(out_shm)
+        out_spec = _array_spec(out, out_shm)
+        del out
+
+        futures = [pool.submit(_stats_shard, spec, start, stop) for start, stop in shards]
+        stats = reduce(merge_stats, (f.result() for f in futures))
+        _, scale, best, worst = ideal_points(stats, weights, impacts)
+        futures = [pool.submit(_score_shard, spec, out_spec, start, stop, scale, best, worst)
+                   for start, stop in shards]
+        for future in futures:
+            future.result()
+        return views[-1].copy()
+    finally:
+        views.clear()
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+
+# Process-wide defaults, e.g. from the Flask config, used by score_matrix
+scoring_workers = int(os.getenv('SCORING_WORKERS', 1))
+scoring_backend = os.getenv('SCORING_BACKEND', 'thread')
+scoring_dtype = os.getenv('SCORING_DTYPE', 'float64')
+
+
+def configure_scoring(workers=1, backend='thread', dtype='float64'):
+    global scoring_workers, scoring_backend, scoring_dtype
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+    scoring_workers, scoring_backend, scoring_dtype = workers, backend, parse_dtype(dtype).name
+
+
+# The configured precision, e.g. for keys of memoized results
+def scoring_precision():
+    return scoring_dtype
+
+
+# Score with the configured number of workers and precision
+def score_matrix(matrix, weights, impacts):
+    return parallel_topsis_scores(matrix, weights, impacts, scoring_workers, scoring_backend,
+                                  dtype=scoring_dtype)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from services.topsis_engine import ENGINE_VERSION, parse_impacts, parse_weights
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# Memo of finished results keyed by what determines them: the dataset's
+# content hash, the weights and impacts (parsed, so "1" and "1.0" match), the
+# method options and ENGINE_VERSION. Values are result ids in the result
+# store, so a hit hands back the stored CSV and chart without recomputing
+# anything. Bounded LRU by entry count; a hit whose result has since been
+# swept from the store is dropped and counted as stale.
+class ResultMemo:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, version=ENGINE_VERSION):
+        self.max_entries = max_entries
+        self.version = version
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    # None when the inputs cannot be memoized: no content hash, or weights or
+    # impacts the job is going to reject anyway
+    def key(self, dataset_key, weights, impacts, **options):
+        if not dataset_key:
+            return None
+        try:
+            parts = [self.version, dataset_key, parse_weights(weights).tolist(),
+                     parse_impacts(impacts).tolist(), options]
+        except ValueError:
+            return None
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    # Result id stored under key, if exists(result_id) still holds
+    def get(self, key, exists=lambda result_id: True):
+        with self.lock:
+            result_id = self.entries.get(key)
+            if result_id is None:
+                self.misses += 1
+                return None
+            if not exists(result_id):
+                del self.entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result_id
+
+    # Drop key if it still maps to result_id, e.g. when the result was swept
+    # after get() found it
+    def discard(self, key, result_id):
+        with self.lock:
+            if self.entries.get(key) == result_id:
+                del self.entries[key]
+                self.stale += 1
+
+    def put(self, key, result_id):
+        with self.lock:
+            self.entries[key] = result_id
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale,
+                    'evictions': self.evictions, 'entries': len(self.entries),
+                    'max_entries': self.max_entries, 'version': self.version,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+default_memo = ResultMemo()
+
+
+def configure_result_memo(max_entries=DEFAULT_MAX_ENTRIES):
+    global default_memo
+    default_memo = ResultMemo(max_entries)
+    return default_memo
+
+
+def get_result_memo():
+    return default_memo
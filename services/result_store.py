@@ -0,0 +1,159 @@
+import os
+import re
+import threading
+import time
+from importlib.util import find_spec
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_TTL = 24 * 3600
+
+# Parquet needs pyarrow; without it results fall back to gzip CSV. pandas
+# imports it when a Parquet file is written or read.
+HAS_PARQUET = find_spec('pyarrow') is not None
+
+EXTENSIONS = {'csv': '.csv.gz', 'parquet': '.parquet'}
+FIGURE_SUFFIX = '.figure.json'
+RESULT_ID = re.compile(r'^[0-9a-f]{32}$')
+
+# Write a result frame to path atomically: readers either see the previous
+# file or the complete new one, never a partial write
+def write_result_file(data, path):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    if path.endswith('.parquet'):
+        data.to_parquet(tmp_path, index=False)
+    else:
+        data.to_csv(tmp_path, index=False, compression='gzip')
+    os.replace(tmp_path, path)
+    return path
+
+# Where the rendered chart of the result at path is cached
+def figure_path(path):
+    for extension in EXTENSIONS.values():
+        if path.endswith(extension):
+            return path[:-len(extension)] + FIGURE_SUFFIX
+    return path + FIGURE_SUFFIX
+
+def read_result_file(path):
+    import pandas as pd
+
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, compression='gzip')
+
+# Result files keyed by job id, one per run, so concurrent users never
+# overwrite each other's results. A sweeper removes results older than ttl
+# and then the least recently used ones until the folder fits in max_bytes.
+# A result's cached chart (<id>.figure.json) counts towards the size and goes
+# with it.
+class ResultStore:
+    def __init__(self, root, result_format='csv', max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        if result_format == 'parquet' and not HAS_PARQUET:
+            result_format = 'csv'
+        self.root = root
+        self.result_format = result_format
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, result_id):
+        if not RESULT_ID.match(result_id):
+            raise KeyError(result_id)
+        return os.path.join(self.root, result_id + EXTENSIONS[self.result_format])
+
+    # Path of an existing result, whichever format it was written in
+    def find(self, result_id):
+        if not RESULT_ID.match(result_id):
+            return None
+        for extension in EXTENSIONS.values():
+            path = os.path.join(self.root, result_id + extension)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def write(self, result_id, data):
+        path = write_result_file(data, self.path_for(result_id))
+        self.sweep()
+        return path
+
+    def read(self, result_id):
+        path = self.find(result_id)
+        return read_result_file(path) if path else None
+
+    # Mark a result as recently used so the LRU sweep keeps it
+    def touch(self, result_id):
+        path = self.find(result_id)
+        if path:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return path
+
+    def sweep(self):
+        with self.lock:
+            now = time.time()
+            files = []
+            for entry in os.scandir(self.root):
+                if not entry.is_file() or not entry.name.endswith(tuple(EXTENSIONS.values())):
+                    continue
+                figure = figure_path(entry.path)
+                stat = entry.stat()
+                if now - stat.st_mtime > self.ttl:
+                    self._remove(entry.path)
+                    self._remove(figure)
+                else:
+                    size = stat.st_size + (os.path.getsize(figure) if os.path.isfile(figure) else 0)
+                    files.append((stat.st_mtime, size, entry.path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                self._remove(figure_path(path))
+                total -= size
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+default_store = None
+
+def configure_result_store(root, result_format='csv', max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+    global default_store
+    default_store = ResultStore(root, result_format, max_bytes, ttl)
+    return default_store
+
+def get_result_store():
+    global default_store
+    if default_store is None:
+        default_store = ResultStore(os.path.join('uploads', 'results'))
+    return default_store
+
+# Flask response for a stored result. Gzip CSV is sent as is with
+# Content-Encoding: gzip when the client accepts it, which keeps Range and
+# conditional requests working; other clients get it decompressed on the fly.
+def result_response(path, download_name='result_with_rank'):
+    import gzip
+    from flask import Response, request, send_file
+
+    if path.endswith('.parquet'):
+        return send_file(path, as_attachment=True, download_name=download_name + '.parquet',
+                         mimetype='application/vnd.apache.parquet', conditional=True)
+
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response = send_file(path, as_attachment=True, download_name=download_name + '.csv',
+                             mimetype='text/csv', conditional=True)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    def stream():
+        with gzip.open(path, 'rb') as f:
+            for block in iter(lambda: f.read(64 * 1024), b''):
+                yield block
+
+    return Response(stream(), mimetype='text/csv', headers={
+        'Content-Disposition': f'attachment; filename={download_name}.csv', 'Vary': 'Accept-Encoding'})
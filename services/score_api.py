@@ -0,0 +1,225 @@
+import json
+from importlib.util import find_spec
+
+import numpy as np
+
+from services.metrics import stage
+from services.topsis_engine import parse_impacts, parse_weights, rank_scores, select_top_k, topsis_scores
+
+# orjson parses and writes large number lists several times faster than the
+# json module and takes NumPy arrays directly; without it the json module is
+# used. Arrow IPC needs pyarrow; without it only JSON is accepted. Both are
+# imported on first use, so starting the app does not pay for them.
+HAS_ORJSON = find_spec('orjson') is not None
+HAS_ARROW = find_spec('pyarrow') is not None
+
+JSON_TYPE = 'application/json'
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+ARROW_TYPES = (ARROW_TYPE, 'application/vnd.apache.arrow.file')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Stateless scoring for programmatic clients (POST /api/v1/score).
+#
+# A request carries the decision matrix, weights and impacts in its body and
+# the answer is computed from them alone: no session, no upload folder, no
+# result file and no chart. JSON bodies look like
+#
+#   {"matrix": [[250, 16, 12, 5], ...], "weights": [1, 1, 1, 2],
+#    "impacts": ["+", "+", "-", "+"], "names": ["M1", ...], "top_k": 3}
+#
+# (weights and impacts may also be "1,1,1,2" strings; names and top_k are
+# optional) and are answered with {"scores": [...], "ranks": [...]}, plus
+# "names" and, with top_k, the selected "rows". Arrow bodies are one table:
+# a leading string column holds the names and the numeric columns are the
+# criteria; weights and impacts come from the query string or the schema
+# metadata. They are answered with an Arrow table of Name (if given), Row
+# (with top_k), Topsis Score and Rank.
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+def _loads(body):
+    if HAS_ORJSON:
+        import orjson
+    try:
+        return orjson.loads(body) if HAS_ORJSON else json.loads(body)
+    except ValueError:
+        raise ValueError("Request body is not valid JSON")
+
+
+def _matrix(values):
+    try:
+        matrix = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError("matrix must be a list of rows of numbers, all of the same length")
+    if matrix.ndim != 2 or matrix.shape[0] == 0 or matrix.shape[1] == 0:
+        raise ValueError("matrix must be a non-empty list of rows of numbers")
+    if not np.isfinite(matrix).all():
+        raise ValueError("matrix must only contain finite numbers")
+    return matrix
+
+
+def _top_k(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+    try:
+        top_k = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("top_k must be a positive integer")
+    if top_k < 1:
+        raise ValueError("top_k must be a positive integer")
+    return top_k
+
+
+# (names, matrix, weights, impacts, top_k) from a JSON body
+def read_json(body):
+    payload = _loads(body)
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    for field in ('matrix', 'weights', 'impacts'):
+        if field not in payload:
+            raise ValueError(f"Missing field {field!r}")
+    matrix = _matrix(payload['matrix'])
+    names = payload.get('names')
+    if names is not None and (not isinstance(names, list) or len(names) != len(matrix)):
+        raise ValueError("names must be a list with one name per row of matrix")
+    return names, matrix, payload['weights'], payload['impacts'], _top_k(payload.get('top_k'))
+
+
+# (names, matrix, weights, impacts, top_k) from an Arrow IPC stream or file;
+# weights, impacts and top_k given as arguments (the query string) win over
+# the schema metadata
+def read_arrow(body, weights=None, impacts=None, top_k=None):
+    import pyarrow.ipc
+
+    try:
+        table = pyarrow.ipc.open_stream(body).read_all()
+    except pyarrow.ArrowInvalid:
+        try:
+            table = pyarrow.ipc.open_file(pyarrow.BufferReader(body)).read_all()
+        except pyarrow.ArrowInvalid:
+            raise ValueError("Request body is not an Arrow IPC stream or file")
+
+    metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+    weights = weights or metadata.get('weights')
+    impacts = impacts or metadata.get('impacts')
+    if not weights or not impacts:
+        raise ValueError("Missing weights or impacts (query string or schema metadata)")
+    top_k = _top_k(top_k if top_k is not None else metadata.get('top_k'))
+
+    names = None
+    columns = table.columns
+    if table.num_columns and not _numeric(table.schema.field(0).type):
+        names, columns = columns[0].to_pylist(), columns[1:]
+    if not columns or not all(_numeric(column.type) for column in columns):
+        raise ValueError("Criteria columns must be numeric")
+    if table.num_rows == 0:
+        raise ValueError("matrix must be a non-empty list of rows of numbers")
+    matrix = np.empty((table.num_rows, len(columns)), dtype=np.float64)
+    for j, column in enumerate(columns):
+        if column.null_count:
+            raise ValueError("matrix must only contain finite numbers")
+        matrix[:, j] = column.to_numpy()
+    if not np.isfinite(matrix).all():
+        raise ValueError("matrix must only contain finite numbers")
+    return names, matrix, weights, impacts, top_k
+
+
+def _numeric(arrow_type):
+    import pyarrow.types as types
+    return types.is_integer(arrow_type) or types.is_floating(arrow_type)
+
+
+# (rows, scores, ranks) of the matrix; rows is None unless top_k is given
+def score(matrix, weights, impacts, top_k=None):
+    try:
+        weights, signs = parse_weights(weights), parse_impacts(impacts)
+    except (TypeError, AttributeError):
+        raise ValueError("weights and impacts must be lists or comma-separated strings")
+    if not (len(weights) == len(signs) == matrix.shape[1]):
+        raise ValueError("Number of weights, impacts and criteria must match")
+    if (weights < 0).any() or weights.sum() <= 0:
+        raise ValueError("Weights must not be negative and must add up to more than 0")
+    scores = topsis_scores(matrix, weights, signs)
+    if top_k is None:
+        return None, scores, rank_scores(scores)
+    rows, ranks = select_top_k(scores, top_k)
+    return rows, scores[rows], ranks
+
+
+def write_json(names, rows, scores, ranks):
+    result = {'scores': scores, 'ranks': ranks}
+    if rows is not None:
+        result['rows'] = rows
+    if names is not None:
+        result['names'] = names if rows is None else [names[i] for i in rows.tolist()]
+    if HAS_ORJSON:
+        import orjson
+
+        # NaN scores (e.g. every criterion constant) become null
+        return orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY)
+    result = {key: value.tolist() if isinstance(value, np.ndarray) else value for key, value in result.items()}
+    result['scores'] = [None if s != s else s for s in result['scores']]
+    return json.dumps(result).encode()
+
+
+def write_arrow(names, rows, scores, ranks):
+    import pyarrow.ipc
+
+    columns, labels = [], []
+    if names is not None:
+        columns.append(pyarrow.array(names if rows is None else [names[i] for i in rows.tolist()]))
+        labels.append('Name')
+    if rows is not None:
+        columns.append(pyarrow.array(rows.astype(np.int64)))
+        labels.append('Row')
+    columns += [pyarrow.array(scores, from_pandas=True), pyarrow.array(ranks.astype(np.int64))]
+    labels += ['Topsis Score', 'Rank']
+    table = pyarrow.table(columns, names=labels)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _media_type(header):
+    return (header or '').split(';')[0].strip().lower()
+
+
+# Answer one scoring request: (body, mimetype) of the response in the format
+# of the request, or the one named by Accept. Raises UnsupportedFormat for a
+# body that is neither JSON nor Arrow and ValueError for a bad request.
+def score_body(body, content_type, accept=None, args=None):
+    args = args or {}
+    request_type = _media_type(content_type)
+    if request_type in ARROW_TYPES and not HAS_ARROW:
+        raise UnsupportedFormat("Arrow bodies need pyarrow on the server; send JSON instead")
+    if request_type not in ARROW_TYPES and request_type != JSON_TYPE:
+        raise UnsupportedFormat(f"Send the request as {JSON_TYPE} or {ARROW_TYPE}")
+    response_type = ARROW_TYPE if request_type in ARROW_TYPES else JSON_TYPE
+    accept = _media_type(accept)
+    if accept in ARROW_TYPES and HAS_ARROW:
+        response_type = ARROW_TYPE
+    elif accept == JSON_TYPE:
+        response_type = JSON_TYPE
+
+    with stage('api-parse'):
+        if request_type == JSON_TYPE:
+            names, matrix, weights, impacts, top_k = read_json(body)
+        else:
+            # A bare + in a query string decodes to a space
+            impacts = args.get('impacts')
+            names, matrix, weights, impacts, top_k = read_arrow(
+                body, args.get('weights'), impacts.replace(' ', '+') if impacts else None, args.get('top_k'))
+    with stage('score'):
+        rows, scores, ranks = score(matrix, weights, impacts, top_k)
+    with stage('api-encode'):
+        if response_type == JSON_TYPE:
+            return write_json(names, rows, scores, ranks), JSON_TYPE
+        return write_arrow(names, rows, scores, ranks), ARROW_TYPE
@@ -0,0 +1,169 @@
+import numpy as np
+
+from services.topsis_engine import (normalize_columns, parse_impacts, parse_weights, rank_scores,
+                                    scores_batch_normalized)
+
+DEFAULT_SAMPLES = 1000
+DEFAULT_SPREAD = 0.2
+MAX_SAMPLES = 20_000
+METHODS = ('monte-carlo', 'grid')
+# Scores are computed in blocks of weight vectors holding about this many cells
+BLOCK_CELLS = 2_000_000
+# Ranks kept for the rank interval; beyond this many samples x rows the
+# interval comes from a random subset of the samples
+INTERVAL_CELLS = 10_000_000
+# Most samples x rows ranked in one analysis
+MAX_CELLS = 500_000_000
+# Analyses of more samples x rows than this run on the job pool by default
+SYNC_CELLS = 20_000_000
+
+# Weight sensitivity of TOPSIS ranks.
+#
+# The user's weights are perturbed by up to +/- spread (relative), either at
+# random or on a regular grid, and every perturbed weight vector is scored in
+# batches against the matrix normalized once up front, with the distances
+# expanded into matrix products (see scores_batch_normalized). Each block's
+# ranks are folded into running per-alternative sums, minima, maxima and
+# top-k counts, so memory does not grow with the number of samples: each
+# alternative gets its mean, spread, best and worst rank and the share of
+# samples in which it made the top k. The central rank interval needs the
+# ranks themselves; they are kept for at most INTERVAL_CELLS samples x rows,
+# a random subset of the samples when there are more.
+
+
+# samples x M weight vectors around weights. Monte Carlo scales each weight by
+# an independent uniform factor in [1 - spread, 1 + spread]; the grid takes
+# the same number of evenly spaced factors per criterion, as many as keep the
+# grid within samples (at least two each).
+def perturb_weights(weights, samples=DEFAULT_SAMPLES, spread=DEFAULT_SPREAD,
+                    method='monte-carlo', seed=None):
+    weights = parse_weights(weights)
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}, expected one of {', '.join(METHODS)}")
+    if not 0 <= spread < 1:
+        raise ValueError("Spread must be at least 0 and below 1")
+    if not 0 < samples <= MAX_SAMPLES:
+        raise ValueError(f"Samples must be between 1 and {MAX_SAMPLES}")
+    if method == 'grid':
+        levels = max(2, int(samples ** (1 / len(weights)) + 1e-9))
+        if levels ** len(weights) > MAX_SAMPLES:
+            raise ValueError(f"A grid over {len(weights)} criteria needs more than "
+                             f"{MAX_SAMPLES} samples; use monte-carlo instead")
+        axis = np.linspace(1 - spread, 1 + spread, levels)
+        factors = np.stack(np.meshgrid(*[axis] * len(weights), indexing='ij'), axis=-1)
+        factors = factors.reshape(-1, len(weights))
+    else:
+        rng = np.random.default_rng(seed)
+        factors = rng.uniform(1 - spread, 1 + spread, size=(samples, len(weights)))
+    return weights * factors
+
+
+# Ranks of every row of a K x N score matrix, ties sharing the highest rank
+# and NaN scores ranking last as in rank_scores. One argsort per row; only
+# when some row has ties does each tie group take the position of its last
+# member.
+def rank_rows(scores):
+    k, n = scores.shape
+    order = np.argsort(-scores, axis=1)
+    ordered = np.take_along_axis(scores, order, axis=1)
+    ties = ordered[:, 1:] == ordered[:, :-1]
+    nan = np.isnan(ordered)
+    if nan.any():
+        ties |= nan[:, 1:] & nan[:, :-1]
+    if ties.any():
+        ends = np.ones((k, n), dtype=bool)
+        ends[:, :-1] = ~ties
+        last = np.where(ends, np.arange(n, dtype=np.int32), np.int32(n - 1))
+        values = np.minimum.accumulate(last[:, ::-1], axis=1)[:, ::-1] + np.int32(1)
+    else:
+        values = np.broadcast_to(np.arange(1, n + 1, dtype=np.int32), (k, n))
+    ranks = np.empty((k, n), dtype=np.int32)
+    ranks[np.arange(k)[:, None], order] = values
+    return ranks
+
+
+# Rank-stability statistics for each alternative under weight perturbation.
+# Returns a dict of per-alternative arrays (base_rank, mean_rank, rank_std,
+# best_rank, worst_rank, rank_low, rank_high, p_top_k), where rank_low and
+# rank_high bound the central interval share of the sampled ranks, plus the
+# sampled weights and interval_samples, the number of samples the interval
+# was taken from. More than MAX_CELLS samples x rows is refused.
+def rank_stability(matrix, weights, impacts, samples=DEFAULT_SAMPLES, spread=DEFAULT_SPREAD,
+                   method='monte-carlo', top_k=1, interval=0.9, seed=None):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    if matrix.ndim != 2:
+        raise ValueError("Decision matrix must be two-dimensional")
+    base = parse_weights(weights)
+    signs = parse_impacts(impacts)
+    if not (len(base) == len(signs) == matrix.shape[1]):
+        raise ValueError("Number of weights, impacts and criteria must match")
+    if not 0 < interval <= 1:
+        raise ValueError("Interval must be above 0 and at most 1")
+
+    perturbed = perturb_weights(base, samples, spread, method, seed)
+    rows, count = len(matrix), len(perturbed)
+    check_analysis_size(rows, count)
+    normalized = normalize_columns(matrix)
+    interval_samples = interval_sample_indices(count, rows, seed)
+    kept = np.empty((len(interval_samples), rows), dtype=np.int32)
+    total = np.zeros(rows)
+    squares = np.zeros(rows)
+    best = np.full(rows, np.iinfo(np.int32).max, dtype=np.int32)
+    worst = np.zeros(rows, dtype=np.int32)
+    top = np.zeros(rows, dtype=np.int64)
+    cutoff = min(top_k, rows)
+    block = max(1, BLOCK_CELLS // max(rows, 1))
+    for start in range(0, count, block):
+        chunk = perturbed[start:start + block]
+        scores = scores_batch_normalized(normalized, chunk, np.broadcast_to(signs, chunk.shape))
+        ranks = rank_rows(scores)
+        values = ranks.astype(np.float64)
+        total += values.sum(axis=0)
+        squares += np.einsum('ij,ij->j', values, values)
+        np.minimum(best, ranks.min(axis=0), out=best)
+        np.maximum(worst, ranks.max(axis=0), out=worst)
+        top += np.count_nonzero(ranks <= cutoff, axis=0)
+        low, high = np.searchsorted(interval_samples, [start, start + len(chunk)])
+        kept[low:high] = ranks[interval_samples[low:high] - start]
+
+    base_scores = scores_batch_normalized(normalized, base[None, :], signs[None, :])[0]
+    mean = total / count
+    tail = (1 - interval) / 2 * 100
+    return {
+        'base_rank': rank_scores(base_scores),
+        'mean_rank': mean,
+        'rank_std': np.sqrt(np.maximum(squares / count - mean ** 2, 0.0)),
+        'best_rank': best,
+        'worst_rank': worst,
+        'rank_low': np.percentile(kept, tail, axis=0, method='lower').astype(np.int64),
+        'rank_high': np.percentile(kept, 100 - tail, axis=0, method='higher').astype(np.int64),
+        'p_top_k': top / count,
+        'weights': perturbed,
+        'interval_samples': len(interval_samples),
+    }
+
+
+# Raise ValueError when ranking samples weight vectors of rows alternatives
+# would be more than MAX_CELLS ranks
+def check_analysis_size(rows, samples):
+    if rows * samples > MAX_CELLS:
+        raise ValueError(f"{samples} samples of {rows} alternatives is more than {MAX_CELLS} ranks; "
+                         "use fewer samples")
+
+
+# Sorted indices of the samples whose ranks are kept for the rank interval:
+# all of them while samples x rows fits in INTERVAL_CELLS, otherwise a random
+# subset of that size
+def interval_sample_indices(samples, rows, seed=None):
+    size = max(1, INTERVAL_CELLS // max(rows, 1))
+    if samples <= size:
+        return np.arange(samples)
+    return np.sort(np.random.default_rng(seed).choice(samples, size, replace=False))
+
+
+# rank_stability output as one JSON-ready dict per alternative
+def stability_records(names, stats):
+    columns = ('base_rank', 'mean_rank', 'rank_std', 'best_rank', 'worst_rank',
+               'rank_low', 'rank_high', 'p_top_k')
+    values = [stats[column].tolist() for column in columns]
+    return [dict(zip(('name',) + columns, row)) for row in zip(names, *values)]
@@ -0,0 +1,224 @@
+import numpy as np
+
+# Shared array-based TOPSIS engine used by the CLI, the service layer and the
+# Flask routes. Everything works on one float64 matrix of shape (rows, criteria)
+# and per-criterion vectors, so no step walks the data cell by cell.
+
+# Precisions scoring can run in; float32 is opt-in (see score_rows_inplace)
+DTYPES = ('float64', 'float32')
+# Rows per block in score_rows_inplace; its buffer holds this many rows
+SCORE_BLOCK_ROWS = 16384
+
+# Bump whenever a change alters scores, ranks or the result files built from
+# them; memoized results (services.result_memo) from other versions are ignored
+ENGINE_VERSION = '2'
+
+
+# Convert weights given as "1,1,2" or a sequence into a float64 vector
+def parse_weights(weights):
+    if isinstance(weights, str):
+        weights = weights.split(',')
+    return np.asarray([float(w) for w in weights], dtype=np.float64)
+
+
+# Convert impacts given as "+,-,+", a sequence or an array of signs into a
+# vector of +1/-1 signs
+def parse_impacts(impacts):
+    if isinstance(impacts, np.ndarray) and impacts.dtype.kind in 'if':
+        return np.sign(impacts).astype(np.float64)
+    if isinstance(impacts, str):
+        impacts = impacts.split(',')
+    signs = []
+    for impact in impacts:
+        impact = impact.strip()
+        if impact not in ('+', '-'):
+            raise ValueError(f"Invalid impact {impact!r}, expected '+' or '-'")
+        signs.append(1.0 if impact == '+' else -1.0)
+    return np.asarray(signs, dtype=np.float64)
+
+
+# float64 or float32 as a NumPy dtype
+def parse_dtype(dtype):
+    dtype = np.dtype(dtype or np.float64)
+    if dtype.name not in DTYPES:
+        raise ValueError(f"Unknown precision {dtype.name!r}, expected one of {', '.join(DTYPES)}")
+    return dtype
+
+
+# Per-column sufficient statistics: sum of squares, min and max. Always
+# float64; a float32 matrix is read as it is, without a float64 copy.
+def column_stats(matrix):
+    matrix = np.asarray(matrix)
+    if matrix.dtype != np.float32:
+        matrix = np.asarray(matrix, dtype=np.float64)
+    return (np.einsum('ij,ij->j', matrix, matrix, dtype=np.float64),
+            matrix.min(axis=0).astype(np.float64),
+            matrix.max(axis=0).astype(np.float64))
+
+
+# Combine column stats computed on two disjoint sets of rows
+def merge_stats(a, b):
+    return (a[0] + b[0], np.minimum(a[1], b[1]), np.maximum(a[2], b[2]))
+
+
+# Column norms, the per-column scale factor (weight / norm) and the ideal
+# best/worst points of the weighted normalized matrix, all from column stats
+def ideal_points(stats, weights, impacts):
+    sumsq, col_min, col_max = stats
+    weights = parse_weights(weights)
+    signs = parse_impacts(impacts)
+    if not (len(weights) == len(signs) == len(sumsq)):
+        raise ValueError("Number of weights, impacts and criteria must match")
+
+    norms = np.sqrt(sumsq)
+    # An all-zero column carries no information; keep it from dividing by zero
+    scale = weights / np.where(norms == 0, 1.0, norms)
+    low, high = col_min * scale, col_max * scale
+    v_max, v_min = np.maximum(low, high), np.minimum(low, high)
+    best = np.where(signs > 0, v_max, v_min)
+    worst = np.where(signs > 0, v_min, v_max)
+    return norms, scale, best, worst
+
+
+# Relative closeness of each row to the ideal solution, given precomputed
+# scale and ideal points
+def score_rows(matrix, scale, best, worst):
+    weighted = np.asarray(matrix, dtype=np.float64) * scale
+    d_best = np.sqrt(np.square(weighted - best).sum(axis=1))
+    d_worst = np.sqrt(np.square(weighted - worst).sum(axis=1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return d_worst / (d_best + d_worst)
+
+
+# score_rows in float32 without full-size temporaries: each block of rows is
+# weighted into one preallocated buffer, whose distances to the best and then
+# the worst point are squared and summed in place, and the block's scores go
+# straight into out. Beyond the matrix, memory is the float32 scores and the
+# buffer. Pass out (N) and buffer (block x M) to reuse them across calls.
+def score_rows_inplace(matrix, scale, best, worst, out=None, buffer=None, dtype=np.float32):
+    rows, criteria = matrix.shape
+    scale, best, worst = (np.asarray(v, dtype=dtype) for v in (scale, best, worst))
+    if out is None:
+        out = np.empty(rows, dtype=dtype)
+    if buffer is None:
+        buffer = np.empty((max(min(rows, SCORE_BLOCK_ROWS), 1), criteria), dtype=dtype)
+    d_best, d_worst = np.empty((2, len(buffer)), dtype=dtype)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for start in range(0, rows, len(buffer)):
+            stop = min(start + len(buffer), rows)
+            block = buffer[:stop - start]
+            for ideal, distance in ((best, d_best[:len(block)]), (worst, d_worst[:len(block)])):
+                np.multiply(matrix[start:stop], scale, out=block, casting='same_kind')
+                block -= ideal
+                np.square(block, out=block)
+                block.sum(axis=1, out=distance)
+                np.sqrt(distance, out=distance)
+            near, far = d_best[:len(block)], d_worst[:len(block)]
+            near += far
+            np.divide(far, near, out=out[start:stop])
+    return out
+
+
+# Full TOPSIS: normalize, weight, find ideal points and score every row. With
+# dtype=float32 the rows are scored by score_rows_inplace and a float32
+# matrix is used as it is; the column statistics stay float64.
+def topsis_scores(matrix, weights, impacts, dtype=np.float64):
+    dtype = parse_dtype(dtype)
+    matrix = np.asarray(matrix)
+    if dtype != np.float32 or matrix.dtype != np.float32:
+        matrix = np.asarray(matrix, dtype=np.float64)
+    if matrix.ndim != 2:
+        raise ValueError("Decision matrix must be two-dimensional")
+    _, scale, best, worst = ideal_points(column_stats(matrix), weights, impacts)
+    if dtype == np.float32:
+        return score_rows_inplace(matrix, scale, best, worst)
+    return score_rows(matrix, scale, best, worst)
+
+
+# Rank scores in descending order; ties share the highest rank and NaN
+# scores rank last (all sharing rank n), matching pandas'
+# Series.rank(method='max', ascending=False, na_option='bottom'). One argsort
+# of the negated scores, which puts NaNs at the end; each tie group (NaNs
+# count as one) takes the position of its last member.
+def rank_scores(scores):
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    order = np.argsort(-scores)
+    ordered = scores[order]
+    ends = np.empty(n, dtype=bool)
+    ends[-1:] = True
+    np.not_equal(ordered[:-1], ordered[1:], out=ends[:-1])
+    nan = np.isnan(ordered)
+    if nan.any():
+        ends[:-1] &= ~(nan[:-1] & nan[1:])
+    last = np.where(ends, np.arange(n), n - 1)
+    last = np.minimum.accumulate(last[::-1])[::-1]
+    ranks = np.empty(n, dtype=np.int64)
+    ranks[order] = last + 1
+    return ranks
+
+
+# Divide each column by its Euclidean norm; all-zero columns stay zero
+def normalize_columns(matrix):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    norms = np.sqrt(np.einsum('ij,ij->j', matrix, matrix))
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+# Score K weight/impact scenarios against one decision matrix in a single pass.
+# weights is K x M; impacts is K x M (or one set of M shared by every
+# scenario). The matrix is normalized once and the squared distances are
+# expanded into matrix products, so no K x N x M temporary is built.
+# Returns a K x N matrix of scores.
+def topsis_scores_batch(matrix, weights, impacts):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if not isinstance(impacts, str) and np.asarray(impacts).dtype.kind in 'if':
+        # Numeric signs: one row shared by every scenario, or one per scenario
+        signs = np.sign(np.asarray(impacts, dtype=np.float64))
+        if signs.ndim == 1:
+            signs = np.broadcast_to(signs, (len(weights), len(signs)))
+    else:
+        if isinstance(impacts, str) or all(isinstance(i, str) and i.strip() in ('+', '-') for i in impacts):
+            impacts = [impacts] * len(weights)
+        signs = np.stack([parse_impacts(row) for row in impacts])
+    if weights.shape[1] != matrix.shape[1] or signs.shape != weights.shape:
+        raise ValueError("Number of weights, impacts and criteria must match")
+    return scores_batch_normalized(normalize_columns(matrix), weights, signs)
+
+
+# topsis_scores_batch on a matrix already passed through normalize_columns,
+# with signs given as a K x M array of +1/-1, for callers that score many
+# batches of weights against the same matrix
+def scores_batch_normalized(normalized, weights, signs):
+    low, high = weights * normalized.min(axis=0), weights * normalized.max(axis=0)
+    v_max, v_min = np.maximum(low, high), np.minimum(low, high)
+    best = np.where(signs > 0, v_max, v_min)
+    worst = np.where(signs > 0, v_min, v_max)
+
+    # sum_j (w_kj * x_ij - p_kj)^2 = x^2 @ (w^2)^T - 2 x @ (w*p)^T + sum_j p_kj^2
+    squared = np.square(normalized) @ np.square(weights).T
+    d_best = squared - 2 * normalized @ (weights * best).T + np.square(best).sum(axis=1)
+    d_worst = squared - 2 * normalized @ (weights * worst).T + np.square(worst).sum(axis=1)
+    d_best = np.sqrt(np.maximum(d_best, 0.0))
+    d_worst = np.sqrt(np.maximum(d_worst, 0.0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (d_worst / (d_best + d_worst)).T
+
+
+# Indices of the k best scores (best first) and their ranks, found with a
+# partial partition instead of sorting every score. Ranks follow
+# rank_scores, so rows tied with the k-th score outside the selection count.
+def select_top_k(scores, k):
+    scores = np.asarray(scores, dtype=np.float64)
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    order = -scores
+    idx = np.argpartition(order, k - 1)[:k]
+    idx = idx[np.argsort(order[idx], kind='stable')]
+    selected = scores[idx]
+    ranks = rank_scores(selected)
+    cutoff = selected[-1]
+    ranks[selected == cutoff] += np.count_nonzero(scores == cutoff) - np.count_nonzero(selected == cutoff)
+    return idx, ranks
@@ -1,16 +1,219 @@
+import numpy as np
+import pandas as pd
+from services.mcdm import get_method, method_scores
+from services.parallel_topsis import score_matrix
+from services.sensitivity import rank_stability
+from services.topsis_engine import (SCORE_BLOCK_ROWS, ideal_points, parse_dtype, parse_weights, rank_scores, score_rows,
+                                   score_rows_inplace, select_top_k, topsis_scores_batch)
+
+DEFAULT_CHUNKSIZE = 100_000
+
 def calculate_custom_score(data, weights, impacts):
-    normalized_data = data.iloc[:, 1:].apply(lambda x: x / np.sqrt(np.sum(x**2)), axis=0)
-    weighted_normalized_data = normalized_data * list(map(float, weights.split(',')))
-    ideal_best = weighted_normalized_data.max() if impacts[0] == '+' else weighted_normalized_data.min()
-    ideal_worst = weighted_normalized_data.min() if impacts[0] == '+' else weighted_normalized_data.max()
-    custom_score = np.sqrt(np.sum((weighted_normalized_data - ideal_best)**2, axis=1)) / (
-            np.sqrt(np.sum((weighted_normalized_data - ideal_best)**2, axis=1)) +
-            np.sqrt(np.sum((weighted_normalized_data - ideal_worst)**2, axis=1))
-    )
-    return custom_score
-
-def process_dataset(data, weights, impacts):
+    matrix = data.iloc[:, 1:].to_numpy(dtype=np.float64)
+    custom_score = score_matrix(matrix, weights, impacts)
+    return pd.Series(custom_score, index=data.index)
+
+# Add the Custom Score and Rank columns to data for its scores. With top_k
+# only the best top_k rows are kept, best first, selected with a partial
+# partition rather than ranking every row.
+def rank_dataset(data, scores, top_k=None):
+    scores = np.asarray(scores, dtype=np.float64)
+    if top_k is not None:
+        idx, ranks = select_top_k(scores, top_k)
+        data = data.iloc[idx].copy()
+        data['Custom Score'] = scores[idx]
+        data['Rank'] = ranks
+        return data
+    data['Custom Score'] = scores
+    data['Rank'] = rank_scores(scores)
+    return data
+
+def process_dataset(data, weights, impacts, top_k=None):
     custom_score = calculate_custom_score(data, weights, impacts)
-    data['Custom Score'] = custom_score
-    data['Rank'] = data['Custom Score'].rank(ascending=False)
-    return data
\ No newline at end of file
+    return rank_dataset(data, custom_score.to_numpy(), top_k)
+
+# Coerce the criteria columns to numbers and fill the cells that are not
+# numeric with the column mean, as the CLI has always done
+def fill_non_numeric(data):
+    values = data.iloc[:, 1:].apply(pd.to_numeric, errors='coerce')
+    return pd.concat([data.iloc[:, :1], values.fillna(values.mean())], axis=1)
+
+# Score several weight/impact scenarios on the same dataset in one batched
+# computation. weights_list holds one weights entry per scenario (a "1,2,1"
+# string or a sequence); impacts_list holds one impacts entry per scenario or a
+# single entry shared by all. Returns a DataFrame with one score column per
+# scenario, indexed like data.
+def calculate_scenario_scores(data, weights_list, impacts_list, names=None):
+    matrix = data.iloc[:, 1:].to_numpy(dtype=np.float64)
+    weights = [parse_weights(w) for w in weights_list]
+    scores = topsis_scores_batch(matrix, weights, impacts_list)
+    if names is None:
+        names = [f'Scenario {k + 1}' for k in range(len(weights))]
+    return pd.DataFrame(scores.T, index=data.index, columns=list(names))
+
+# Read a scenarios CSV with Scenario, Weights and Impacts columns, where the
+# weights and impacts are written like the CLI arguments ("1,1,2", "+,-,+")
+def load_scenarios(scenarios_file):
+    scenarios = pd.read_csv(scenarios_file, dtype=str)
+    missing = {'Scenario', 'Weights', 'Impacts'} - set(scenarios.columns)
+    if missing:
+        raise ValueError(f"Scenarios file is missing column(s): {', '.join(sorted(missing))}")
+    return (scenarios['Scenario'].tolist(), scenarios['Weights'].tolist(),
+            scenarios['Impacts'].tolist())
+
+# Score every scenario in scenarios_file and write names, then a score and a
+# rank column per scenario, to output_file
+def score_scenarios_file(input_file, scenarios_file, output_file):
+    data = fill_non_numeric(pd.read_csv(input_file))
+    names, weights_list, impacts_list = load_scenarios(scenarios_file)
+    scores = calculate_scenario_scores(data, weights_list, impacts_list, names)
+
+    result = data.iloc[:, :1].copy()
+    for name in names:
+        result[f'{name} Score'] = scores[name]
+        result[f'{name} Rank'] = rank_scores(scores[name].to_numpy())
+    result.to_csv(output_file, index=False)
+    return result
+
+# Rank stability of every alternative under weight perturbation (see
+# services.sensitivity.rank_stability), one row per alternative in data order
+def sensitivity_analysis(data, weights, impacts, top_k=1, interval=0.9, **options):
+    matrix = data.iloc[:, 1:].to_numpy(dtype=np.float64)
+    stats = rank_stability(matrix, weights, impacts, top_k=top_k, interval=interval, **options)
+    percent = round(interval * 100)
+    result = data.iloc[:, :1].copy()
+    result['Base Rank'] = stats['base_rank']
+    result['Mean Rank'] = stats['mean_rank']
+    result['Rank Std'] = stats['rank_std']
+    result['Best Rank'] = stats['best_rank']
+    result['Worst Rank'] = stats['worst_rank']
+    result[f'Rank {percent}% Low'] = stats['rank_low']
+    result[f'Rank {percent}% High'] = stats['rank_high']
+    result[f'P(Top {top_k})'] = stats['p_top_k']
+    return result
+
+def sensitivity_file(input_file, weights, impacts, output_file, **options):
+    data = fill_non_numeric(pd.read_csv(input_file))
+    result = sensitivity_analysis(data, weights, impacts, **options)
+    result.to_csv(output_file, index=False)
+    return result
+
+# Scores and ranks of several MCDM methods (see services.mcdm) side by side,
+# one row per alternative in data order: names, then per method its score
+# column (e.g. 'VIKOR Q') and a '<METHOD> Rank' column. key, the dataset's
+# content hash, lets repeated calls reuse the prepared matrix.
+def compare_methods(data, weights, impacts, methods=('topsis', 'vikor', 'wsm', 'wpm'), key=None):
+    matrix = data.iloc[:, 1:].to_numpy(dtype=np.float64)
+    results = method_scores(matrix, weights, impacts, methods, key)
+    result = data.iloc[:, :1].copy()
+    for name, (values, ranks) in results.items():
+        method = get_method(name)
+        result[method.label] = values
+        result[f'{method.name.upper()} Rank'] = ranks
+    return result
+
+def compare_file(input_file, weights, impacts, output_file, methods=('topsis', 'vikor', 'wsm', 'wpm')):
+    data = fill_non_numeric(pd.read_csv(input_file))
+    result = compare_methods(data, weights, impacts, methods)
+    result.to_csv(output_file, index=False)
+    return result
+
+# Read the criteria columns of a chunk as floats; non-numeric cells become NaN
+def _chunk_values(chunk):
+    return chunk.iloc[:, 1:].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+# Pass one: build the column stats TOPSIS needs without holding the file.
+# Missing or non-numeric cells are filled with the column mean, as the CLI does,
+# so their contribution to the sum of squares is added once the mean is known.
+def scan_column_stats(input_file, chunksize=DEFAULT_CHUNKSIZE):
+    rows, count, total, sumsq, col_min, col_max = 0, None, None, None, None, None
+    for chunk in pd.read_csv(input_file, chunksize=chunksize):
+        values = _chunk_values(chunk)
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        if count is None:
+            n = values.shape[1]
+            count, total, sumsq = np.zeros(n), np.zeros(n), np.zeros(n)
+            col_min, col_max = np.full(n, np.inf), np.full(n, -np.inf)
+        rows += len(values)
+        count += present.sum(axis=0)
+        total += filled.sum(axis=0)
+        sumsq += np.einsum('ij,ij->j', filled, filled)
+        col_min = np.minimum(col_min, np.where(present, values, np.inf).min(axis=0))
+        col_max = np.maximum(col_max, np.where(present, values, -np.inf).max(axis=0))
+    if count is None:
+        raise ValueError(f"{input_file} contains no rows")
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = total / count
+    sumsq = sumsq + (rows - count) * np.nan_to_num(means) ** 2
+    return (sumsq, col_min, col_max), means
+
+# The best top_k rows of frame by score_column and every row tied with the
+# k-th best score
+def _top_k_with_ties(frame, score_column, top_k):
+    scores = frame[score_column].to_numpy()
+    idx, _ = select_top_k(scores, top_k)
+    keep = np.zeros(len(scores), dtype=bool)
+    keep[idx] = True
+    if len(idx):
+        keep |= scores == scores[idx[-1]]
+    return frame[keep].reset_index(drop=True)
+
+# Two-pass out-of-core TOPSIS for CSVs larger than memory. Pass one builds the
+# column stats, pass two streams the rows again, scores each chunk and appends
+# it to output_file, so only one chunk is held at a time. The Rank column is
+# opt-in: with rank=True every score (8 bytes per row) is kept from an extra
+# scoring pass, so the file is parsed three times instead of twice.
+#
+# With top_k, pass two keeps only the best top_k rows seen so far, plus every
+# row tied with the k-th best score, and writes the best top_k of them, best
+# first and always ranked. A row dropped along the way scored below the
+# cut-off of the time, so it cannot tie with the final cut-off: the kept rows
+# hold the whole tie group, and rows and ranks are those select_top_k gives
+# on the full file. Memory is about 2 * top_k rows plus the tie group.
+def topsis_csv_chunked(input_file, output_file, weights, impacts,
+                       chunksize=DEFAULT_CHUNKSIZE, rank=False,
+                       score_column='Topsis Score', top_k=None, dtype=np.float64):
+    dtype = parse_dtype(dtype)
+    stats, means = scan_column_stats(input_file, chunksize)
+    _, scale, best, worst = ideal_points(stats, weights, impacts)
+    # float32 chunks are scored through one shared block buffer
+    buffer = None
+    if dtype == np.float32:
+        buffer = np.empty((min(chunksize, SCORE_BLOCK_ROWS), len(scale)), dtype=np.float32)
+
+    def scored_chunks():
+        for chunk in pd.read_csv(input_file, chunksize=chunksize):
+            values = _chunk_values(chunk)
+            values = np.where(np.isnan(values), means, values)
+            if dtype == np.float32:
+                yield chunk, score_rows_inplace(values, scale, best, worst, buffer=buffer)
+            else:
+                yield chunk, score_rows(values, scale, best, worst)
+
+    if top_k is not None:
+        best_rows = None
+        for chunk, scores in scored_chunks():
+            chunk[score_column] = scores
+            candidates = _top_k_with_ties(chunk, score_column, top_k)
+            if best_rows is not None:
+                candidates = pd.concat([best_rows, candidates], ignore_index=True)
+            best_rows = _top_k_with_ties(candidates, score_column, top_k)
+        idx, ranks = select_top_k(best_rows[score_column].to_numpy(), top_k)
+        best_rows = best_rows.iloc[idx].reset_index(drop=True)
+        best_rows['Rank'] = ranks
+        best_rows.to_csv(output_file, index=False)
+        return output_file
+
+    if rank:
+        ordered = np.sort(np.concatenate([scores for _, scores in scored_chunks()]))
+
+    header = True
+    for chunk, scores in scored_chunks():
+        chunk[score_column] = scores
+        if rank:
+            chunk['Rank'] = len(ordered) - np.searchsorted(ordered, scores, side='left')
+        chunk.to_csv(output_file, mode='w' if header else 'a', header=header, index=False)
+        header = False
+    return output_file
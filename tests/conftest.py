@@ -0,0 +1,45 @@
+import os
+import sys
+
+# The services, models and utils packages are imported from the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytest
+
+from helpers import DATASET
+
+
+# The web app, run from a scratch directory: its uploads, results and
+# dataset cache folders are relative to the working directory and the
+# database is a SQLite file there. The app module is imported once per run.
+@pytest.fixture(scope='session')
+def web_app(tmp_path_factory):
+    workdir = tmp_path_factory.mktemp('app')
+    previous = os.getcwd()
+    os.chdir(workdir)
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{workdir}/topsis.db')
+    os.environ.setdefault('METRICS_ENABLED', '0')
+    import app as module
+
+    os.makedirs('uploads', exist_ok=True)
+    with module.app.app_context():
+        module.db.create_all()
+    module.app.config['TESTING'] = True
+    yield module
+    module.get_job_manager().shutdown()
+    os.chdir(previous)
+
+
+# A test client that has uploaded DATASET through /submit, with an empty
+# result memo
+@pytest.fixture
+def uploaded(web_app):
+    import io
+
+    web_app.get_result_memo().clear()
+    client = web_app.app.test_client()
+    response = client.post('/submit', data={'file': (io.BytesIO(DATASET), 'funds.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    return client
+
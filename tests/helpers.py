@@ -0,0 +1,30 @@
+import time
+
+# Shared test data and helpers for driving the web app's job endpoints
+
+DATASET = (b"Fund,P1,P2,P3,P4,P5\n"
+           b"M1,0.72,0.52,7.0,56.0,16.06\nM2,0.83,0.69,3.7,37.0,10.56\n"
+           b"M3,0.81,0.66,4.0,30.4,8.97\nM4,0.65,0.42,5.9,44.1,12.34\n"
+           b"M5,0.93,0.86,3.1,61.3,16.92\nM6,0.74,0.55,6.4,49.2,13.81\n")
+WEIGHTS = ['1', '1', '1', '2', '1']
+IMPACTS = ['+', '+', '-', '+', '+']
+
+
+# Start /process for the uploaded dataset; returns the job id. Extra form
+# fields (e.g. top_k) are passed as keyword arguments.
+def process(client, weights=WEIGHTS, impacts=IMPACTS, **fields):
+    response = client.post('/process', data={'weights': weights, 'impacts': impacts, **fields},
+                           headers={'Accept': 'application/json'})
+    assert response.status_code == 202
+    return response.get_json()['job_id']
+
+
+# Poll /jobs/<job_id> until the job has finished; returns its status
+def wait_for_job(client, job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f'/jobs/{job_id}').get_json()
+        if status['state'] in ('done', 'failed'):
+            return status
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
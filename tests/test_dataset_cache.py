@@ -0,0 +1,136 @@
+import os
+import time
+
+import numpy as np
+
+from services.dataset_cache import DatasetCache, entry_size
+
+
+def make_entry(rows, criteria=4, seed=0):
+    matrix = np.random.default_rng(seed).uniform(1, 100, size=(rows, criteria))
+    matrix.setflags(write=False)
+    return [f'C{j}' for j in range(criteria + 1)], ['float64'] * criteria, [f'A{i}' for i in range(rows)], matrix
+
+
+def disk_keys(cache):
+    return sorted(name[:-len('.npy')] for name in os.listdir(cache.cache_dir) if name.endswith('.npy'))
+
+
+def age(cache, key, seconds):
+    path = os.path.join(cache.cache_dir, f'{key}.npy')
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_memmap_entries_count_their_file_size(tmp_path):
+    cache = DatasetCache(cache_dir=str(tmp_path))
+    entry = cache.put('a', make_entry(1000))
+
+    assert isinstance(entry[3], np.memmap)
+    assert entry_size(entry) >= 1000 * 4 * 8
+    assert cache.stats()['bytes'] == entry_size(entry)
+
+
+def test_memory_tier_evicts_memmap_entries(tmp_path):
+    size = entry_size(make_entry(1000))
+    cache = DatasetCache(max_bytes=int(size * 2.5), cache_dir=str(tmp_path))
+    for key in 'abc':
+        cache.put(key, make_entry(1000))
+
+    stats = cache.stats()
+    assert (stats['entries'], stats['evictions']) == (2, 1)
+    assert stats['bytes'] <= cache.max_bytes
+    # Evicted from memory, still mapped from disk
+    assert isinstance(cache.get('a')[3], np.memmap) and cache.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_keeps_to_its_budget_least_recently_used_first(tmp_path):
+    cache = DatasetCache(cache_dir=str(tmp_path), disk_max_bytes=10 ** 9)
+    for i, key in enumerate('abc'):
+        cache.put(key, make_entry(1000, seed=i))
+    per_entry = cache.stats()['disk_bytes'] // 3
+    for i, key in enumerate('abc'):
+        age(cache, key, 300 - 100 * i)
+
+    # A disk hit makes a the most recently used
+    cache.clear()
+    assert cache.get('a') is not None
+    cache.disk_max_bytes = int(per_entry * 3.5)
+    cache.put('d', make_entry(1000, seed=3))
+
+    assert disk_keys(cache) == ['a', 'c', 'd']
+    stats = cache.stats()
+    assert stats['disk_evictions'] == 1
+    assert stats['disk_bytes'] <= cache.disk_max_bytes
+
+
+def test_disk_tier_keeps_the_entry_just_written(tmp_path):
+    cache = DatasetCache(cache_dir=str(tmp_path), disk_max_bytes=1)
+    cache.put('a', make_entry(100))
+    entry = cache.put('b', make_entry(100, seed=1))
+
+    assert disk_keys(cache) == ['b']
+    # Entries mapped before their files were removed stay readable
+    a = cache.get('a')
+    assert a is not None and float(a[3].sum()) == float(make_entry(100)[3].sum())
+    assert np.array_equal(entry[3], make_entry(100, seed=1)[3])
+
+
+def test_uploads_with_the_same_filename_keep_their_own_data(web_app, monkeypatch):
+    import io
+
+    from helpers import DATASET, process, wait_for_job
+    from services.dataset_cache import get_dataset_cache
+
+    other = DATASET.replace(b'M', b'N')
+    clients = []
+    for data in (DATASET, other):
+        client = web_app.app.test_client()
+        response = client.post('/submit', data={'file': (io.BytesIO(data), 'funds.csv')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        clients.append(client)
+
+    # Every lookup misses, so each job parses the file behind its session and
+    # caches it under the session's digest. The first client scores after the
+    # second uploaded a file of the same name.
+    web_app.get_result_memo().clear()
+    monkeypatch.setattr(get_dataset_cache(), 'get', lambda key: None)
+    for client, name in zip(clients, (b'M1', b'N1')):
+        assert wait_for_job(client, process(client))['state'] == 'done'
+        download = client.get('/download', follow_redirects=True)
+        assert download.status_code == 200
+        assert name in download.data
+        assert (b'N1' if name == b'M1' else b'M1') not in download.data
+
+
+def test_background_parse_caches_each_upload_under_its_own_digest(web_app, monkeypatch):
+    import hashlib
+    import io
+    from concurrent.futures import Future
+
+    from helpers import DATASET
+    from services import ingest
+    from services.dataset_cache import get_dataset_cache
+
+    # Hold the background parses back until both uploads have been saved
+    deferred = []
+
+    class DeferredExecutor:
+        def submit(self, fn, *args):
+            deferred.append((fn, args))
+            return Future()
+
+    monkeypatch.setattr(ingest, 'ingest_executor', DeferredExecutor())
+    uploads = {DATASET.replace(b'M', letter): letter.decode() for letter in (b'P', b'Q')}
+    for data in uploads:
+        client = web_app.app.test_client()
+        response = client.post('/submit', data={'file': (io.BytesIO(data), 'funds.csv')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+    for fn, args in deferred:
+        fn(*args)
+
+    for data, letter in uploads.items():
+        names = get_dataset_cache().get(hashlib.sha256(data).hexdigest())[2]
+        assert list(names) == [f'{letter}{i}' for i in range(1, 7)]
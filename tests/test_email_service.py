@@ -0,0 +1,110 @@
+import socket
+import time
+
+import pytest
+
+pytest.importorskip('aiosmtpd')
+from aiosmtpd.controller import Controller
+
+from services.email_service import EmailQueue, SMTPPool
+
+
+# Accepts every message except those for refused@example.com (550) and
+# busy@example.com (451); counts connections
+class Handler:
+    def __init__(self):
+        self.delivered = []
+        self.connections = 0
+        self.busy = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == 'refused@example.com':
+            return '550 No such user'
+        if address == 'busy@example.com' and self.busy:
+            self.busy -= 1
+            return '451 Try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.delivered.extend(envelope.rcpt_tos)
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    handler = Handler()
+    controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    yield handler, controller.hostname, controller.port
+    controller.stop()
+
+
+def make_queue(host, port, **kwargs):
+    pool = SMTPPool(host, port, use_ssl=False, timeout=5, size=1)
+    return EmailQueue(pool, workers=1, **kwargs)
+
+
+def test_permanent_refusal_fails_one_message_and_keeps_connection(smtp):
+    handler, host, port = smtp
+    emails = make_queue(host, port, backoff=10)
+    recipients = ['a@example.com', 'b@example.com', 'refused@example.com',
+                  'c@example.com', 'd@example.com', 'e@example.com']
+    for recipient in recipients:
+        emails.enqueue('topsis@example.com', [recipient], 'Subject: result\r\n\r\nbody')
+    start = time.monotonic()
+    emails.flush()
+    elapsed = time.monotonic() - start
+    emails.stop()
+
+    assert (emails.sent, emails.failed) == (5, 1)
+    assert sorted(handler.delivered) == sorted(r for r in recipients if r != 'refused@example.com')
+    assert handler.connections == 1
+    # A 5xx refusal is not retried, so no backoff was waited
+    assert elapsed < 5
+
+
+def test_temporary_refusal_is_retried_without_blocking_the_batch(smtp):
+    handler, host, port = smtp
+    handler.busy = 1
+    emails = make_queue(host, port, backoff=0.2)
+    for recipient in ['busy@example.com', 'a@example.com', 'b@example.com']:
+        emails.enqueue('topsis@example.com', [recipient], 'Subject: result\r\n\r\nbody')
+    emails.flush()
+    emails.stop()
+
+    assert (emails.sent, emails.failed) == (3, 0)
+    # The others went out while the refused message waited for its retry
+    assert handler.delivered == ['a@example.com', 'b@example.com', 'busy@example.com']
+
+
+def test_retries_give_up_after_max_retries(smtp):
+    handler, host, port = smtp
+    handler.busy = 10
+    emails = make_queue(host, port, backoff=0.01, max_retries=2)
+    emails.enqueue('topsis@example.com', ['busy@example.com'], 'Subject: result\r\n\r\nbody')
+    emails.flush()
+    emails.stop()
+
+    assert (emails.sent, emails.failed) == (0, 1)
+    assert handler.busy == 7
+
+
+def test_unreachable_server_counts_as_failed():
+    emails = make_queue('127.0.0.1', 1, backoff=0.01, max_retries=1)
+    emails.enqueue('topsis@example.com', ['a@example.com'], 'Subject: result\r\n\r\nbody')
+    emails.flush()
+    emails.stop()
+
+    assert (emails.sent, emails.failed) == (0, 1)
@@ -0,0 +1,112 @@
+import io
+import sqlite3
+
+import pandas as pd
+import pytest
+
+sa = pytest.importorskip('sqlalchemy')
+
+from services.history_store import decode_frame, encode_frame, upgrade_history_table
+
+RESULT = pd.DataFrame({'Fund': ['M1', 'M2', 'M3'], 'P1': [0.72, 0.83, 0.81], 'P2': [7, 3, 4],
+                       'Custom Score': [0.359, 0.655, 0.591], 'Rank': [3, 1, 2]})
+
+
+def test_payload_round_trip():
+    decoded = decode_frame(encode_frame(RESULT))
+    pd.testing.assert_frame_equal(decoded, RESULT)
+    pd.testing.assert_frame_equal(decode_frame(encode_frame(RESULT), columns=['Rank']), RESULT[['Rank']])
+
+
+# A database written by the version that stored CSV text
+def legacy_database(path):
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        'CREATE TABLE user (id INTEGER PRIMARY KEY, email VARCHAR(120));'
+        'CREATE TABLE history (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES user(id),'
+        ' dataset_info TEXT, result TEXT);'
+        'INSERT INTO user VALUES (1, "a@example.com");')
+    connection.execute('INSERT INTO history (user_id, dataset_info, result) VALUES (1, ?, ?)',
+                       ('Sample dataset info', RESULT.to_csv(index=False)))
+    connection.execute('INSERT INTO history (user_id, dataset_info, result) VALUES (1, NULL, NULL)')
+    connection.commit()
+    connection.close()
+
+
+def test_upgrade_converts_legacy_table(tmp_path):
+    path = tmp_path / 'legacy.db'
+    legacy_database(path)
+    engine = sa.create_engine(f'sqlite:///{path}')
+
+    assert upgrade_history_table(engine) == 1
+    # Nothing left to do on the next start
+    assert upgrade_history_table(engine) == 0
+
+    inspector = sa.inspect(engine)
+    assert {'created_at', 'rows', 'columns', 'result_size'} <= {c['name'] for c in inspector.get_columns('history')}
+    assert 'ix_history_user_created' in {i['name'] for i in inspector.get_indexes('history')}
+    with engine.connect() as connection:
+        rows = connection.execute(sa.text(
+            'SELECT result, "rows", "columns", result_size, created_at FROM history ORDER BY id')).fetchall()
+    payload, n_rows, n_columns, size, created = rows[0]
+    pd.testing.assert_frame_equal(decode_frame(payload), RESULT)
+    assert (n_rows, n_columns, size) == (3, 5, len(payload)) and created is not None
+    assert rows[1][0] is None
+
+
+def test_upgrade_ignores_missing_table(tmp_path):
+    assert upgrade_history_table(sa.create_engine(f'sqlite:///{tmp_path}/empty.db')) == 0
+
+
+# A result stored for a logged-in user comes back from /history as the same CSV
+def test_stored_result_round_trips_through_history(web_app, tmp_path):
+    with web_app.app.app_context():
+        user = web_app.User(email='history@example.com', password_hash='x')
+        web_app.db.session.add(user)
+        web_app.db.session.commit()
+        entry = web_app.store_history(user.id, RESULT, 'digest')
+        user_id, history_id = user.id, entry.id
+
+    client = web_app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    listing = client.get('/history').get_json()
+    assert [e['id'] for e in listing['entries']] == [history_id]
+    assert (listing['entries'][0]['rows'], listing['entries'][0]['columns']) == (3, 5)
+
+    response = client.get(f'/history/{history_id}')
+    assert response.status_code == 200
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(response.data)), RESULT)
+
+
+# A database upgraded from the CSV-text schema takes new rows through the
+# ORM, with their creation time, and lists them
+def test_orm_writes_after_upgrade_are_listed(web_app):
+    db = web_app.db
+    with web_app.app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(sa.text('DROP TABLE history'))
+            connection.execute(sa.text(
+                'CREATE TABLE history (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES user(id),'
+                ' dataset_info TEXT, result TEXT)'))
+        user = web_app.User(email='upgrade@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        with db.engine.begin() as connection:
+            connection.execute(sa.text('INSERT INTO history (user_id, dataset_info, result) VALUES (:user, NULL, :csv)'),
+                               {'user': user.id, 'csv': RESULT.to_csv(index=False)})
+        assert upgrade_history_table(db.engine) == 1
+        entry = web_app.store_history(user.id, RESULT, 'digest')
+        assert entry.created_at is not None
+        user_id = user.id
+
+    client = web_app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+    response = client.get('/history')
+    assert response.status_code == 200
+    entries = response.get_json()['entries']
+    assert len(entries) == 2 and all(e['created_at'] for e in entries)
+    for e in entries:
+        csv = client.get(f"/history/{e['id']}").data
+        pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(csv)), RESULT)
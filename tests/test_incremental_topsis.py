@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from services.incremental_topsis import IncrementalTopsis
+from services.topsis_engine import rank_scores, topsis_scores
+
+WEIGHTS = [1, 2, 1, 1]
+IMPACTS = ['+', '-', '+', '-']
+
+
+def assert_matches_batch(model):
+    expected = topsis_scores(model.matrix, WEIGHTS, IMPACTS)
+    np.testing.assert_allclose(model.scores(), expected, rtol=1e-9)
+    np.testing.assert_array_equal(model.ranks(), rank_scores(expected))
+
+
+def snapshot(model):
+    return model.keys(), model.matrix.copy(), model.scores()
+
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(0)
+    return IncrementalTopsis(rng.uniform(1, 100, size=(50, 4)), WEIGHTS, IMPACTS,
+                             keys=[f'A{i}' for i in range(50)])
+
+
+def test_edit_sequence_matches_batch_scores(model):
+    rng = np.random.default_rng(1)
+    assert_matches_batch(model)
+    for step in range(40):
+        keys = model.keys()
+        kind = step % 3
+        if kind == 0:
+            model.insert(rng.uniform(1, 100, size=(3, 4)), [f'N{step}-{i}' for i in range(3)])
+        elif kind == 1:
+            model.delete(rng.choice(keys, size=2, replace=False))
+        else:
+            chosen = rng.choice(keys, size=4, replace=False)
+            model.update(chosen, rng.uniform(1, 100, size=(4, 4)))
+        assert_matches_batch(model)
+
+
+def test_update_and_delete_of_extremes(model):
+    top = model.keys()[int(np.argmax(model.matrix[:, 0]))]
+    model.update([top], [[1000, 1, 1, 1]])
+    assert_matches_batch(model)
+    model.delete([top])
+    assert_matches_batch(model)
+    model.insert([[0.5, 0.5, 0.5, 0.5]], ['low'])
+    assert_matches_batch(model)
+
+
+@pytest.mark.parametrize('edit, error', [
+    (lambda m: m.delete(['A1', 'missing', 'A2']), KeyError),
+    (lambda m: m.delete(['A1', 'A1']), KeyError),
+    (lambda m: m.update(['A1', 'missing'], [[1, 1, 1, 1], [2, 2, 2, 2]]), KeyError),
+    (lambda m: m.update(['A1', 'A1'], [[1, 1, 1, 1], [2, 2, 2, 2]]), KeyError),
+    (lambda m: m.update(['A1'], [[1, 1, 1]]), ValueError),
+    (lambda m: m.update(['A1', 'A2'], [[1, 1, 1, 1]]), ValueError),
+    (lambda m: m.insert([[1, 1, 1, 1]], ['A3']), KeyError),
+    (lambda m: m.insert([[1, 1, 1]], ['new']), ValueError),
+])
+def test_rejected_edit_leaves_state_unchanged(model, edit, error):
+    model.scores()
+    keys, matrix, scores = snapshot(model)
+    with pytest.raises(error):
+        edit(model)
+
+    assert model.keys() == keys
+    np.testing.assert_array_equal(model.matrix, matrix)
+    np.testing.assert_array_equal(model.scores(), scores)
+    assert_matches_batch(model)
+    # Later edits still work from the unchanged state
+    model.delete(['A1'])
+    assert_matches_batch(model)
@@ -0,0 +1,78 @@
+import io
+
+import numpy as np
+import pytest
+
+from services.mcdm import METHODS, method_records, method_scores
+
+# Row i is (2^i, 4 / 2^i): the linear normalization of both columns is
+# (0.25, 0.5, 1) and every method puts row 2 first
+MATRIX = [[1, 4], [2, 2], [4, 1]]
+
+# (values, ranks) per method for MATRIX with weights 1,1 and impacts +,-
+EXPECTED = {
+    # d- / (d+ + d-): row 0 is the worst point, row 2 the best, row 1 halfway
+    'topsis': ([0.0, 0.5, 1.0], [3, 2, 1]),
+    'wsm': ([0.25, 0.5, 1.0], [3, 2, 1]),
+    # 0.25^0.5 * 0.25^0.5, ...
+    'wpm': ([0.25, 0.5, 1.0], [3, 2, 1]),
+    # regrets (1, 1), (2/3, 1/3), (0, 0): S = (1, 1/2, 0), R = (1/2, 1/3, 0),
+    # Q = S / 2 + R
+    'vikor': ([1.0, 7 / 12, 0.0], [3, 2, 1]),
+}
+
+
+def test_every_method_matches_hand_computed_values():
+    results = method_scores(MATRIX, '1,1', '+,-', list(METHODS))
+
+    assert set(results) == set(EXPECTED)
+    for name, (values, ranks) in EXPECTED.items():
+        np.testing.assert_allclose(results[name][0], values, atol=1e-12, err_msg=name)
+        np.testing.assert_array_equal(results[name][1], ranks, err_msg=name)
+
+
+def test_sum_and_product_models_weigh_differently():
+    results = method_scores([[1, 4], [4, 1]], '3,1', '+,+', ['wsm', 'wpm'])
+
+    # 0.75 * 0.25 + 0.25 * 1 and 0.25^0.75 * 1^0.25
+    np.testing.assert_allclose(results['wsm'][0], [0.4375, 0.8125])
+    np.testing.assert_allclose(results['wpm'][0], [0.25 ** 0.75, 0.25 ** 0.25])
+
+
+def test_wpm_leaves_out_criteria_without_weight():
+    results = method_scores([[0, 2], [1, 1]], '0,1', '+,+', ['wpm'])
+
+    np.testing.assert_allclose(results['wpm'][0], [1.0, 0.5])
+
+
+def test_wpm_rejects_negative_values():
+    matrix = [[1, -2, 3], [2, 3, 1], [3, 4, 2], [0.5, 1, 1]]
+
+    with pytest.raises(ValueError, match='WPM'):
+        method_scores(matrix, '1,1,1', '+,+,+', ['wpm'])
+    # The other methods still score it
+    results = method_scores(matrix, '1,1,1', '+,+,+', ['topsis', 'wsm', 'vikor'])
+    for values, _ in results.values():
+        assert np.isfinite(values).all()
+
+
+def test_records_hold_values_and_ranks_per_method():
+    records = method_records(['A', 'B', 'C'], method_scores(MATRIX, '1,1', '+,-', ['wsm']))
+
+    assert records[2] == {'name': 'C', 'wsm': 1.0, 'wsm_rank': 1}
+
+
+def test_compare_rejects_wpm_on_negative_data(web_app):
+    client = web_app.app.test_client()
+    data = b"Name,C1,C2,C3\nA,1,-2,3\nB,2,3,1\nC,3,4,2\nD,0.5,1,1\n"
+    response = client.post('/submit', data={'file': (io.BytesIO(data), 'negative.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    form = {'weights': ['1', '1', '1'], 'impacts': ['+', '+', '+']}
+
+    response = client.post('/compare', data={**form, 'methods': ['wpm']})
+    assert response.status_code == 400
+    assert 'WPM' in response.get_json()['error']
+    response = client.post('/compare', data={**form, 'methods': ['topsis', 'wsm']})
+    assert response.status_code == 200
+    assert [row['topsis_rank'] for row in response.get_json()['alternatives']] == [4, 2, 1, 3]
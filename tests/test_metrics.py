@@ -0,0 +1,60 @@
+import sys
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from services import metrics
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='reads /proc/self/statm')
+
+
+def series_count(histogram, label_value):
+    series = histogram.series.get(label_value)
+    return sum(series[0]) if series else 0
+
+
+@linux_only
+def test_rss_growth_sees_memory_kept_since_the_sample():
+    before = metrics.current_rss_bytes()
+    kept = np.ones(64 * 1024 * 1024 // 8)
+
+    assert before > 0
+    assert metrics.rss_growth(before) >= 48 * 1024 * 1024
+    assert kept.sum() > 0
+    assert metrics.rss_growth(None) is None
+
+
+@linux_only
+def test_requests_record_rss_growth_per_endpoint():
+    app = Flask(__name__)
+    metrics.init_metrics(app)
+    kept = []
+
+    @app.route('/grow')
+    def grow():
+        kept.append(np.ones(32 * 1024 * 1024 // 8))
+        return 'ok'
+
+    @app.route('/idle')
+    def idle():
+        return 'ok'
+
+    client = app.test_client()
+    client.get('/grow')
+    client.get('/idle')
+
+    growth = metrics.REQUEST_RSS_GROWTH.series['grow']
+    assert sum(growth[0]) == 1 and growth[1] >= 24 * 1024 * 1024
+    assert series_count(metrics.REQUEST_RSS_GROWTH, 'idle') == 1
+    assert 'topsis_request_rss_growth_bytes_count{endpoint="grow"} 1' in client.get('/metrics').get_data(as_text=True)
+
+
+@linux_only
+def test_jobs_record_rss_growth_per_job(uploaded):
+    from helpers import process, wait_for_job
+
+    before = series_count(metrics.JOB_RSS_GROWTH, 'run_topsis_job')
+    assert wait_for_job(uploaded, process(uploaded))['state'] == 'done'
+
+    assert series_count(metrics.JOB_RSS_GROWTH, 'run_topsis_job') == before + 1
@@ -0,0 +1,59 @@
+import os
+import threading
+
+from helpers import process, wait_for_job
+from services.job_service import JobManager
+from services.result_memo import get_result_memo
+from services.result_store import get_result_store
+
+
+def result_id(status):
+    return status['csv_download_link'].rsplit('/', 1)[-1]
+
+
+def test_memo_hit_is_a_new_job_sharing_the_result(uploaded):
+    first = wait_for_job(uploaded, process(uploaded))
+    second = wait_for_job(uploaded, process(uploaded))
+
+    assert first['state'] == second['state'] == 'done'
+    assert second['id'] != first['id']
+    assert result_id(second) == result_id(first) == first['id']
+    # The first job's record is untouched
+    assert uploaded.get(f"/jobs/{first['id']}").get_json() == first
+    assert get_result_memo().stats()['hits'] == 1
+    download = uploaded.get('/download', follow_redirects=True)
+    assert download.status_code == 200 and b'M1' in download.data
+
+
+def test_memo_hit_on_swept_result_is_scored_again(uploaded, monkeypatch):
+    first = wait_for_job(uploaded, process(uploaded))
+    store = get_result_store()
+    os.remove(store.find(first['id']))
+    # The result disappears between the memo lookup and reading its path
+    monkeypatch.setattr(store, 'touch', store.path_for)
+
+    second = wait_for_job(uploaded, process(uploaded))
+
+    assert second['state'] == 'done'
+    assert result_id(second) == second['id'] != first['id']
+    assert os.path.exists(store.find(second['id']))
+    assert get_result_memo().stats()['stale'] == 1
+
+
+def test_complete_runs_callback_off_the_calling_thread():
+    manager = JobManager()
+    release, called = threading.Event(), threading.Event()
+    threads = []
+
+    def on_done(job):
+        threads.append(threading.current_thread())
+        release.wait(5)
+        called.set()
+
+    job_id = manager.complete('tenant', 'a' * 32, {'result_path': 'x', 'result_id': 'b' * 32}, on_done=on_done)
+    # complete() returned while the callback is still blocked
+    assert not called.is_set()
+    release.set()
+    assert called.wait(5)
+    assert threads[0] is not threading.current_thread()
+    assert manager.get(job_id)['result']['result_id'] == 'b' * 32
@@ -0,0 +1,59 @@
+import os
+import time
+
+import pandas as pd
+
+from helpers import process, wait_for_job
+from services.result_store import ResultStore, figure_path
+
+
+def make_result(store, result_id, size, age=0):
+    path = store.path_for(result_id)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    with open(figure_path(path), 'wb') as f:
+        f.write(b'{}')
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_sweep_removes_expired_results(tmp_path):
+    store = ResultStore(str(tmp_path), ttl=3600)
+    old = make_result(store, 'a' * 32, 10, age=7200)
+    new = make_result(store, 'b' * 32, 10)
+    store.sweep()
+
+    assert not os.path.exists(old) and not os.path.exists(figure_path(old))
+    assert os.path.exists(new) and os.path.exists(figure_path(new))
+
+
+def test_sweep_removes_least_recently_used_over_budget(tmp_path):
+    store = ResultStore(str(tmp_path), max_bytes=2500)
+    paths = [make_result(store, c * 32, 1000, age=100 - i) for i, c in enumerate('abc')]
+    store.touch('a' * 32)
+    store.sweep()
+
+    # b is now the least recently used; a and c fit in the budget
+    assert [os.path.exists(p) for p in paths] == [True, False, True]
+
+
+def test_write_sweeps(tmp_path):
+    store = ResultStore(str(tmp_path), ttl=3600)
+    old = make_result(store, 'a' * 32, 10, age=7200)
+    path = store.write('b' * 32, pd.DataFrame({'Fund': ['M1'], 'Rank': [1]}))
+
+    assert os.path.exists(path) and not os.path.exists(old)
+
+
+# Jobs write their result from a pool worker; the store is still swept
+def test_finished_job_sweeps_result_store(web_app, uploaded, tmp_path, monkeypatch):
+    store = ResultStore(str(tmp_path / 'results'), ttl=3600)
+    monkeypatch.setattr('services.result_store.default_store', store)
+    expired = make_result(store, 'a' * 32, 10, age=7200)
+
+    status = wait_for_job(uploaded, process(uploaded))
+
+    assert status['state'] == 'done'
+    assert not os.path.exists(expired)
+    assert os.path.exists(store.find(status['id']))
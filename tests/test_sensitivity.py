@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from services.sensitivity import rank_rows
+
+
+def test_rank_rows_matches_pandas_with_ties_and_nan():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 6, size=(200, 25)) / 5
+    scores[rng.random(scores.shape) < 0.1] = np.nan
+    expected = pd.DataFrame(scores).rank(axis=1, method='max', ascending=False, na_option='bottom')
+
+    np.testing.assert_array_equal(rank_rows(scores), expected.to_numpy())
+
+
+def test_rank_rows_without_ties():
+    scores = np.array([[0.1, 0.3, 0.2], [0.9, 0.5, 0.7]])
+
+    np.testing.assert_array_equal(rank_rows(scores), [[3, 1, 2], [1, 3, 2]])
+
+
+def full_rank_matrix(matrix, impacts, weights):
+    from services.topsis_engine import normalize_columns, parse_impacts, scores_batch_normalized
+
+    signs = parse_impacts(impacts)
+    scores = scores_batch_normalized(normalize_columns(matrix), weights, np.broadcast_to(signs, weights.shape))
+    return rank_rows(scores)
+
+
+def test_rank_stability_streams_blocks_into_the_full_statistics(monkeypatch):
+    from services import sensitivity
+
+    matrix = np.random.default_rng(1).integers(1, 6, size=(60, 4)).astype(float)
+    # Several blocks, with ties from the small integer criteria
+    monkeypatch.setattr(sensitivity, 'BLOCK_CELLS', 600)
+    stats = sensitivity.rank_stability(matrix, '1,2,1,1', '+,-,+,+', samples=500, top_k=3, seed=2)
+    ranks = full_rank_matrix(matrix, '+,-,+,+', stats['weights'])
+
+    assert stats['interval_samples'] == 500
+    np.testing.assert_allclose(stats['mean_rank'], ranks.mean(axis=0))
+    np.testing.assert_allclose(stats['rank_std'], ranks.std(axis=0), atol=1e-9)
+    np.testing.assert_array_equal(stats['best_rank'], ranks.min(axis=0))
+    np.testing.assert_array_equal(stats['worst_rank'], ranks.max(axis=0))
+    np.testing.assert_array_equal(stats['rank_low'], np.percentile(ranks, 5, axis=0, method='lower'))
+    np.testing.assert_array_equal(stats['rank_high'], np.percentile(ranks, 95, axis=0, method='higher'))
+    np.testing.assert_allclose(stats['p_top_k'], (ranks <= 3).mean(axis=0))
+
+
+def test_rank_interval_comes_from_a_bounded_subset_of_samples(monkeypatch):
+    from services import sensitivity
+
+    matrix = np.random.default_rng(1).uniform(1, 10, size=(50, 3))
+    monkeypatch.setattr(sensitivity, 'INTERVAL_CELLS', 50 * 40)
+    stats = sensitivity.rank_stability(matrix, '1,1,1', '+,+,-', samples=400, seed=0)
+
+    assert stats['interval_samples'] == 40
+    assert (stats['best_rank'] <= stats['rank_low']).all()
+    assert (stats['rank_low'] <= stats['rank_high']).all()
+    assert (stats['rank_high'] <= stats['worst_rank']).all()
+
+
+def test_rank_stability_refuses_too_many_ranks(monkeypatch):
+    import pytest
+
+    from services import sensitivity
+
+    monkeypatch.setattr(sensitivity, 'MAX_CELLS', 1000)
+    with pytest.raises(ValueError, match='fewer samples'):
+        sensitivity.rank_stability(np.ones((20, 2)), '1,1', '+,+', samples=100)
+
+
+def test_large_sensitivity_requests_run_on_the_job_pool(web_app, uploaded, monkeypatch):
+    import io
+
+    from helpers import IMPACTS, WEIGHTS, wait_for_job
+    from services import sensitivity
+
+    form = {'weights': WEIGHTS, 'impacts': IMPACTS, 'samples': '200', 'seed': '1', 'top_k': '2'}
+    inline = uploaded.post('/sensitivity', data=form)
+    assert inline.status_code == 200
+
+    monkeypatch.setitem(web_app.app.config, 'SENSITIVITY_SYNC_CELLS', 100)
+    response = uploaded.post('/sensitivity', data=form)
+    assert response.status_code == 202
+    status = wait_for_job(uploaded, response.get_json()['job_id'])
+    assert status['state'] == 'done' and 'figure_url' not in status
+    table = pd.read_csv(io.BytesIO(uploaded.get(status['csv_download_link']).data))
+    expected = pd.DataFrame(inline.get_json()['alternatives'])[table.columns]
+    pd.testing.assert_frame_equal(table, expected, check_dtype=False)
+
+    monkeypatch.setattr(sensitivity, 'MAX_CELLS', 100)
+    response = uploaded.post('/sensitivity', data=form)
+    assert response.status_code == 400 and 'fewer samples' in response.get_json()['error']
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.topsis_engine import select_top_k, topsis_scores
+from services.topsis_service import topsis_csv_chunked
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+WEIGHTS, IMPACTS = '1,2,1,1', '+,-,+,-'
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.integers(1, 50, size=(1000, 4)), columns=['P1', 'P2', 'P3', 'P4'])
+    # Repeated rows give tied scores
+    data.iloc[500:510] = data.iloc[0]
+    data.insert(0, 'Name', [f'A{i}' for i in range(len(data))])
+    path = tmp_path / 'data.csv'
+    data.to_csv(path, index=False)
+    return str(path)
+
+
+def cli(*args):
+    subprocess.run([sys.executable, os.path.join(ROOT, '102103267.py'), *args], check=True, cwd=ROOT)
+
+
+def test_chunked_matches_in_memory(dataset, tmp_path):
+    in_memory, chunked = str(tmp_path / 'memory.csv'), str(tmp_path / 'chunked.csv')
+    cli(dataset, WEIGHTS, IMPACTS, in_memory)
+    cli(dataset, WEIGHTS, IMPACTS, chunked, '--chunksize', '64', '--rank')
+    expected, result = pd.read_csv(in_memory), pd.read_csv(chunked)
+
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_allclose(result['Topsis Score'], expected['Topsis Score'], rtol=1e-12)
+    np.testing.assert_array_equal(result['Rank'], expected['Rank'])
+    pd.testing.assert_frame_equal(result.iloc[:, :5], expected.iloc[:, :5])
+
+
+def test_chunked_leaves_out_rank_unless_asked(dataset, tmp_path):
+    output = str(tmp_path / 'out.csv')
+    cli(dataset, WEIGHTS, IMPACTS, output, '--chunksize', '64')
+    result = pd.read_csv(output)
+
+    assert 'Rank' not in result.columns
+    ranked = pd.read_csv(topsis_csv_chunked(dataset, str(tmp_path / 'ranked.csv'), [1, 2, 1, 1],
+                                            ['+', '-', '+', '-'], chunksize=64, rank=True))
+    np.testing.assert_array_equal(result['Topsis Score'], ranked['Topsis Score'])
+
+
+def test_chunked_top_k_matches_in_memory(dataset, tmp_path):
+    in_memory, chunked = str(tmp_path / 'memory.csv'), str(tmp_path / 'chunked.csv')
+    cli(dataset, WEIGHTS, IMPACTS, in_memory, '--top-k', '25')
+    cli(dataset, WEIGHTS, IMPACTS, chunked, '--top-k', '25', '--chunksize', '64')
+
+    pd.testing.assert_frame_equal(pd.read_csv(chunked), pd.read_csv(in_memory))
+
+
+def test_chunked_top_k_keeps_ties_at_the_cutoff(tmp_path):
+    # Ten identical rows straddle the cut-off and fall in different chunks;
+    # the first chunk is scored before any of them
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame(rng.integers(1, 50, size=(300, 4)), columns=['P1', 'P2', 'P3', 'P4'])
+    data.iloc[[40, 90, 130, 170, 200, 230, 250, 270, 280, 299]] = [49, 1, 49, 1]
+    data.iloc[0] = [50, 1, 50, 1]
+    data.insert(0, 'Name', [f'A{i}' for i in range(len(data))])
+    path = str(tmp_path / 'data.csv')
+    data.to_csv(path, index=False)
+
+    scores = topsis_scores(data.iloc[:, 1:].to_numpy(dtype=np.float64), WEIGHTS, IMPACTS)
+    cutoff = np.sort(scores)[::-1][4]
+    assert np.count_nonzero(scores == cutoff) == 10
+    idx, ranks = select_top_k(scores, 5)
+
+    result = pd.read_csv(topsis_csv_chunked(path, str(tmp_path / 'top.csv'), WEIGHTS, IMPACTS,
+                                            chunksize=32, top_k=5))
+    assert result['Rank'].tolist() == ranks.tolist() == [1, 11, 11, 11, 11]
+    np.testing.assert_allclose(result['Topsis Score'], scores[idx], rtol=1e-12)
+    assert result['Name'].iloc[0] == 'A0'
+    assert set(result['Name'].iloc[1:]) <= {f'A{i}' for i in (40, 90, 130, 170, 200, 230, 250, 270, 280, 299)}
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.topsis_engine import (column_stats, ideal_points, parse_impacts, parse_weights, rank_scores, score_rows,
+                                    select_top_k, topsis_scores, topsis_scores_batch)
+
+
+def pandas_ranks(scores):
+    return pd.Series(scores).rank(method='max', ascending=False, na_option='bottom').to_numpy()
+
+
+def test_rank_scores_matches_pandas_with_ties_and_nan():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        n = int(rng.integers(0, 30))
+        # Few distinct values give ties; some scores are NaN
+        scores = rng.integers(0, 6, size=n) / 5
+        scores[rng.random(n) < 0.2] = np.nan
+        np.testing.assert_array_equal(rank_scores(scores), pandas_ranks(scores))
+
+
+def test_rank_scores_puts_nan_last():
+    np.testing.assert_array_equal(rank_scores([0.2, np.nan, 0.9, 0.2, np.nan]), [3, 5, 1, 3, 5])
+
+
+# The CLI's original pandas implementation: normalize and weight each column,
+# swap the ideal points of cost columns and score every row in a loop
+def original_topsis(dataset, weights, impact):
+    data = dataset.copy()
+    n_col = len(data.columns)
+    for i in range(1, n_col):
+        norm = np.sqrt((data.iloc[:, i] ** 2).sum())
+        data.iloc[:, i] = data.iloc[:, i] / norm * weights[i - 1]
+    p_sln = data.max().values[1:]
+    n_sln = data.min().values[1:]
+    for i in range(1, n_col):
+        if impact[i - 1] == '-':
+            p_sln[i - 1], n_sln[i - 1] = n_sln[i - 1], p_sln[i - 1]
+    score = []
+    for i in range(len(data)):
+        temp_p, temp_n = 0, 0
+        for j in range(1, n_col):
+            temp_p = temp_p + (p_sln[j - 1] - data.iloc[i, j]) ** 2
+            temp_n = temp_n + (n_sln[j - 1] - data.iloc[i, j]) ** 2
+        temp_p, temp_n = temp_p ** 0.5, temp_n ** 0.5
+        score.append(temp_n / (temp_p + temp_n))
+    return np.array(score)
+
+
+def test_score_rows_matches_the_original_implementation():
+    rng = np.random.default_rng(2)
+    matrix = rng.uniform(1, 100, size=(40, 4))
+    dataset = pd.DataFrame(matrix, columns=['P1', 'P2', 'P3', 'P4'])
+    dataset.insert(0, 'Name', [f'A{i}' for i in range(len(matrix))])
+    weights, impact = [1, 2, 1, 3], ['+', '-', '+', '-']
+
+    _, scale, best, worst = ideal_points(column_stats(matrix), weights, impact)
+    expected = original_topsis(dataset, weights, impact)
+    np.testing.assert_allclose(score_rows(matrix, scale, best, worst), expected, rtol=1e-12)
+    np.testing.assert_allclose(topsis_scores(matrix, '1,2,1,3', '+,-,+,-'), expected, rtol=1e-12)
+
+
+def test_parse_weights():
+    np.testing.assert_array_equal(parse_weights('1, 2.5,0'), [1, 2.5, 0])
+    np.testing.assert_array_equal(parse_weights([1, '2']), [1, 2])
+    for bad in ('1,a', '1,,2', ''):
+        with pytest.raises(ValueError):
+            parse_weights(bad)
+
+
+def test_parse_impacts():
+    np.testing.assert_array_equal(parse_impacts('+, -,+'), [1, -1, 1])
+    np.testing.assert_array_equal(parse_impacts(['-', '+']), [-1, 1])
+    np.testing.assert_array_equal(parse_impacts(np.array([2, -0.5])), [1, -1])
+    for bad in ('+,x', '+,,-', '', ['+', '*']):
+        with pytest.raises(ValueError, match='Invalid impact'):
+            parse_impacts(bad)
+
+
+def test_select_top_k_counts_ties_at_the_cutoff():
+    scores = np.array([0.1, 0.5, 0.9, 0.5, 0.5, 0.7])
+    idx, ranks = select_top_k(scores, 3)
+
+    # 0.9 and 0.7, then one of the three rows tied at 0.5, which all share rank 5
+    assert idx[:2].tolist() == [2, 5] and scores[idx[2]] == 0.5
+    assert ranks.tolist() == [1, 2, 5]
+    np.testing.assert_array_equal(ranks, rank_scores(scores)[idx])
+
+
+def test_select_top_k_bounds():
+    scores = np.array([0.3, 0.6])
+
+    idx, ranks = select_top_k(scores, 5)
+    assert idx.tolist() == [1, 0] and ranks.tolist() == [1, 2]
+    idx, ranks = select_top_k(scores, 0)
+    assert len(idx) == len(ranks) == 0
+
+
+def test_batch_accepts_impacts_as_numeric_signs():
+    rng = np.random.default_rng(3)
+    matrix = rng.uniform(1, 10, size=(30, 3))
+    weights = rng.uniform(0.5, 2, size=(4, 3))
+    expected = topsis_scores_batch(matrix, weights, '+,-,+')
+
+    # One row of signs shared by every scenario, as an array or a list
+    np.testing.assert_allclose(topsis_scores_batch(matrix, weights, np.array([1, -1, 1])), expected)
+    np.testing.assert_allclose(topsis_scores_batch(matrix, weights, [1.0, -1.0, 1.0]), expected)
+    # One row per scenario
+    np.testing.assert_allclose(topsis_scores_batch(matrix, weights, np.tile([1, -1, 1], (4, 1))), expected)
+    for k in range(len(weights)):
+        np.testing.assert_allclose(expected[k], topsis_scores(matrix, weights[k], '+,-,+'))
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from services.topsis_engine import rank_scores
+from services.topsis_service import process_dataset
+
+
+def make_data():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.integers(1, 10, size=(200, 3)), columns=['P1', 'P2', 'P3'])
+    data.insert(0, 'Name', [f'A{i}' for i in range(len(data))])
+    return data
+
+
+def test_full_and_top_k_ranks_agree():
+    full = process_dataset(make_data(), '1,1,2', '+,-,+')
+    top = process_dataset(make_data(), '1,1,2', '+,-,+', top_k=20)
+
+    assert full['Rank'].dtype.kind == 'i'
+    np.testing.assert_array_equal(full['Rank'], rank_scores(full['Custom Score'].to_numpy()))
+    # Small integer criteria give ties; both branches rank them the same way
+    assert full['Custom Score'].duplicated().any()
+    np.testing.assert_array_equal(top['Rank'], full.loc[top.index, 'Rank'])
+
+
+def test_process_keeps_the_best_top_k_rows(uploaded):
+    import io
+
+    from helpers import process, wait_for_job
+
+    full = wait_for_job(uploaded, process(uploaded))
+    top = wait_for_job(uploaded, process(uploaded, top_k='2'))
+    assert full['state'] == top['state'] == 'done'
+    assert top['csv_download_link'] != full['csv_download_link']
+
+    full = pd.read_csv(io.BytesIO(uploaded.get(full['csv_download_link']).data))
+    top = pd.read_csv(io.BytesIO(uploaded.get(top['csv_download_link']).data))
+    np.testing.assert_array_equal(full['Rank'], rank_scores(full['Custom Score'].to_numpy()))
+    best = full.sort_values('Rank').head(2)
+    assert top['Fund'].tolist() == best['Fund'].tolist()
+    assert top['Rank'].tolist() == best['Rank'].tolist() == [1, 2]
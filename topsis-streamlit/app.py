@@ -3,16 +3,41 @@ from config import Config
 from routes.auth import auth_bp
 from routes.topsis import topsis_bp
 from models import db
+from services.dataset_cache import configure_dataset_cache
+from services.history_store import upgrade_history_table
+from services.ingest import StreamingUploadRequest
+from services.job_service import configure_jobs
+from services.metrics import init_metrics
+from services.parallel_topsis import configure_scoring
+from services.result_memo import configure_result_memo
+from services.result_store import configure_result_store
 import os
 
 app = Flask(__name__)
+app.request_class = StreamingUploadRequest
 app.config.from_object(Config)
 
 db.init_app(app)
+configure_dataset_cache(app.config['DATASET_CACHE_MAX_BYTES'], app.config['DATASET_CACHE_DIR'],
+                        app.config['DATASET_CACHE_DISK_MAX_BYTES'])
+configure_jobs(app.config['JOBS_MAX_WORKERS'], app.config['JOBS_RESULT_TTL'], app.config['JOBS_PER_TENANT'])
+configure_scoring(app.config['SCORING_WORKERS'], app.config['SCORING_BACKEND'], app.config['SCORING_DTYPE'])
+configure_result_store(app.config['RESULTS_FOLDER'], app.config['RESULTS_FORMAT'],
+                       app.config['RESULTS_MAX_BYTES'], app.config['RESULTS_TTL'])
+configure_result_memo(app.config['RESULT_MEMO_MAX_ENTRIES'])
+init_metrics(app, app.config['METRICS_ENABLED'])
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(topsis_bp)
 
+# Bring a history table from an older version up to date at startup; a
+# database that cannot be reached is reported and tried again next start
+with app.app_context():
+    try:
+        upgrade_history_table(db.engine)
+    except Exception as e:
+        print("Could not upgrade the history table:", str(e))
+
 if __name__ == "__main__":
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
         os.makedirs(app.config['UPLOAD_FOLDER'])
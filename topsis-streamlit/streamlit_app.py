@@ -0,0 +1,112 @@
+import hashlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from services.dataset_cache import dataset_entry, entry_frame
+from services.interactive_topsis import InteractiveTopsis
+from services.topsis_engine import rank_scores
+from utils.validators import coerce_numeric_values
+
+# Streamlit front-end: upload a dataset, move the weight sliders and the
+# ranking follows.
+#
+# Streamlit reruns this script on every widget change, so nothing here may
+# parse or normalize per run. The parsed dataset is kept by st.cache_data,
+# keyed by the upload's id so a rerun does not hash the file, with the names
+# as a NumPy array so the cached copy is cheap to restore; the
+# InteractiveTopsis state (the squared
+# deviations from the ideal points, which do not depend on the weights) by
+# st.cache_resource, keyed by the dataset's hash and the impacts. A weight
+# change is then one matrix-vector product and a top-k selection; changing an
+# impact builds the state for that combination once. The full result is only
+# written as CSV when it is downloaded.
+
+DEFAULT_SHOWN = 20
+
+
+# (headers, dtypes, names, matrix, digest) of an upload, as in the dataset cache
+@st.cache_data(max_entries=4, show_spinner='Parsing dataset...')
+def load_dataset(file_id, _upload):
+    data, filename = _upload.getvalue(), _upload.name
+    if filename.endswith('.xlsx'):
+        frame = pd.read_excel(io.BytesIO(data))
+    else:
+        frame = pd.read_csv(io.BytesIO(data))
+    entry = dataset_entry(coerce_numeric_values(frame))
+    if entry is None:
+        raise ValueError("Every column after the first must hold numbers")
+    headers, dtypes, names, matrix = entry
+    return headers, dtypes, np.asarray(names, dtype=str), matrix, hashlib.sha256(data).hexdigest()
+
+
+# The matrix is not hashed: the dataset's digest already identifies it
+@st.cache_resource(max_entries=8, show_spinner='Normalizing...')
+def load_scorer(digest, impacts, _matrix):
+    return InteractiveTopsis(_matrix, impacts)
+
+
+def result_csv(entry, scorer, weights):
+    data = entry_frame(entry)
+    data['Topsis Score'] = scorer.scores(weights)
+    data['Rank'] = rank_scores(data['Topsis Score'].to_numpy())
+    return data.to_csv(index=False)
+
+
+def main():
+    st.set_page_config(page_title='TOPSIS', layout='wide')
+    st.title('TOPSIS')
+    uploaded = st.file_uploader('Dataset (CSV or XLSX): a name column followed by numeric criteria',
+                                type=['csv', 'xlsx'])
+    if uploaded is None:
+        st.info('Upload a dataset to rank its alternatives.')
+        return
+    try:
+        headers, dtypes, names, matrix, digest = load_dataset(uploaded.file_id, uploaded)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    criteria = headers[1:]
+    if len(criteria) < 2:
+        st.error('The dataset needs at least two criteria.')
+        return
+
+    st.sidebar.header('Weights and impacts')
+    weights, impacts = [], []
+    for j, name in enumerate(criteria):
+        weights.append(st.sidebar.slider(name, 0.0, 10.0, 1.0, 0.5, key=f'weight-{j}'))
+        impacts.append(st.sidebar.radio(f'{name} impact', ['+', '-'], horizontal=True,
+                                        label_visibility='collapsed', key=f'impact-{j}'))
+    shown = st.sidebar.number_input('Alternatives shown', 1, len(names), min(DEFAULT_SHOWN, len(names)))
+    if not any(weights):
+        st.warning('Give at least one criterion a weight above 0.')
+        return
+
+    start = time.perf_counter()
+    scorer = load_scorer(digest, ','.join(impacts), matrix)
+    rows, scores, ranks = scorer.top_k(weights, int(shown))
+    elapsed = (time.perf_counter() - start) * 1000
+
+    table = pd.DataFrame(matrix[rows], columns=criteria)
+    table.insert(0, headers[0], names[rows])
+    table['Topsis Score'] = scores
+    table['Rank'] = ranks
+    st.caption(f'{len(names)} alternatives x {len(criteria)} criteria, ranked in {elapsed:.1f} ms')
+    # Scores drawn as bars inside the table; a separate chart costs more to
+    # build than the rescore itself
+    st.dataframe(table, hide_index=True, column_config={
+        'Topsis Score': st.column_config.ProgressColumn('Topsis Score', format='%.4f', min_value=0.0, max_value=1.0)})
+
+    entry = (headers, dtypes, names, matrix)
+    st.download_button('Download full result (CSV)', lambda: result_csv(entry, scorer, np.array(weights)),
+                       file_name='result_with_rank.csv', mime='text/csv', on_click='ignore')
+
+
+main()
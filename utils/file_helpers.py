@@ -1,11 +1,15 @@
-def load_input_data(input_file):
-    if input_file.endswith('.csv'):
-        data = pd.read_csv(input_file)
-    elif input_file.endswith('.xlsx'):
-        data = pd.read_excel(input_file)
-    else:
-        return None
-    return data
+from services.dataset_cache import load_cached_dataset, load_dataset_entry
+
+ALLOWED_EXTENSIONS = {'csv', 'xlsx'}
+
+# Parsed uploads are cached by content hash, so /process does not parse again
+def load_input_data(input_file, key=None):
+    return load_cached_dataset(input_file, key=key)
+
+# The cached (headers, dtypes, names, matrix) entry of an upload, for code
+# that scores the criteria matrix directly
+def load_input_entry(input_file, key=None):
+    return load_dataset_entry(input_file, key=key)
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
\ No newline at end of file
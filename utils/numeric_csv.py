@@ -0,0 +1,125 @@
+import csv
+import io
+import os
+import re
+
+import numpy as np
+
+# Cells pandas.read_csv reads as missing by default
+NA_VALUES = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+             '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'}
+
+# Whole columns are matched at once, one cell per line, so checking a column
+# costs one regex call instead of one per cell
+INTEGER_COLUMN = re.compile(r'(?:[+-]?\d{1,15}\n)*[+-]?\d{1,15}')
+NUMBER = r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+NUMBER_COLUMN = re.compile(rf'(?:{NUMBER}\n)*{NUMBER}')
+# Criteria columns only get this character check; a cell made of these
+# characters that is not a plain number also fails float conversion, which is
+# much cheaper than matching NUMBER_COLUMN on large files
+NUMBER_CHARS = re.compile(r'[0-9.eE+\-\n]+')
+INTEGER_CHARS = re.compile(r'[0-9+\-\n]+')
+
+
+# A CSV whose first column holds names and whose other columns hold plain
+# numbers, parsed with the csv module and NumPy only so the CLI does not have
+# to import pandas for the common case. Integer columns are remembered so the
+# output prints them the way pandas would.
+class NumericTable:
+    def __init__(self, header, names, matrix, integer_columns):
+        self.header = header
+        self.names = names
+        self.matrix = matrix
+        self.integer_columns = integer_columns
+
+    # Write the table plus extra columns ({name: values}) like
+    # DataFrame.to_csv(index=False); rows selects and orders the rows to write
+    def write_csv(self, path, extra, rows=None):
+        matrix, names = self.matrix, self.names
+        if rows is not None:
+            matrix, names = matrix[rows], [names[i] for i in rows]
+        columns = {self.header[0]: names}
+        for name, column, integer in zip(self.header[1:], matrix.T, self.integer_columns):
+            columns[name] = ([str(v) for v in column.astype(np.int64).tolist()] if integer
+                             else [_format_float(v) for v in column.tolist()])
+        # Like assigning DataFrame columns, an existing column is replaced in place
+        for name, values in extra.items():
+            values = np.asarray(values)
+            if values.dtype.kind in 'iu':
+                columns[name] = [str(v) for v in values.tolist()]
+            elif values.dtype == np.float32:
+                # Shortest float32 repr, as pandas writes it
+                columns[name] = ['' if v != v else str(v) for v in values]
+            else:
+                columns[name] = [_format_float(v) for v in values.tolist()]
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(list(columns))
+            writer.writerows(zip(*columns.values()))
+
+
+def _format_float(value):
+    return '' if value != value else repr(value)
+
+
+# Header and columns (lists of cell strings) of a CSV without quotes: every
+# cell is found with one str.split over the whole body instead of a csv.reader
+# row at a time. None for ragged rows.
+def _split_plain(text):
+    lines = [line for line in text.replace('\r\n', '\n').split('\n') if line]
+    if len(lines) < 2:
+        return None
+    header, body = lines[0].split(','), lines[1:]
+    width = len(header)
+    if any(line.count(',') != width - 1 for line in body):
+        return None
+    cells = ','.join(body).split(',')
+    return header, [cells[j::width] for j in range(width)]
+
+
+def _split_quoted(text):
+    try:
+        rows = [row for row in csv.reader(io.StringIO(text, newline='')) if row]
+    except csv.Error:
+        return None
+    if len(rows) < 2:
+        return None
+    header, body = rows[0], rows[1:]
+    if any(len(row) != len(header) for row in body):
+        return None
+    return header, [list(column) for column in zip(*body)]
+
+
+# Parse path as a NumericTable, or return None if the file needs pandas:
+# missing or non-numeric cells, ragged rows, numeric or missing names,
+# duplicate or empty headers, or anything the two readers might disagree on.
+def read_numeric_csv(path):
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            text = f.read()
+    except UnicodeDecodeError:
+        return None
+    plain = '"' not in text and '\r' not in text.replace('\r\n', '')
+    parsed = _split_plain(text) if plain else _split_quoted(text)
+    if parsed is None:
+        return None
+    header, columns = parsed
+    width = len(header)
+    if width < 2 or '' in header or len(set(header)) != width:
+        return None
+
+    names = columns[0]
+    if NA_VALUES.intersection(names) or NUMBER_COLUMN.fullmatch('\n'.join(names)):
+        return None
+    integer_columns = []
+    for column in columns[1:]:
+        text = '\n'.join(column)
+        if not NUMBER_CHARS.fullmatch(text):
+            return None
+        integer_columns.append(INTEGER_CHARS.fullmatch(text) is not None
+                               and INTEGER_COLUMN.fullmatch(text) is not None)
+    try:
+        matrix = np.array(columns[1:], dtype=np.float64).T
+    except ValueError:
+        return None
+    return NumericTable(header, names, matrix, integer_columns)
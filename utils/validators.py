@@ -1,12 +1,58 @@
+import re
+import numpy as np
+
 def validate_email(email):
     if not email:
         return True  # If email is empty, allow it
     pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
     return re.match(pattern, email.strip())
 
+# Raised when criteria cells are not numbers; cells holds (row, column, value)
+# for the first offending cells, with rows counted from 1 like in a spreadsheet
+class NonNumericDataError(ValueError):
+    def __init__(self, cells):
+        self.cells = cells
+        shown = ', '.join(f"row {row}, column '{column}' ({value!r})" for row, column, value in cells[:5])
+        super().__init__(f'Columns from 2nd to last must contain numeric values only. Found: {shown}')
+
+# Column-wise check of the criteria columns: numeric dtypes pass as is, other
+# columns are coerced with pd.to_numeric in bulk, and cells that were present
+# but failed to convert are reported. row_offset is added to reported rows so
+# chunks of a larger file report positions in the file.
+def find_non_numeric_cells(data, row_offset=0, limit=10):
+    import pandas as pd
+
+    cells = []
+    criteria = data.iloc[:, 1:]
+    for position, column in enumerate(criteria.columns):
+        series = criteria.iloc[:, position]
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            continue
+        bad = pd.to_numeric(series, errors='coerce').isna().to_numpy() & series.notna().to_numpy()
+        for row in np.flatnonzero(bad)[:limit - len(cells)]:
+            cells.append((row_offset + int(row) + 1, column, series.iloc[row]))
+        if len(cells) >= limit:
+            break
+    return cells
+
+# Convert the criteria columns to numeric dtypes, raising NonNumericDataError
+# with the offending positions if any cell is not a number
+def coerce_numeric_values(data, row_offset=0):
+    import pandas as pd
+
+    cells = find_non_numeric_cells(data, row_offset)
+    if cells:
+        raise NonNumericDataError(cells)
+    criteria = data.columns[1:]
+    converted = [c for c in criteria if not pd.api.types.is_numeric_dtype(data[c].dtype)]
+    if converted:
+        data = data.copy()
+        for column in converted:
+            data[column] = pd.to_numeric(data[column])
+    return data
+
 def validate_numeric_values(data):
-    non_numeric_columns = data.iloc[:, 1:].applymap(lambda x: not np.isreal(x)).any()
-    return not non_numeric_columns.any()
+    return not find_non_numeric_cells(data, limit=1)
 
 def validate_weights_impacts(weights, impacts, num_columns):
     try: